@@ -1,12 +1,27 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from typing import Dict, Any
 import asyncio
 import json
+import time
 
-from perplexity_core.contracts import SearchRequest, SearchResponse
+from perplexity_core.contracts import BatchSearchRequest, SearchRequest, SearchResponse
 from perplexity_core.pipeline.runner import Pipeline
+from perplexity_core.pipeline.batch import run_batch
+from perplexity_core.pipeline.warmer import CacheWarmer
+from perplexity_core.config import settings
+from perplexity_core.admission import AdmissionController, Overloaded, SHED
+from perplexity_core.llm.cached import llm_cache_stats
+from perplexity_core.llm.warmup import OllamaKeeper
+from perplexity_core.metrics import render_prometheus
+from perplexity_core.safety.guard import get_guard
+from perplexity_core.log import setup_logging, request_id, new_request_id
+from perplexity_core.synth.repair import repair_stats
+
+setup_logging()
 
 app = FastAPI(
     title="Local Perplexity API",
@@ -23,8 +38,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class RequestIdMiddleware:
+    """
+    Tag every log record for the request with its X-Request-ID (generated if absent) and echo it back.
+    
+    Plain ASGI rather than @app.middleware("http"), which runs every request
+    through an extra task and body stream and costs more than a cache hit.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rid = ""
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                rid = value.decode("latin-1")[:64]
+                break
+        rid = rid or new_request_id()
+        request_id.set(rid)
+        
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", rid.encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+        
+        await self.app(scope, receive, send_with_id)
+
+
+app.add_middleware(RequestIdMiddleware)
+
+
 # Global pipeline instance
 pipeline = Pipeline()
+admission = AdmissionController()
+ollama_keeper = OllamaKeeper()
+# Refreshes popular answers before they expire, pausing while live requests fill the admission limit
+warmer = CacheWarmer(pipeline, popular=pipeline.popular, busy=lambda: admission.busy(settings.WARM_MAX_LOAD))
+
+
+@app.on_event("startup")
+async def startup():
+    """
+    Preload the local model so the first forceLocal request does not pay the load time, and start the cache warmer.
+    """
+    if settings.OLLAMA_WARMUP:
+        ollama_keeper.start()
+    if settings.WARM_ENABLED:
+        warmer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await ollama_keeper.stop()
+    await warmer.stop()
+    await pipeline.close()
 
 
 @app.get("/health")
@@ -35,33 +108,172 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/health/llm")
+async def health_llm():
+    """
+    LLM backend health: whether the Ollama model is loaded and OpenRouter is configured.
+    """
+    return {
+        "ollama": await ollama_keeper.status(),
+        "openrouter": {"configured": bool(settings.OPENROUTER_API_KEY), "model": settings.OPENROUTER_MODEL},
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics: stage latency histograms, cache, fallback and error counters, queue gauges.
+    """
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/api/stats")
+async def stats():
+    """
+    LLM cache hit rates per call type, synthesis JSON parse outcomes, admission, query history,
+    cache warmer and safety rule state.
+    """
+    return {
+        "llmCache": llm_cache_stats(),
+        "jsonRepair": repair_stats(),
+        "admission": admission.stats(),
+        "records": pipeline.records.stats() if pipeline.records else None,
+        "warmer": warmer.stats() if settings.WARM_ENABLED else None,
+        "safety": get_guard().stats()
+    }
+
+
+async def _shed(req: SearchRequest, e: Overloaded) -> SearchResponse:
+    """
+    Answer a request that was not admitted from the cache (fresh or stale), or reject it with Retry-After.
+    """
+    response = await pipeline.cached_response(req)
+    SHED.inc(reason=e.reason, served="cache" if response else "rejected")
+    if response is None:
+        raise HTTPException(status_code=e.status, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    return response
+
+
 @app.post("/api/search", response_model=SearchResponse)
 async def search(req: SearchRequest):
     """
     Perform a search and return a synthesized answer with citations.
+    
+    The pipeline returns serialized JSON (pre-serialized for cache hits),
+    which is sent as is rather than re-validated against response_model.
     """
     try:
-        response = await pipeline.run(req)
-        return response
+        async with admission.slot():
+            body = await pipeline.run_json(req)
+        return Response(content=body, media_type="application/json")
+    except Overloaded as e:
+        return await _shed(req, e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Pipeline error: {str(e)}")
 
 
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """
+    Format one Server-Sent Events message.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/api/search/stream")
+async def search_stream(req: SearchRequest):
+    """
+    Perform a search, streaming stage events and synthesis tokens as Server-Sent Events.
+    
+    Admission happens before the stream starts, so overload is a plain 429/503
+    (or a cached answer as a single result event).
+    """
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    try:
+        await admission.acquire()
+    except Overloaded as e:
+        response = await _shed(req, e)
+        
+        async def cached_events():
+            yield _sse("result", response.model_dump())
+        
+        return StreamingResponse(cached_events(), media_type="text/event-stream", headers=headers)
+    
+    started = time.perf_counter()
+    released = False
+    
+    def release():
+        # Called from the stream's cleanup and again as a background task, whichever runs first wins
+        nonlocal released
+        if not released:
+            released = True
+            admission.release(time.perf_counter() - started)
+    
+    async def events():
+        try:
+            async for event, data in pipeline.run_stream(req):
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {"detail": f"Pipeline error: {str(e)}"})
+        finally:
+            release()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers=headers,
+        background=BackgroundTask(release)
+    )
+
+
+@app.post("/api/search/batch")
+async def search_batch(batch: BatchSearchRequest):
+    """
+    Run many searches, streaming one JSON result per line (NDJSON) as each finishes.
+    
+    Each search is admitted separately; one that is shed gets the cached
+    answer or an error line.
+    """
+    if len(batch.requests) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {settings.BATCH_MAX_REQUESTS} requests")
+    
+    async def lines():
+        async for result in run_batch(pipeline, batch.requests, batch.concurrency, admission):
+            yield result.model_dump_json() + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @app.post("/api/search-raw")
 async def search_raw(req: SearchRequest):
     """
     Perform a search and return raw response (for debugging).
     """
     try:
-        response = await pipeline.run(req)
-        return json.loads(response.model_dump_json())
+        async with admission.slot():
+            body = await pipeline.run_json(req)
+        return Response(content=body, media_type="application/json")
+    except Overloaded as e:
+        return Response(content=(await _shed(req, e)).model_dump_json(), media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Pipeline error: {str(e)}")
 
 
+@app.get("/api/related")
+async def related(q: str, k: int = 10):
+    """
+    Find passages related to a query in the local passage index (no network calls).
+    """
+    if not pipeline.passages:
+        raise HTTPException(status_code=503, detail="Passage index is not available")
+    try:
+        hits = await asyncio.to_thread(pipeline.passages.related, q, min(max(k, 1), 50))
+        return {"query": q, "results": hits}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Related lookup error: {str(e)}")
+
+
 if __name__ == "__main__":
     import uvicorn
-    from perplexity_core.config import settings
     
     uvicorn.run(
         "main:app",
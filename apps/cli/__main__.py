@@ -4,8 +4,7 @@ import sys
 from typing import Optional
 
 import typer
-from perplexity_core.contracts import SearchRequest, UIOptions
-from perplexity_core.pipeline.runner import Pipeline
+from perplexity_core.log import setup_logging
 
 app = typer.Typer(
     name="perplexity",
@@ -13,6 +12,17 @@ app = typer.Typer(
 )
 
 
+@app.callback()
+def main(
+    log_level: Optional[str] = typer.Option(None, "--log-level", help="Log level (defaults to LOG_LEVEL)")
+):
+    """
+    Local Perplexity CLI - AI-powered search engine
+    """
+    # Logs go to stderr so command output on stdout stays machine-readable
+    setup_logging(level=log_level)
+
+
 @app.command()
 def run(
     query: str,
@@ -25,6 +35,10 @@ def run(
     """
     Run a search query and print the results.
     """
+    # Imported here so --help and other commands start without loading the pipeline
+    from perplexity_core.contracts import SearchRequest, UIOptions
+    from perplexity_core.pipeline.runner import Pipeline
+    
     # Parse domain lists
     include_list = None
     exclude_list = None
@@ -48,8 +62,10 @@ def run(
     # Run the pipeline
     async def _run():
         pipeline = Pipeline()
-        response = await pipeline.run(req)
-        return response
+        try:
+            return await pipeline.run(req)
+        finally:
+            await pipeline.close()
     
     try:
         response = asyncio.run(_run())
@@ -59,6 +75,217 @@ def run(
         raise typer.Exit(1)
 
 
+def _read_requests(path: str, max_results: int, force_local: bool):
+    """
+    Read one query or SearchRequest JSON object per line, exiting on a bad line or an empty file.
+    """
+    from perplexity_core.contracts import SearchRequest
+    
+    requests = []
+    with (sys.stdin if path == "-" else open(path, encoding="utf-8")) as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                if line.startswith("{"):
+                    requests.append(SearchRequest.model_validate_json(line))
+                else:
+                    requests.append(SearchRequest(query=line, maxResults=max_results, forceLocal=force_local))
+            except Exception as e:
+                print(f"Error: line {number}: {e}", file=sys.stderr)
+                raise typer.Exit(1)
+    if not requests:
+        print("Error: no queries given", file=sys.stderr)
+        raise typer.Exit(1)
+    return requests
+
+
+@app.command()
+def batch(
+    path: str = typer.Argument("-", help="File with one query or SearchRequest JSON object per line ('-' for stdin)"),
+    concurrency: Optional[int] = typer.Option(None, "--concurrency", "-c", help="Searches to run at once (defaults to BATCH_CONCURRENCY)"),
+    max_results: int = typer.Option(6, "--max-results", "-m", help="Maximum number of results for plain-text queries"),
+    force_local: bool = typer.Option(False, "--local", "-l", help="Force using local LLM (Ollama) for plain-text queries")
+):
+    """
+    Run many searches and print one JSON result per line as each finishes.
+    """
+    from perplexity_core.pipeline.runner import Pipeline
+    from perplexity_core.pipeline.batch import run_batch
+    
+    requests = _read_requests(path, max_results, force_local)
+    
+    # Run the batch, printing results as they finish
+    async def _run():
+        pipeline = Pipeline()
+        failed = 0
+        try:
+            async for result in run_batch(pipeline, requests, concurrency):
+                print(result.model_dump_json(), flush=True)
+                failed += result.error is not None
+        finally:
+            await pipeline.close()
+        return failed
+    
+    failed = asyncio.run(_run())
+    if failed:
+        print(f"{failed} of {len(requests)} searches failed", file=sys.stderr)
+        raise typer.Exit(1)
+
+
+def _format_ms(value) -> str:
+    return "-" if value is None else f"{value:.0f}"
+
+
+def _print_row(row) -> None:
+    hits = "-" if row["hitRatio"] is None else f"{row['hitRatio']:.0%}"
+    memory = "-" if row["memoryMb"] is None else f"{row['memoryMb']:.0f}"
+    print(f"{row['t']:>7.0f} {row['offered']:>8.1f} {row['throughput']:>7.1f} {_format_ms(row['p50Ms']):>7} "
+          f"{_format_ms(row['p95Ms']):>7} {_format_ms(row['p99Ms']):>7} {row['errorRate']:>6.1%} {hits:>5} "
+          f"{row['dropped']:>7} {row['inflight']:>8} {_format_ms(row['lagP99Ms']):>7} {memory:>6}", flush=True)
+
+
+def _print_summary(summary) -> None:
+    latency = summary["latencyMs"]
+    memory = summary["memoryMb"]
+    hits = "-" if summary["hitRatio"] is None else f"{summary['hitRatio']:.1%}"
+    print()
+    print(f"{summary['sent']} sent in {summary['durationS']:.0f}s to {summary['target']}: "
+          f"{summary['completed']} completed ({summary['throughput']:.1f}/s, best interval "
+          f"{summary['maxThroughput']:.1f}/s), {summary['failed']} failed, {summary['dropped']} dropped, "
+          f"{summary['unfinished']} unfinished")
+    print(f"errors: {summary['errorRate']:.2%} {summary['errors'] or ''}  cache hits: {hits}")
+    print("latency ms: " + "  ".join(f"{name} {_format_ms(latency[name])}" for name in ("p50", "p90", "p95", "p99", "max")))
+    total = sum(bucket["count"] for bucket in summary["histogram"]) or 1
+    for bucket in summary["histogram"]:
+        if bucket["count"]:
+            bound = "+Inf" if bucket["leMs"] is None else f"{bucket['leMs']:.0f}"
+            print(f"  <= {bound:>6} ms {bucket['count']:>8}  {'#' * round(40 * bucket['count'] / total)}")
+    print(f"event-loop lag ms: p99 {_format_ms(summary['lagMs']['p99'])}  max {_format_ms(summary['lagMs']['max'])}")
+    if memory["end"] is not None:
+        growth = "" if memory["growthPerHour"] is None else f", trend {memory['growthPerHour']:+.1f} MB/h"
+        print(f"memory MB: start {_format_ms(memory['start'])}  end {memory['end']:.0f}  peak {memory['peak']:.0f}{growth}")
+    saturation = summary["saturation"]
+    if saturation:
+        print(f"saturated at {saturation['t']:.0f}s: offered {saturation['offered']:.1f}/s, "
+              f"completed {saturation['throughput']:.1f}/s")
+
+
+@app.command()
+def loadtest(
+    path: str = typer.Argument(..., help="File with one query or SearchRequest JSON object per line ('-' for stdin)"),
+    rate: float = typer.Option(5.0, "--rate", "-r", help="Requests arriving per second"),
+    ramp_to: Optional[float] = typer.Option(None, "--ramp-to", help="Raise the rate linearly to this over the run, to find the saturation point"),
+    duration: float = typer.Option(60.0, "--duration", "-d", help="Seconds to send requests for"),
+    repeat: float = typer.Option(0.0, "--repeat", help="Share of requests repeating an earlier query (0-1), to exercise the cache"),
+    url: Optional[str] = typer.Option(None, "--url", help="API base URL to load; defaults to a pipeline in this process"),
+    replay: Optional[str] = typer.Option(None, "--replay", help="Answer provider calls from a recorded cassette (in-process only)"),
+    latency_scale: float = typer.Option(1.0, "--latency-scale", help="Multiplier on the cassette's recorded latencies"),
+    errors: Optional[str] = typer.Option(None, "--errors", help="Injected provider failures with --replay, e.g. firecrawl=0.1:timeout"),
+    arrivals: str = typer.Option("poisson", "--arrivals", help="Arrival process: poisson or uniform"),
+    max_inflight: int = typer.Option(1000, "--max-inflight", help="Drop arrivals while this many requests are outstanding"),
+    interval: float = typer.Option(10.0, "--interval", help="Seconds per report row"),
+    seed: int = typer.Option(0, "--seed", help="Seed for arrivals, repeats and injected failures"),
+    json_output: bool = typer.Option(False, "--json", help="Print report rows and the summary as JSON lines"),
+    max_error_rate: Optional[float] = typer.Option(None, "--max-error-rate", help="Exit with status 1 if the error rate is above this (0-1)"),
+    max_results: int = typer.Option(6, "--max-results", "-m", help="Maximum number of results for plain-text queries"),
+    force_local: bool = typer.Option(False, "--local", "-l", help="Force using local LLM (Ollama) for plain-text queries")
+):
+    """
+    Send open-loop load to the API or an in-process pipeline and report latency, errors, cache hits, lag and memory.
+    """
+    from perplexity_core.loadtest import ApiTarget, LoadTest, PipelineTarget, QueryMix
+    
+    if url and replay:
+        print("Error: --replay applies to the in-process pipeline, not --url", file=sys.stderr)
+        raise typer.Exit(1)
+    requests = _read_requests(path, max_results, force_local)
+    
+    def on_interval(row):
+        if json_output:
+            print(json.dumps({"interval": row}), flush=True)
+        else:
+            _print_row(row)
+    
+    async def _run():
+        if url:
+            target = ApiTarget(url)
+        else:
+            from perplexity_core.pipeline.runner import Pipeline
+            if replay:
+                from perplexity_core import http_client
+                from perplexity_core.replay import Cassette, ReplayTransport, apply_settings, parse_specs
+                cassette = Cassette.load(replay)
+                apply_settings(cassette)
+                http_client.set_transport(ReplayTransport(cassette, errors=parse_specs(errors),
+                                                          latency_scale=latency_scale, seed=seed))
+            target = PipelineTarget(Pipeline())
+        test = LoadTest(target, QueryMix(requests, repeat, seed=seed), rate, duration, rate_end=ramp_to,
+                        arrivals=arrivals, max_inflight=max_inflight, interval_s=interval, seed=seed,
+                        on_interval=on_interval)
+        if not json_output:
+            print(f"{'time s':>7} {'offered':>8} {'done/s':>7} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} "
+                  f"{'errors':>6} {'hits':>5} {'dropped':>7} {'inflight':>8} {'lag ms':>7} {'MB':>6}")
+        try:
+            return await test.run()
+        finally:
+            await target.close()
+    
+    try:
+        summary = asyncio.run(_run())
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        raise typer.Exit(1)
+    if json_output:
+        print(json.dumps({"summary": summary}))
+    else:
+        _print_summary(summary)
+    if max_error_rate is not None and summary["errorRate"] > max_error_rate:
+        raise typer.Exit(1)
+
+
+@app.command()
+def warm(
+    path: Optional[str] = typer.Argument(None, help="File with one query or SearchRequest JSON object per line (defaults to WARM_QUERIES_PATH)"),
+    history: Optional[bool] = typer.Option(None, "--history/--no-history", help="Rank by the query history (defaults to RECORDS_ENABLED)"),
+    top: Optional[int] = typer.Option(None, "--top", "-n", help="Most requested queries to consider (defaults to WARM_TOP_N)"),
+    rate: Optional[float] = typer.Option(None, "--rate", "-r", help="Refreshes started per second (defaults to WARM_RATE)"),
+    concurrency: Optional[int] = typer.Option(None, "--concurrency", "-c", help="Refreshes running at once (defaults to WARM_CONCURRENCY)"),
+    refresh_before: Optional[int] = typer.Option(None, "--refresh-before", help="Refresh answers expiring within this many seconds (defaults to WARM_REFRESH_BEFORE_S)"),
+    force: bool = typer.Option(False, "--force", help="Refresh every candidate, even if its cached answer is fresh"),
+    loop: bool = typer.Option(False, "--loop", help="Keep warming every WARM_INTERVAL_S instead of making one pass")
+):
+    """
+    Refresh the cached answers of popular queries before they expire, e.g. after a deploy or a Redis flush.
+    """
+    from perplexity_core.config import settings
+    from perplexity_core.pipeline.runner import Pipeline
+    from perplexity_core.pipeline.warmer import CacheWarmer
+    
+    async def _run():
+        pipeline = Pipeline()
+        warmer = CacheWarmer(pipeline, path=path, history=history, top_n=top, rate=rate,
+                             concurrency=concurrency, refresh_before_s=refresh_before)
+        if not warmer.history and not warmer.path:
+            print("Error: give a queries file or enable --history", file=sys.stderr)
+            raise typer.Exit(1)
+        try:
+            while True:
+                results = await warmer.warm_once(force=force)
+                print(json.dumps(results), flush=True)
+                if not loop:
+                    return results
+                await asyncio.sleep(settings.WARM_INTERVAL_S)
+        finally:
+            await warmer.stop()
+            await pipeline.close()
+    
+    results = asyncio.run(_run())
+    if results["failed"]:
+        raise typer.Exit(1)
+
+
 @app.command()
 def serve(
     host: str = typer.Option("0.0.0.0", "--host", "-h", help="Host to bind to"),
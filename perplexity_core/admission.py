@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+from .config import settings
+from .metrics import counter, gauge, histogram
+
+
+logger = logging.getLogger(__name__)
+
+IN_FLIGHT = gauge(
+    "admission_in_flight",
+    "Search requests currently admitted"
+)
+QUEUE_DEPTH = gauge(
+    "admission_queue_depth",
+    "Search requests waiting for admission"
+)
+LIMIT = gauge(
+    "admission_limit",
+    "Current adaptive in-flight limit"
+)
+WAIT_SECONDS = histogram(
+    "admission_wait_seconds",
+    "Time admitted search requests waited for a slot"
+)
+SHED = counter(
+    "admission_shed_total",
+    "Search requests turned away by reason (queue_full, timeout) and whether a cached answer was served",
+    ("reason", "served")
+)
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request cannot be admitted.
+
+    status is 429 when the wait queue is full and 503 when the wait timed
+    out; retry_after is a suggested delay in seconds.
+    """
+
+    def __init__(self, reason: str, status: int, retry_after: int):
+        super().__init__(f"Server overloaded ({reason}), retry in {retry_after}s")
+        self.reason = reason
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    In-flight limit with a short FIFO wait queue in front of the pipeline.
+
+    The limit adapts additive-increase/multiplicative-decrease style to the
+    latency of admitted requests: it grows by one after `limit` consecutive
+    requests finish within ADMISSION_TARGET_LATENCY_S, and is multiplied by
+    ADMISSION_DECREASE when one takes longer (at most once per target
+    interval, so one slow burst counts once). Requests beyond the queue are
+    rejected at once instead of slowing everyone down.
+    """
+
+    def __init__(self, limit: Optional[int] = None, min_limit: Optional[int] = None,
+                 max_limit: Optional[int] = None, queue_size: Optional[int] = None,
+                 queue_timeout: Optional[float] = None, target_latency: Optional[float] = None):
+        self.min_limit = max(1, min_limit or settings.ADMISSION_MIN_CONCURRENCY)
+        self.max_limit = max(self.min_limit, max_limit or settings.ADMISSION_MAX_CONCURRENCY)
+        self.limit = float(min(max(limit or settings.ADMISSION_CONCURRENCY, self.min_limit), self.max_limit))
+        self.queue_size = queue_size if queue_size is not None else settings.ADMISSION_QUEUE_SIZE
+        self.queue_timeout = queue_timeout if queue_timeout is not None else settings.ADMISSION_QUEUE_TIMEOUT_S
+        self.target_latency = target_latency or settings.ADMISSION_TARGET_LATENCY_S
+        self.active = 0
+        self.latency: Optional[float] = None  # moving average of admitted request latency
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._within_target = 0
+        self._last_decrease = 0.0
+        self._update_metrics()
+
+    def depth(self) -> int:
+        """
+        Number of requests waiting for a slot.
+        """
+        return sum(1 for future in self._waiters if not future.done())
+
+    def busy(self, share: float) -> bool:
+        """
+        Whether requests are waiting or at least `share` of the limit is in use; background work holds off while true.
+        """
+        return self.depth() > 0 or self.active >= share * int(self.limit)
+
+    def _update_metrics(self) -> None:
+        IN_FLIGHT.set(self.active)
+        QUEUE_DEPTH.set(self.depth())
+        LIMIT.set(int(self.limit))
+
+    def retry_after(self) -> int:
+        """
+        Seconds until the queue ahead is expected to drain, between 1 and 60.
+        """
+        latency = self.latency if self.latency is not None else self.target_latency
+        return max(1, min(60, math.ceil(latency * (self.depth() + 1) / max(1, int(self.limit)))))
+
+    def _wake(self) -> None:
+        while self._waiters and self.active < int(self.limit):
+            future = self._waiters.popleft()
+            if not future.done():
+                self.active += 1
+                future.set_result(None)
+        self._update_metrics()
+
+    async def acquire(self) -> None:
+        """
+        Wait for a slot.
+
+        Raises:
+            Overloaded: If the wait queue is full or no slot frees up within ADMISSION_QUEUE_TIMEOUT_S
+        """
+        if not settings.ADMISSION_ENABLED:
+            return
+        if self.active < int(self.limit) and not self.depth():
+            self.active += 1
+            self._update_metrics()
+            return
+        if self.depth() >= self.queue_size:
+            raise Overloaded("queue_full", 429, self.retry_after())
+
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._update_metrics()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise Overloaded("timeout", 503, self.retry_after()) from None
+        except asyncio.CancelledError:
+            # The slot may have been handed over just as the caller gave up
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            self._update_metrics()
+        WAIT_SECONDS.observe(time.perf_counter() - started)
+
+    def release(self, latency: Optional[float] = None) -> None:
+        """
+        Free a slot, adapting the limit to the request's latency when given.
+        """
+        if not settings.ADMISSION_ENABLED:
+            return
+        self.active -= 1
+        if latency is not None:
+            self._observe(latency)
+        self._wake()
+
+    def _observe(self, latency: float) -> None:
+        self.latency = latency if self.latency is None else self.latency + 0.2 * (latency - self.latency)
+        if latency > self.target_latency:
+            self._within_target = 0
+            now = time.monotonic()
+            if now - self._last_decrease >= self.target_latency and self.limit > self.min_limit:
+                self.limit = max(float(self.min_limit), self.limit * settings.ADMISSION_DECREASE)
+                self._last_decrease = now
+                logger.info("Request took %.1fs, admission limit lowered to %d", latency, int(self.limit))
+            return
+        self._within_target += 1
+        if self._within_target >= int(self.limit) and self.limit < self.max_limit:
+            self.limit = min(float(self.max_limit), self.limit + 1)
+            self._within_target = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Hold a slot for the block, feeding its duration back into the limit.
+
+        acquire and release admit everything when ADMISSION_ENABLED is off.
+        """
+        await self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "inFlight": self.active,
+            "queued": self.depth(),
+            "latencyS": round(self.latency, 3) if self.latency is not None else None,
+        }
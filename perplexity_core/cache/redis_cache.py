@@ -1,5 +1,6 @@
 import redis
 import json
+import time
 from typing import Optional, Any
 from ..config import settings
 
@@ -31,6 +32,37 @@ class Cache:
         except Exception:
             return False
     
+    async def ttl(self, key: str) -> Optional[int]:
+        """
+        Seconds until a cached query result expires: 0 if it is not cached, None if it never expires or Redis failed.
+        """
+        try:
+            remaining = self.redis_client.ttl(f"q:{key}")
+        except Exception:
+            return None
+        if remaining == -2:
+            return 0
+        return remaining if remaining >= 0 else None
+    
+    async def get_stale(self, key: str) -> Optional[str]:
+        """
+        Get the long-lived copy of a query result, served when shedding load.
+        """
+        try:
+            return self.redis_client.get(f"s:{key}")
+        except Exception:
+            return None
+    
+    async def set_stale(self, key: str, value: str, ttl: int = 86400) -> bool:
+        """
+        Keep a copy of a query result for longer than the query cache TTL.
+        """
+        try:
+            self.redis_client.setex(f"s:{key}", ttl, value)
+            return True
+        except Exception:
+            return False
+    
     async def get_url_content(self, url_key: str) -> Optional[dict]:
         """
         Get cached URL content.
@@ -50,4 +82,31 @@ class Cache:
             self.redis_client.expire(f"u:{url_key}", ttl)
             return True
         except Exception:
-            return False
\ No newline at end of file
+            return False
+    
+    async def get_llm_response(self, key: str) -> Optional[str]:
+        """
+        Get a cached LLM response.
+        """
+        try:
+            return self.redis_client.get(f"l:{key}")
+        except Exception:
+            return None
+    
+    async def set_llm_response(self, key: str, value: str, ttl: int = 3600, max_entries: int = 10000) -> bool:
+        """
+        Cache an LLM response, evicting the oldest responses beyond max_entries.
+        """
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.setex(f"l:{key}", ttl, value)
+            pipe.zadd("l:index", {key: time.time()})
+            pipe.zcard("l:index")
+            _, _, size = pipe.execute()
+            if size > max_entries:
+                evicted = self.redis_client.zpopmin("l:index", size - max_entries)
+                if evicted:
+                    self.redis_client.delete(*(f"l:{old_key}" for old_key, _ in evicted))
+            return True
+        except Exception:
+            return False
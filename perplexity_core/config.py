@@ -15,27 +15,128 @@ class Settings(BaseSettings):
     
     # Extraction
     FIRECRAWL_API_KEY: Optional[str] = None
-    
+    RANK_QUERY_RELEVANCE: bool = False  # add lexical title/snippet relevance to rank scores (~60 us per candidate)
+    EXTRACT_PRESELECT: bool = True  # rerank snippets to skip URLs not worth extracting
+    EXTRACT_MIN_DOCS: int = 3
+    EXTRACT_COVERAGE: float = 0.9  # share of query terms the selected snippets must cover
+    EXTRACT_PDF_MAX_BYTES: int = 5_000_000
+    BOILERPLATE_FILTER: bool = True
+    BOILERPLATE_WINDOW: int = 50  # pages remembered per domain
+    BOILERPLATE_MIN_PAGES: int = 3  # block must appear on at least this many pages
+    BOILERPLATE_MIN_RATIO: float = 0.3  # ...and on this share of the domain window
+    BOILERPLATE_MAX_DOMAINS: int = 2000
+
     # LLMs
     OPENROUTER_API_KEY: Optional[str] = None
     OPENROUTER_MODEL: str = "x-ai/grok-4-fast:free"
     OLLAMA_HOST: str = "http://host.docker.internal:11434"
     OLLAMA_MODEL: str = "qwen3:4b"
+    OLLAMA_TIMEOUT_S: float = 120.0
+    OLLAMA_KEEP_ALIVE: str = "30m"  # sent with every request; "-1" keeps the model loaded, "0" unloads
+    OLLAMA_WARMUP: bool = True  # preload the model when the API starts
+    OLLAMA_KEEPALIVE_IDLE_S: int = 1800  # reload an evicted model only if used this recently
+    OLLAMA_KEEPALIVE_CHECK_S: int = 60
+    LLM_STRUCTURED_OUTPUT: bool = True  # send the response schema via format/response_format
+    
+    # LLM scheduler (per-backend concurrency caps and priority queues)
+    LLM_SCHEDULER_ENABLED: bool = True
+    LLM_OLLAMA_CONCURRENCY: int = 1  # local inference slows down with parallel requests
+    LLM_OPENROUTER_CONCURRENCY: int = 8
+    LLM_QUEUE_TIMEOUT_S: float = 30.0  # queue deadline before falling back or failing
+    LLM_LOCAL_MAX_QUEUE: int = 4  # Ollama queue depth at which calls overflow to OpenRouter
+    LLM_LOCAL_FALLBACK: bool = False  # let Ollama calls, including forceLocal ones, overflow to OpenRouter
+    
+    # LLM response cache (Redis, keyed on model, parameters and prompts)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_NORMALIZE_S: int = 604800  # 7 days
+    LLM_CACHE_TTL_SYNTHESIS_S: int = 3600
+    LLM_CACHE_TTL_REPAIR_S: int = 86400
+    LLM_CACHE_MAX_ENTRIES: int = 10000
+    LLM_CACHE_MAX_BYTES: int = 65536  # larger responses are not cached
+    LLM_CACHE_MAX_TEMPERATURE: float = 0.3  # sampling above this is not cached
+    
+    # Query normalization
+    NORMALIZE_MODE: str = "speculative"  # search the raw query while normalizing; or "blocking", "off"
+    NORMALIZE_CLASSIFIER: bool = True  # skip normalization for queries that already read as searches
+    NORMALIZE_MIN_CHANGE: float = 0.4  # term distance at which the normalized query is searched too
+    NORMALIZE_MERGE: str = "merge"  # or "replace": drop the raw-query results
     
     # Storage/Caching
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     POSTGRES_HOST: str = "localhost"
+    POSTGRES_PORT: int = 5432
     POSTGRES_DB: str = "perplex"
     POSTGRES_USER: str = "perplex"
     POSTGRES_PASSWORD: str = "perplex"
     
+    # Local document store (SQLite FTS5)
+    DOCSTORE_ENABLED: bool = True
+    DOCSTORE_PATH: str = "data/documents.db"
+    DOCSTORE_MAX_AGE_S: int = 2592000  # 30 days; older documents are re-extracted
+    DOCSTORE_PREFER_LOCAL: bool = False  # answer from the store before calling web search
+    DOCSTORE_MIN_LOCAL_RESULTS: int = 3
+    
+    # Query history (InternalRecord rows written behind the request path)
+    RECORDS_ENABLED: bool = False
+    RECORDS_BACKEND: str = "postgres"  # or "sqlite" (RECORDS_SQLITE_PATH), for local runs and tests
+    RECORDS_SQLITE_PATH: str = "data/records.db"
+    RECORDS_BUFFER_SIZE: int = 10000  # records waiting to be written; beyond this RECORDS_OVERFLOW applies
+    RECORDS_OVERFLOW: str = "drop"  # or "block": wait up to RECORDS_BLOCK_TIMEOUT_S for space, then drop
+    RECORDS_BLOCK_TIMEOUT_S: float = 0.1
+    RECORDS_BATCH_SIZE: int = 500  # rows per COPY / insert
+    RECORDS_FLUSH_INTERVAL_S: float = 1.0  # longest a record waits for its batch to fill
+    
+    # Cache warmer (refreshes popular answers before they expire)
+    WARM_ENABLED: bool = False  # run the warmer inside the API process
+    WARM_INTERVAL_S: float = 60.0  # time between passes over the popular queries
+    WARM_TOP_N: int = 100  # queries considered per pass, most requested first
+    WARM_REFRESH_BEFORE_S: int = 300  # refresh answers expiring within this many seconds
+    WARM_RATE: float = 0.5  # refreshes started per second
+    WARM_CONCURRENCY: int = 2  # refreshes running at once
+    WARM_MAX_LOAD: float = 0.5  # pause while live requests fill this share of the admission limit
+    WARM_HISTORY_HOURS: int = 24  # query history window counted for popularity (RECORDS_BACKEND)
+    WARM_QUERIES_PATH: str = ""  # optional file of queries to keep warm, one query or SearchRequest JSON per line
+    WARM_TRACK_SIZE: int = 1000  # queries whose live request counts the API tracks while warming
+    WARM_HALF_LIFE_S: float = 3600.0  # decay of the live request counts
+    
+    # Safety guard rules (word-boundary lexicon compiled into one regex)
+    SAFETY_RULES_PATH: str = ""  # JSON rules file; empty for the bundled perplexity_core/safety/rules.json
+    SAFETY_RELOAD_INTERVAL_S: float = 5.0  # how often the file is checked for changes; 0 disables reloading
+    
+    # Passage embeddings (requires numpy)
+    VECTOR_ENABLED: bool = True
+    VECTOR_EMBEDDER: str = "hashing"  # or "sentence-transformers"
+    VECTOR_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    VECTOR_DIM: int = 512  # hashing embedder only
+    VECTOR_INDEX_PATH: Optional[str] = "data/passages"  # empty for in-memory
+    VECTOR_PASSAGE_WORDS: int = 120
+    
+    # Admission control for the search endpoints (in-flight limit adapted to latency)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_CONCURRENCY: int = 8  # starting in-flight limit
+    ADMISSION_MIN_CONCURRENCY: int = 2
+    ADMISSION_MAX_CONCURRENCY: int = 32
+    ADMISSION_QUEUE_SIZE: int = 16  # requests waiting for a slot before 429s
+    ADMISSION_QUEUE_TIMEOUT_S: float = 2.0  # wait before a 503
+    ADMISSION_TARGET_LATENCY_S: float = 15.0  # slower requests shrink the limit
+    ADMISSION_DECREASE: float = 0.7  # limit multiplier on a slow request
+    STALE_TTL_S: int = 86400  # stale answers kept for shedding load; 0 disables
+    
     # Python runner settings
     RUNNER: str = "python"  # or "n8n"
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8080
     LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # or "json"
+    LOG_SAMPLE_RATE: float = 0.1  # share of requests whose per-URL debug records are kept
+    LOG_FLUSH_INTERVAL_S: float = 0.05  # how often the background writer drains the queue
+    LOG_QUEUE_SIZE: int = 10000  # queued records beyond this drop the oldest
     MAX_CONCURRENCY: int = 6
+    PIPELINE_EXECUTOR: str = "sequential"  # or "dataflow": extract URLs while search and normalization finish
+    DATAFLOW_QUEUE_SIZE: int = 8  # bound on each queue between dataflow stages
+    BATCH_CONCURRENCY: int = 4  # searches running at once across all batches
+    BATCH_MAX_REQUESTS: int = 1000  # per /api/search/batch call
     REQUEST_TIMEOUT_S: int = 20
     CACHE_TTL_S: int = 3600  # 1 hour default
     
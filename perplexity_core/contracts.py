@@ -17,6 +17,7 @@ class SearchRequest(BaseModel):
     includeDomains: Optional[List[str]] = None
     excludeDomains: Optional[List[str]] = None
     ui: UIOptions = Field(default_factory=UIOptions)
+    trace: bool = False  # include per-stage spans in diagnostics
 
 
 class Source(BaseModel):
@@ -27,12 +28,21 @@ class Source(BaseModel):
     relevance: float
 
 
+class Span(BaseModel):
+    name: str
+    startMs: float  # offset from the start of the run
+    durationMs: float
+    attrs: Optional[Dict[str, Any]] = None
+
+
 class Diagnostics(BaseModel):
     searchProvider: Optional[str] = None
     llm: Optional[str] = None
     latencyMs: Optional[int] = None
     cached: bool = False
     tokens: Optional[Dict[str, int]] = None
+    llmLoadMs: Optional[int] = None  # Ollama model load time; large values mean a cold start
+    spans: Optional[List[Span]] = None  # only when the request sets trace
     notes: Optional[str] = None
 
 
@@ -51,6 +61,18 @@ class SearchResult(BaseModel):
     published: Optional[str] = None
 
 
+class BatchSearchRequest(BaseModel):
+    requests: List[SearchRequest] = Field(min_length=1)
+    concurrency: Optional[int] = Field(default=None, ge=1)  # capped at BATCH_CONCURRENCY
+
+
+class BatchResult(BaseModel):
+    index: int  # position in BatchSearchRequest.requests
+    query: str
+    response: Optional[SearchResponse] = None
+    error: Optional[str] = None
+
+
 class InternalRecord(BaseModel):
     id: Optional[int] = None
     query: str
@@ -0,0 +1,132 @@
+import hashlib
+import re
+from collections import Counter, OrderedDict
+from typing import Dict, FrozenSet, List, Optional
+from ..config import settings
+from ..rank.ranker import get_domain
+from ..util.urls import canonicalize_url
+
+
+_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(block: str) -> int:
+    """
+    Fingerprint a text block, ignoring case and whitespace differences.
+    """
+    normalized = _SPACES.sub(' ', block.lower()).strip()
+    digest = hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class _DomainWindow:
+    """
+    Rolling window of block fingerprints for the last N distinct pages of a domain.
+
+    Pages are keyed by canonical URL: fetching a page again replaces its
+    entry instead of adding another, so re-extracting a popular page never
+    makes its own paragraphs look like they appear across many pages.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self.pages: "OrderedDict[str, FrozenSet[int]]" = OrderedDict()
+        self.counts: Counter = Counter()
+
+    def _forget(self, prints: FrozenSet[int]) -> None:
+        for fp in prints:
+            self.counts[fp] -= 1
+            if self.counts[fp] <= 0:
+                del self.counts[fp]
+
+    def add(self, url: str, prints: FrozenSet[int]) -> None:
+        previous = self.pages.pop(url, None)
+        if previous is not None:
+            self._forget(previous)
+        elif len(self.pages) >= self.size:
+            _, evicted = self.pages.popitem(last=False)
+            self._forget(evicted)
+        self.pages[url] = prints
+        self.counts.update(prints)
+
+
+class BoilerplateFilter:
+    """
+    Cross-document boilerplate remover.
+
+    Keeps a rolling per-domain frequency table of block fingerprints and
+    strips blocks (cookie banners, nav menus, footers) that show up on many
+    distinct pages of the same domain.
+    """
+
+    def __init__(self, window: Optional[int] = None, min_pages: Optional[int] = None,
+                 min_ratio: Optional[float] = None, max_domains: Optional[int] = None):
+        self.window = window or settings.BOILERPLATE_WINDOW
+        self.min_pages = min_pages or settings.BOILERPLATE_MIN_PAGES
+        self.min_ratio = min_ratio if min_ratio is not None else settings.BOILERPLATE_MIN_RATIO
+        self.max_domains = max_domains or settings.BOILERPLATE_MAX_DOMAINS
+        self._domains: "OrderedDict[str, _DomainWindow]" = OrderedDict()
+
+    def _window_for(self, domain: str) -> _DomainWindow:
+        table = self._domains.get(domain)
+        if table is None:
+            table = _DomainWindow(self.window)
+            self._domains[domain] = table
+            # Bound memory by forgetting the least recently seen domains
+            while len(self._domains) > self.max_domains:
+                self._domains.popitem(last=False)
+        else:
+            self._domains.move_to_end(domain)
+        return table
+
+    def is_boilerplate(self, domain: str, fp: int) -> bool:
+        """
+        Check whether a fingerprint is frequent enough on a domain to be boilerplate.
+        """
+        table = self._domains.get(domain)
+        if table is None:
+            return False
+        count = table.counts.get(fp, 0)
+        return count >= self.min_pages and count / len(table.pages) >= self.min_ratio
+
+    def strip(self, url: str, text: Optional[str], observe: bool = True) -> str:
+        """
+        Remove boilerplate blocks from raw (not yet whitespace-collapsed) text.
+
+        Args:
+            url: URL the text was extracted from
+            text: Raw text with one block per line
+            observe: Whether to record this page in the domain frequency table (replacing
+                an earlier fetch of the same URL)
+
+        Returns:
+            Text with boilerplate blocks removed
+        """
+        if not text:
+            return ""
+
+        domain = get_domain(url)
+        if not domain:
+            return text
+
+        blocks = [line for line in text.splitlines() if line.strip()]
+        prints = [fingerprint(block) for block in blocks]
+
+        table = self._window_for(domain)
+        if observe:
+            table.add(canonicalize_url(url), frozenset(prints))
+
+        kept: List[str] = [
+            block for block, fp in zip(blocks, prints)
+            if not self.is_boilerplate(domain, fp)
+        ]
+        return "\n".join(kept)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the size of the frequency table.
+        """
+        return {
+            "domains": len(self._domains),
+            "fingerprints": sum(len(t.counts) for t in self._domains.values()),
+        }
@@ -0,0 +1,84 @@
+import hashlib
+import logging
+import re
+from typing import List, Dict, Any
+from ..log import SAMPLED
+from ..registry import lazy_module
+
+# Imported on first use; None when not installed (optional: pip install perplexity-engine[vector])
+np = lazy_module("numpy")
+
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """
+    64-bit SimHash of a text over word shingles.
+
+    Near-identical texts (syndicated copies, the same article with a
+    different header) land within a few bits of each other.
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < shingle:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = [" ".join(words[i:i + shingle]) for i in range(len(words) - shingle + 1)]
+    if not shingles:
+        return 0
+
+    digests = b"".join(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest() for item in set(shingles))
+    count = len(digests) // 8
+
+    if np is not None:
+        # Per-bit vote over all shingles in one pass
+        bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(count, 8), axis=1)
+        votes = bits.sum(axis=0, dtype=np.int64) * 2 > count
+        return int.from_bytes(np.packbits(votes).tobytes(), 'big')
+
+    weights = [0] * 64
+    for i in range(count):
+        h = int.from_bytes(digests[i * 8:(i + 1) * 8], 'big')
+        for bit in range(64):
+            weights[63 - bit] += 1 if h >> bit & 1 else -1
+
+    value = 0
+    for position, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << (63 - position)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    """
+    Number of differing bits between two fingerprints.
+    """
+    return (a ^ b).bit_count()
+
+
+def dedupe_documents(docs: List[Dict[str, Any]], max_distance: int = 3,
+                     min_words: int = 50) -> List[Dict[str, Any]]:
+    """
+    Drop documents whose content is a near-duplicate of an earlier one.
+
+    Documents are compared in order and the first copy is kept; both
+    executors pass them in rank order, so that is the best-ranked copy. Very
+    short documents are always kept since their fingerprints are unreliable.
+    """
+    kept: List[Dict[str, Any]] = []
+    prints: List[int] = []
+    for doc in docs:
+        text = doc.get("text") or doc.get("markdown") or ""
+        if len(text.split()) < min_words:
+            kept.append(doc)
+            continue
+        fp = simhash(text)
+        duplicate_of = next((i for i, other in enumerate(prints) if hamming(fp, other) <= max_distance), None)
+        if duplicate_of is not None:
+            logger.debug("Dropping near-duplicate document: %s", doc.get("url"), extra=SAMPLED)
+            continue
+        prints.append(fp)
+        kept.append(doc)
+    return kept
@@ -1,8 +1,16 @@
 import httpx
 import asyncio
+import logging
 from typing import List, Dict, Any, Optional
 from ..config import settings
+from ..http_client import new_client
 from ..util.text import clean_text
+from ..tracing import span
+from ..log import SAMPLED
+from .boilerplate import BoilerplateFilter
+
+
+logger = logging.getLogger(__name__)
 
 
 class FirecrawlExtractor:
@@ -10,11 +18,12 @@ class FirecrawlExtractor:
     Firecrawl extraction implementation.
     """
     
-    def __init__(self):
+    def __init__(self, boilerplate: Optional[BoilerplateFilter] = None):
         if not settings.FIRECRAWL_API_KEY:
             raise ValueError("FIRECRAWL_API_KEY is not configured")
         self.api_key = settings.FIRECRAWL_API_KEY
         self.base_url = "https://api.firecrawl.dev/v1"
+        self.boilerplate = boilerplate
     
     async def extract(self, url: str) -> Optional[Dict[str, Any]]:
         """
@@ -30,7 +39,7 @@ class FirecrawlExtractor:
             "url": url
         }
         
-        async with httpx.AsyncClient() as client:
+        async with new_client() as client:
             try:
                 response = await client.post(
                     f"{self.base_url}/scrape",
@@ -44,24 +53,36 @@ class FirecrawlExtractor:
                 # Handle the response format correctly
                 if data.get("success"):
                     result_data = data.get("data", {})
+                    markdown = result_data.get("markdown", "")
+                    text = result_data.get("text", markdown)
+                    
+                    # Strip cross-page boilerplate before whitespace is collapsed
+                    if self.boilerplate:
+                        raw_markdown = markdown
+                        markdown = self.boilerplate.strip(url, raw_markdown)
+                        if text == raw_markdown:
+                            text = markdown
+                        else:
+                            text = self.boilerplate.strip(url, text, observe=False)
+                    
                     result = {
                         "url": url,
                         "title": result_data.get("metadata", {}).get("title", ""),
-                        "markdown": clean_text(result_data.get("markdown", "")),
-                        "text": clean_text(result_data.get("text", result_data.get("markdown", ""))),
+                        "markdown": clean_text(markdown),
+                        "text": clean_text(text),
                         "published": result_data.get("metadata", {}).get("published")
                     }
                     return result
                 else:
                     error_message = data.get("error", "Unknown error")
-                    print(f"Firecrawl API error for {url}: {error_message}")
+                    logger.warning("Firecrawl API error for %s: %s", url, error_message, extra=SAMPLED)
                     return None
                     
             except httpx.HTTPStatusError as e:
-                print(f"HTTP error extracting content from {url}: {e.response.status_code} - {e.response.text}")
+                logger.warning("HTTP error extracting content from %s: %d - %s", url, e.response.status_code, e.response.text, extra=SAMPLED)
                 return None
             except Exception as e:
-                print(f"Error extracting content from {url}: {e}")
+                logger.warning("Error extracting content from %s: %s", url, e, extra=SAMPLED)
                 return None
     
     async def extract_many(self, urls: List[str]) -> List[Dict[str, Any]]:
@@ -72,7 +93,10 @@ class FirecrawlExtractor:
         
         async def extract_with_semaphore(url):
             async with semaphore:
-                return await self.extract(url)
+                with span("extract.url", provider="firecrawl", url=url) as attrs:
+                    result = await self.extract(url)
+                    attrs["ok"] = result is not None
+                    return result
         
         tasks = [extract_with_semaphore(url) for url in urls]
         results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -83,6 +107,6 @@ class FirecrawlExtractor:
             if isinstance(result, dict) and result is not None:
                 valid_results.append(result)
             elif isinstance(result, Exception):
-                print(f"Extraction failed: {result}")
+                logger.warning("Extraction failed: %s", result)
         
         return valid_results
\ No newline at end of file
@@ -1,8 +1,15 @@
-import httpx
 import asyncio
+import logging
 from typing import List, Dict, Any, Optional
 from bs4 import BeautifulSoup
 from ..util.text import clean_text
+from ..tracing import span
+from ..log import SAMPLED
+from ..http_client import new_client
+from .boilerplate import BoilerplateFilter
+
+
+logger = logging.getLogger(__name__)
 
 
 class ReadabilityExtractor:
@@ -10,12 +17,15 @@ class ReadabilityExtractor:
     Fallback extractor using readability-lxml.
     """
     
+    def __init__(self, boilerplate: Optional[BoilerplateFilter] = None):
+        self.boilerplate = boilerplate
+    
     async def extract(self, url: str) -> Optional[Dict[str, Any]]:
         """
         Extract content from a URL using basic HTML parsing.
         """
         try:
-            async with httpx.AsyncClient() as client:
+            async with new_client() as client:
                 response = await client.get(url)
                 response.raise_for_status()
                 html_content = response.text
@@ -47,14 +57,18 @@ class ReadabilityExtractor:
             for selector in content_selectors:
                 content_element = soup.select_one(selector)
                 if content_element:
-                    content = content_element.get_text(separator=' ', strip=True)
+                    content = content_element.get_text(separator='\n', strip=True)
                     break
             
             # If no specific content found, use body
             if not content:
                 body = soup.find('body')
                 if body:
-                    content = body.get_text(separator=' ', strip=True)
+                    content = body.get_text(separator='\n', strip=True)
+            
+            # Strip cross-page boilerplate while blocks are still line-separated
+            if self.boilerplate:
+                content = self.boilerplate.strip(url, content)
             
             return {
                 "url": url,
@@ -64,14 +78,20 @@ class ReadabilityExtractor:
                 "published": None  # No publication date in basic extraction
             }
         except Exception as e:
-            print(f"Error extracting content from {url}: {e}")
+            logger.warning("Error extracting content from %s: %s", url, e, extra=SAMPLED)
             return None
     
     async def extract_many(self, urls: List[str]) -> List[Dict[str, Any]]:
         """
         Extract content from multiple URLs concurrently.
         """
-        tasks = [self.extract(url) for url in urls]
+        async def extract_traced(url):
+            with span("extract.url", provider="readability", url=url) as attrs:
+                result = await self.extract(url)
+                attrs["ok"] = result is not None
+                return result
+        
+        tasks = [extract_traced(url) for url in urls]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # Filter out None values and exceptions
@@ -80,6 +100,6 @@ class ReadabilityExtractor:
             if isinstance(result, dict) and result is not None:
                 valid_results.append(result)
             elif isinstance(result, Exception):
-                print(f"Extraction failed: {result}")
+                logger.warning("Extraction failed: %s", result)
         
         return valid_results
\ No newline at end of file
@@ -27,4 +27,19 @@ def url_key(url: str) -> str:
     """
     Generate a cache key for a URL.
     """
-    return hashlib.sha256(url.encode('utf-8')).hexdigest()
\ No newline at end of file
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def llm_key(provider: str, model: str, params: Dict[str, Any], system_prompt: str, user_prompt: str) -> str:
+    """
+    Generate a cache key for an LLM call from the provider, model, parameters and prompts.
+    """
+    key_data = {
+        "provider": provider,
+        "model": model,
+        "params": params,
+        "system": hashlib.sha256(system_prompt.encode('utf-8')).hexdigest(),
+        "user": hashlib.sha256(user_prompt.encode('utf-8')).hexdigest(),
+    }
+    key_string = json.dumps(key_data, sort_keys=True, default=str)
+    return hashlib.sha256(key_string.encode('utf-8')).hexdigest()
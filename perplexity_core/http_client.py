@@ -1,9 +1,36 @@
 import httpx
 import asyncio
 from contextlib import asynccontextmanager
+from typing import Optional
 from .config import settings
 
 
+# Transport for every client made by new_client(); None sends requests over
+# the network. The replay harness installs one that records or replays them.
+_transport: Optional[httpx.AsyncBaseTransport] = None
+
+
+def set_transport(transport: Optional[httpx.AsyncBaseTransport]) -> Optional[httpx.AsyncBaseTransport]:
+    """
+    Route all provider HTTP traffic through transport (None restores the network); returns the previous one.
+    
+    The transport is shared by every client, so its aclose() is called each
+    time a client closes and should leave it usable.
+    """
+    global _transport
+    previous, _transport = _transport, transport
+    return previous
+
+
+def new_client(**kwargs) -> httpx.AsyncClient:
+    """
+    An httpx.AsyncClient using the installed transport, if any; kwargs go to AsyncClient.
+    """
+    if _transport is not None:
+        kwargs.setdefault("transport", _transport)
+    return httpx.AsyncClient(**kwargs)
+
+
 @asynccontextmanager
 async def get_client():
     """
@@ -24,7 +51,7 @@ async def get_client():
         "Accept-Language": "en-US,en;q=0.9"
     }
     
-    async with httpx.AsyncClient(
+    async with new_client(
         limits=limits,
         timeout=timeout,
         headers=headers
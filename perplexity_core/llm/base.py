@@ -1,5 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Any, List, Optional, Set, Tuple
+
+
+# Per-request list the pipeline installs to collect Ollama model load times for
+# diagnostics; defined here so the pipeline can set it without importing Ollama
+load_durations: ContextVar[Optional[List[float]]] = ContextVar("ollama_load_durations", default=None)
+
+# (backend, model) that answered the last LLM call in this context; set by the
+# scheduler and the response cache, which may answer from another backend
+served_by: ContextVar[Optional[Tuple[str, str]]] = ContextVar("llm_served_by", default=None)
 
 
 class LLMProvider(ABC):
@@ -7,6 +17,12 @@ class LLMProvider(ABC):
     Abstract base class for LLM providers.
     """
     
+    model: str = ""
+    backend: str = ""  # scheduler queue name
+    
+    # Models that rejected a structured output request, shared per provider class
+    _structured_output_unsupported: Set[str] = set()
+    
     @abstractmethod
     async def chat(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
         """
@@ -20,4 +36,39 @@ class LLMProvider(ABC):
         Returns:
             LLM response as string
         """
-        pass
\ No newline at end of file
+        pass
+    
+    async def chat_stream(self, system_prompt: str, user_prompt: str, **kwargs) -> AsyncIterator[str]:
+        """
+        Send a chat message to the LLM and yield the response as it is generated.
+        
+        Providers without native streaming yield the whole response once.
+        
+        Args:
+            system_prompt: System message
+            user_prompt: User message
+            **kwargs: Additional parameters for the LLM
+            
+        Yields:
+            Response text chunks
+        """
+        yield await self.chat(system_prompt, user_prompt, **kwargs)
+
+    
+    def supports_structured_output(self) -> bool:
+        """
+        Whether the provider can constrain output to a JSON Schema natively.
+        """
+        return False
+    
+    def structured_output_kwargs(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extra chat parameters that constrain the response to the given JSON Schema.
+        """
+        return {}
+    
+    def disable_structured_output(self) -> None:
+        """
+        Remember that the current model rejected structured output so later calls skip it.
+        """
+        self._structured_output_unsupported.add(self.model)
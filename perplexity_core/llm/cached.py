@@ -0,0 +1,163 @@
+import logging
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Any, Optional, Tuple
+from .base import LLMProvider, served_by
+from ..config import settings
+from ..hashing import llm_key
+from ..metrics import counter
+from .. import registry
+
+if TYPE_CHECKING:
+    from ..cache.redis_cache import Cache
+
+
+logger = logging.getLogger(__name__)
+
+# Lookups per call type (normalize, synthesis, repair) by result: hit, miss or bypass
+LLM_CACHE_REQUESTS = counter(
+    "llm_cache_requests_total",
+    "LLM response cache lookups by call type and result",
+    ("call_type", "result")
+)
+
+_default_cache: Optional["Cache"] = None
+
+
+def _ttl(call_type: str) -> int:
+    return {
+        "normalize": settings.LLM_CACHE_TTL_NORMALIZE_S,
+        "synthesis": settings.LLM_CACHE_TTL_SYNTHESIS_S,
+        "repair": settings.LLM_CACHE_TTL_REPAIR_S,
+    }.get(call_type, settings.LLM_CACHE_TTL_SYNTHESIS_S)
+
+
+class CachedLLMProvider(LLMProvider):
+    """
+    Caches another provider's responses keyed on backend, model, parameters
+    and a hash of both prompts.
+
+    Responses are stored under the backend and model that produced them, so
+    an answer from the scheduler's OpenRouter fallback is never served to a
+    later call that asked for the local model.
+
+    Only low-temperature calls (at most LLM_CACHE_MAX_TEMPERATURE) are cached,
+    since only those are expected to repeat. Streaming misses are stored once
+    the stream completes; streaming hits yield the whole response at once.
+    """
+
+    def __init__(self, provider: LLMProvider, call_type: str, cache: Optional["Cache"] = None):
+        self.provider = provider
+        self.call_type = call_type
+        self.cache = cache or registry.create("cache", "redis")
+        self.ttl = _ttl(call_type)
+
+    @property
+    def model(self) -> str:
+        return self.provider.model
+
+    @property
+    def backend(self) -> str:
+        return self.provider.backend
+
+    def _cacheable(self, kwargs: Dict[str, Any]) -> bool:
+        temperature = kwargs.get("temperature", 0.2)
+        if not isinstance(temperature, (int, float)) or temperature > settings.LLM_CACHE_MAX_TEMPERATURE:
+            LLM_CACHE_REQUESTS.inc(call_type=self.call_type, result="bypass")
+            return False
+        return True
+
+    def _key(self, served: Tuple[str, str], system_prompt: str, user_prompt: str, kwargs: Dict[str, Any]) -> str:
+        backend, model = served
+        return llm_key(backend, model, kwargs, system_prompt, user_prompt)
+
+    def _requested(self) -> Tuple[str, str]:
+        return self.provider.backend, self.provider.model
+
+    def _served(self) -> Tuple[str, str]:
+        """
+        Backend and model that answered the call just made, falling back to the requested ones.
+        """
+        return served_by.get() or self._requested()
+
+    async def _lookup(self, key: str) -> Optional[str]:
+        cached = await self.cache.get_llm_response(key)
+        LLM_CACHE_REQUESTS.inc(call_type=self.call_type, result="hit" if cached is not None else "miss")
+        if cached is not None:
+            logger.debug("LLM cache hit (%s)", self.call_type)
+        return cached
+
+    async def _store(self, key: str, response: str) -> None:
+        if not response or len(response.encode("utf-8")) > settings.LLM_CACHE_MAX_BYTES:
+            return
+        await self.cache.set_llm_response(key, response, ttl=self.ttl, max_entries=settings.LLM_CACHE_MAX_ENTRIES)
+
+    async def chat(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        if not self._cacheable(kwargs):
+            return await self.provider.chat(system_prompt, user_prompt, **kwargs)
+
+        cached = await self._lookup(self._key(self._requested(), system_prompt, user_prompt, kwargs))
+        if cached is not None:
+            served_by.set(self._requested())
+            return cached
+
+        served_by.set(None)
+        response = await self.provider.chat(system_prompt, user_prompt, **kwargs)
+        await self._store(self._key(self._served(), system_prompt, user_prompt, kwargs), response)
+        return response
+
+    async def chat_stream(self, system_prompt: str, user_prompt: str, **kwargs) -> AsyncIterator[str]:
+        if not self._cacheable(kwargs):
+            async for chunk in self.provider.chat_stream(system_prompt, user_prompt, **kwargs):
+                yield chunk
+            return
+
+        cached = await self._lookup(self._key(self._requested(), system_prompt, user_prompt, kwargs))
+        if cached is not None:
+            served_by.set(self._requested())
+            yield cached
+            return
+
+        served_by.set(None)
+        chunks = []
+        async for chunk in self.provider.chat_stream(system_prompt, user_prompt, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        # Only a stream that ran to completion is stored
+        await self._store(self._key(self._served(), system_prompt, user_prompt, kwargs), "".join(chunks))
+
+    def supports_structured_output(self) -> bool:
+        return self.provider.supports_structured_output()
+
+    def structured_output_kwargs(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        return self.provider.structured_output_kwargs(schema)
+
+    def disable_structured_output(self) -> None:
+        self.provider.disable_structured_output()
+
+
+def with_cache(provider: LLMProvider, call_type: str, cache: Optional["Cache"] = None) -> LLMProvider:
+    """
+    Wrap a provider in CachedLLMProvider when LLM_CACHE_ENABLED is set.
+
+    Without an explicit cache a process-wide Cache instance is used.
+    """
+    global _default_cache
+    if not settings.LLM_CACHE_ENABLED:
+        return provider
+    if cache is None:
+        if _default_cache is None:
+            _default_cache = registry.create("cache", "redis")
+        cache = _default_cache
+    return CachedLLMProvider(provider, call_type, cache)
+
+
+def llm_cache_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Hits, misses, bypasses and hit rate per call type.
+    """
+    stats: Dict[str, Dict[str, float]] = {}
+    for labels, value in LLM_CACHE_REQUESTS.samples():
+        stats.setdefault(labels["call_type"], {"hit": 0.0, "miss": 0.0, "bypass": 0.0})[labels["result"]] = value
+    for counts in stats.values():
+        lookups = counts["hit"] + counts["miss"]
+        counts["hit_rate"] = counts["hit"] / lookups if lookups else 0.0
+    return stats
@@ -1,7 +1,32 @@
-import httpx
-from typing import Optional
-from .base import LLMProvider
+import json
+import time
+from typing import AsyncIterator, Dict, Any, Optional
+from .base import LLMProvider, load_durations
 from ..config import settings
+from ..http_client import new_client
+from ..metrics import histogram
+
+
+# Model load time reported by Ollama (cold starts take seconds, warm calls milliseconds)
+LOAD_DURATION = histogram(
+    "ollama_load_duration_seconds",
+    "Model load time reported by Ollama per request",
+    ("model",)
+)
+
+
+def _record_load(model: str, data: Dict[str, Any]) -> None:
+    """
+    Record the load_duration (nanoseconds) of a finished Ollama response.
+    """
+    load_ns = data.get("load_duration")
+    if not isinstance(load_ns, (int, float)):
+        return
+    seconds = load_ns / 1e9
+    LOAD_DURATION.observe(seconds, model=model)
+    collected = load_durations.get()
+    if collected is not None:
+        collected.append(seconds)
 
 
 class OllamaProvider(LLMProvider):
@@ -9,22 +34,36 @@ class OllamaProvider(LLMProvider):
     Ollama LLM provider implementation.
     """
     
+    backend = "ollama"
+    
+    # Time of the last chat request, used to keep the model loaded while traffic is active
+    last_used: float = 0.0
+    
     def __init__(self):
         self.host = settings.OLLAMA_HOST
         self.model = settings.OLLAMA_MODEL
     
-    async def chat(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+    # Separate from other providers' model lists
+    _structured_output_unsupported = set()
+    
+    def supports_structured_output(self) -> bool:
+        return self.model not in self._structured_output_unsupported
+    
+    def structured_output_kwargs(self, schema: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Send a chat message to Ollama.
+        Ollama (0.5+) accepts a JSON Schema as the request "format".
+        """
+        return {"format": schema}
+    
+    def _payload(self, system_prompt: str, user_prompt: str, stream: bool, **kwargs) -> Dict[str, Any]:
+        """
+        Build the /api/chat request body.
         """
-        url = f"{self.host}/api/chat"
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
         # Default parameters
         payload = {
             "model": self.model,
+            "stream": stream,
+            "keep_alive": settings.OLLAMA_KEEP_ALIVE,
             "messages": [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
@@ -39,9 +78,80 @@ class OllamaProvider(LLMProvider):
             if key not in ["temperature"]:
                 payload[key] = value
         
-        async with httpx.AsyncClient() as client:
+        return payload
+    
+    async def chat(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        """
+        Send a chat message to Ollama.
+        """
+        url = f"{self.host}/api/chat"
+        headers = {
+            "Content-Type": "application/json"
+        }
+        payload = self._payload(system_prompt, user_prompt, stream=False, **kwargs)
+        OllamaProvider.last_used = time.time()
+        
+        async with new_client(timeout=settings.OLLAMA_TIMEOUT_S) as client:
             response = await client.post(url, json=payload, headers=headers)
             response.raise_for_status()
             data = response.json()
+            _record_load(self.model, data)
             
-            return data["message"]["content"]
\ No newline at end of file
+            return data["message"]["content"]
+    
+    async def chat_stream(self, system_prompt: str, user_prompt: str, **kwargs) -> AsyncIterator[str]:
+        """
+        Stream a chat response from Ollama (newline-delimited JSON chunks).
+        """
+        url = f"{self.host}/api/chat"
+        headers = {
+            "Content-Type": "application/json"
+        }
+        payload = self._payload(system_prompt, user_prompt, stream=True, **kwargs)
+        OllamaProvider.last_used = time.time()
+        
+        async with new_client(timeout=settings.OLLAMA_TIMEOUT_S) as client:
+            async with client.stream("POST", url, json=payload, headers=headers) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise RuntimeError(f"Ollama error: {data['error']}")
+                    content = data.get("message", {}).get("content")
+                    if content:
+                        yield content
+                    if data.get("done"):
+                        _record_load(self.model, data)
+                        break
+    
+    async def load(self) -> float:
+        """
+        Load the model into memory without generating, using the configured keep-alive.
+        
+        Returns:
+            Seconds the load request took
+        """
+        start = time.perf_counter()
+        async with new_client(timeout=settings.OLLAMA_TIMEOUT_S) as client:
+            response = await client.post(
+                f"{self.host}/api/generate",
+                json={"model": self.model, "keep_alive": settings.OLLAMA_KEEP_ALIVE}
+            )
+            response.raise_for_status()
+            _record_load(self.model, response.json())
+        return time.perf_counter() - start
+    
+    async def running(self) -> Optional[Dict[str, Any]]:
+        """
+        The configured model's entry in Ollama's loaded models (/api/ps), or None if not loaded.
+        """
+        async with new_client(timeout=5.0) as client:
+            response = await client.get(f"{self.host}/api/ps")
+            response.raise_for_status()
+            models = response.json().get("models") or []
+        for model in models:
+            if self.model in (model.get("name"), model.get("model")):
+                return model
+        return None
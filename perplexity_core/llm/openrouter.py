@@ -1,7 +1,8 @@
-import httpx
-from typing import Optional
+import json
+from typing import AsyncIterator, Dict, Any, Optional
 from .base import LLMProvider
 from ..config import settings
+from ..http_client import new_client
 
 
 class OpenRouterProvider(LLMProvider):
@@ -9,22 +10,43 @@ class OpenRouterProvider(LLMProvider):
     OpenRouter LLM provider implementation.
     """
     
+    backend = "openrouter"
+    
     def __init__(self):
         if not settings.OPENROUTER_API_KEY:
             raise ValueError("OPENROUTER_API_KEY is not configured")
         self.api_key = settings.OPENROUTER_API_KEY
         self.model = settings.OPENROUTER_MODEL
+        self.url = "https://openrouter.ai/api/v1/chat/completions"
     
-    async def chat(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+    # Separate from other providers' model lists
+    _structured_output_unsupported = set()
+    
+    def supports_structured_output(self) -> bool:
+        return self.model not in self._structured_output_unsupported
+    
+    def structured_output_kwargs(self, schema: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Send a chat message to OpenRouter.
+        OpenAI-style response_format, routed only to upstreams that honour it.
         """
-        url = "https://openrouter.ai/api/v1/chat/completions"
-        headers = {
+        return {
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": "search_response", "schema": schema}
+            },
+            "provider": {"require_parameters": True}
+        }
+    
+    def _headers(self) -> Dict[str, str]:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
-        
+    
+    def _payload(self, system_prompt: str, user_prompt: str, **kwargs) -> Dict[str, Any]:
+        """
+        Build the chat completions request body.
+        """
         # Default parameters
         payload = {
             "model": self.model,
@@ -41,9 +63,41 @@ class OpenRouterProvider(LLMProvider):
             if key not in ["temperature", "top_p"]:
                 payload[key] = value
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, headers=headers)
+        return payload
+    
+    async def chat(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        """
+        Send a chat message to OpenRouter.
+        """
+        payload = self._payload(system_prompt, user_prompt, **kwargs)
+        
+        async with new_client() as client:
+            response = await client.post(self.url, json=payload, headers=self._headers())
             response.raise_for_status()
             data = response.json()
             
-            return data["choices"][0]["message"]["content"]
\ No newline at end of file
+            return data["choices"][0]["message"]["content"]
+    
+    async def chat_stream(self, system_prompt: str, user_prompt: str, **kwargs) -> AsyncIterator[str]:
+        """
+        Stream a chat response from OpenRouter (Server-Sent Events).
+        """
+        payload = self._payload(system_prompt, user_prompt, stream=True, **kwargs)
+        
+        async with new_client() as client:
+            async with client.stream("POST", self.url, json=payload, headers=self._headers()) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    # Skip keep-alive comments (": OPENROUTER PROCESSING") and blank lines
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    if chunk.get("error"):
+                        raise RuntimeError(f"OpenRouter error: {chunk['error']}")
+                    choices = chunk.get("choices") or [{}]
+                    content = choices[0].get("delta", {}).get("content")
+                    if content:
+                        yield content
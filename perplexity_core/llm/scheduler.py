@@ -0,0 +1,287 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import partial
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional, Tuple
+from .base import LLMProvider, served_by
+from ..config import settings
+from ..metrics import counter, gauge, histogram
+from .. import registry
+
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first
+PRIORITY_INTERACTIVE = 0  # synthesis and repair for a waiting user
+PRIORITY_NORMALIZE = 1
+PRIORITY_BACKGROUND = 2  # cache refresh and other unattended work
+
+# Default priority per LLM call type
+CALL_PRIORITIES = {
+    "synthesis": PRIORITY_INTERACTIVE,
+    "repair": PRIORITY_INTERACTIVE,
+    "normalize": PRIORITY_NORMALIZE,
+}
+
+# Lowest priority (highest value) for LLM calls made in this context; the
+# cache warmer sets PRIORITY_BACKGROUND so its calls queue behind live requests
+priority_floor: ContextVar[int] = ContextVar("llm_priority_floor", default=PRIORITY_INTERACTIVE)
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_NORMALIZE: "normalize",
+    PRIORITY_BACKGROUND: "background",
+}
+
+QUEUE_DEPTH = gauge(
+    "llm_queue_depth",
+    "LLM calls waiting for a backend slot",
+    ("backend",)
+)
+ACTIVE_CALLS = gauge(
+    "llm_active_calls",
+    "LLM calls currently running per backend",
+    ("backend",)
+)
+QUEUE_WAIT = histogram(
+    "llm_queue_wait_seconds",
+    "Time LLM calls spent waiting for a backend slot",
+    ("backend", "priority")
+)
+LLM_FALLBACKS = counter(
+    "llm_fallbacks_total",
+    "LLM calls moved to the fallback backend",
+    ("backend", "fallback", "reason")
+)
+
+
+class QueueTimeout(Exception):
+    """
+    Raised when an LLM call waits longer than the queue deadline for a slot.
+    """
+    pass
+
+
+class BackendQueue:
+    """
+    Concurrency cap for one LLM backend with a priority queue of waiters.
+
+    Freed slots go to the waiter with the lowest priority value; waiters with
+    equal priority are served first come, first served.
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+
+    def depth(self) -> int:
+        """
+        Number of calls waiting for a slot.
+        """
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def _update_metrics(self) -> None:
+        QUEUE_DEPTH.set(self.depth(), backend=self.name)
+        ACTIVE_CALLS.set(self.active, backend=self.name)
+
+    async def acquire(self, priority: int, timeout: Optional[float] = None) -> None:
+        """
+        Wait for a slot.
+
+        Raises:
+            QueueTimeout: If no slot was granted within timeout seconds
+        """
+        started = time.perf_counter()
+        if self.active < self.limit and not self.depth():
+            self.active += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._order), future))
+            self._update_metrics()
+            try:
+                await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                raise QueueTimeout(f"No {self.name} slot within {timeout}s") from None
+            except asyncio.CancelledError:
+                # The slot may have been handed over just as the caller gave up
+                if future.done() and not future.cancelled():
+                    self.release()
+                raise
+            finally:
+                self._update_metrics()
+        QUEUE_WAIT.observe(time.perf_counter() - started, backend=self.name,
+                           priority=PRIORITY_NAMES.get(priority, str(priority)))
+        self._update_metrics()
+
+    def release(self) -> None:
+        """
+        Hand the slot to the next waiter, or free it.
+        """
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                self._update_metrics()
+                return
+        self.active -= 1
+        self._update_metrics()
+
+    @asynccontextmanager
+    async def slot(self, priority: int, timeout: Optional[float] = None):
+        await self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class LLMScheduler:
+    """
+    Per-backend concurrency caps and priority queues shared by every pipeline in the process.
+    """
+
+    def __init__(self):
+        self._queues: Dict[str, BackendQueue] = {}
+
+    def queue(self, backend: str) -> BackendQueue:
+        queue = self._queues.get(backend)
+        if queue is None:
+            limit = {
+                "ollama": settings.LLM_OLLAMA_CONCURRENCY,
+                "openrouter": settings.LLM_OPENROUTER_CONCURRENCY,
+            }.get(backend, settings.MAX_CONCURRENCY)
+            queue = BackendQueue(backend, limit)
+            self._queues[backend] = queue
+        return queue
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_scheduler() -> LLMScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler()
+    return _scheduler
+
+
+class ScheduledLLMProvider(LLMProvider):
+    """
+    Runs another provider's calls through the scheduler's queue for its backend.
+
+    When a fallback is given, calls overflow to it if the backend queue is
+    already LLM_LOCAL_MAX_QUEUE deep or the queue deadline passes.
+    """
+
+    def __init__(self, provider: LLMProvider, priority: int, scheduler: Optional[LLMScheduler] = None,
+                 fallback: Optional[Callable[[], LLMProvider]] = None):
+        self.provider = provider
+        self.priority = priority
+        self.scheduler = scheduler or get_scheduler()
+        self.fallback = fallback
+
+    @property
+    def model(self) -> str:
+        return self.provider.model
+
+    @property
+    def backend(self) -> str:
+        return self.provider.backend
+
+    def _fallback_provider(self, reason: str, detail: str) -> Optional["ScheduledLLMProvider"]:
+        if self.fallback is None:
+            return None
+        try:
+            provider = self.fallback()
+        except Exception as e:
+            logger.warning("LLM fallback unavailable: %s", e)
+            return None
+        logger.info("%s %s, falling back to %s", self.provider.backend, detail, provider.backend)
+        LLM_FALLBACKS.inc(backend=self.provider.backend, fallback=provider.backend, reason=reason)
+        return ScheduledLLMProvider(provider, self.priority, self.scheduler)
+
+    def _fallback_kwargs(self, provider: LLMProvider, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Translate a structured output request to the fallback provider's parameters.
+        """
+        kwargs = dict(kwargs)
+        schema = kwargs.pop("format", None)
+        if isinstance(schema, dict) and provider.supports_structured_output():
+            kwargs.update(provider.structured_output_kwargs(schema))
+        return kwargs
+
+    async def _acquire(self) -> Optional["ScheduledLLMProvider"]:
+        """
+        Take a slot on this backend, or return the fallback to use instead.
+        """
+        queue = self.scheduler.queue(self.provider.backend)
+        if self.fallback is not None and queue.depth() >= settings.LLM_LOCAL_MAX_QUEUE:
+            fallback = self._fallback_provider("queue_depth", f"queue is {queue.depth()} deep")
+            if fallback is not None:
+                return fallback
+        try:
+            await queue.acquire(max(self.priority, priority_floor.get()), settings.LLM_QUEUE_TIMEOUT_S)
+        except QueueTimeout:
+            fallback = self._fallback_provider("deadline", "queue deadline passed")
+            if fallback is None:
+                raise
+            return fallback
+        return None
+
+    async def chat(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        fallback = await self._acquire()
+        if fallback is not None:
+            return await fallback.chat(system_prompt, user_prompt,
+                                       **self._fallback_kwargs(fallback.provider, kwargs))
+        served_by.set((self.provider.backend, self.provider.model))
+        try:
+            return await self.provider.chat(system_prompt, user_prompt, **kwargs)
+        finally:
+            self.scheduler.queue(self.provider.backend).release()
+
+    async def chat_stream(self, system_prompt: str, user_prompt: str, **kwargs) -> AsyncIterator[str]:
+        fallback = await self._acquire()
+        if fallback is not None:
+            async for chunk in fallback.chat_stream(system_prompt, user_prompt,
+                                                    **self._fallback_kwargs(fallback.provider, kwargs)):
+                yield chunk
+            return
+        served_by.set((self.provider.backend, self.provider.model))
+        # The slot is held until the stream is fully consumed or closed
+        try:
+            async for chunk in self.provider.chat_stream(system_prompt, user_prompt, **kwargs):
+                yield chunk
+        finally:
+            self.scheduler.queue(self.provider.backend).release()
+
+    def supports_structured_output(self) -> bool:
+        return self.provider.supports_structured_output()
+
+    def structured_output_kwargs(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        return self.provider.structured_output_kwargs(schema)
+
+    def disable_structured_output(self) -> None:
+        self.provider.disable_structured_output()
+
+
+def schedule(provider: LLMProvider, priority: int) -> LLMProvider:
+    """
+    Route a provider through the process-wide scheduler when LLM_SCHEDULER_ENABLED is set.
+
+    Ollama calls overflow to OpenRouter only when LLM_LOCAL_FALLBACK is set
+    and an OpenRouter key is configured; forceLocal requests are sent off the
+    machine in that case too.
+    """
+    if not settings.LLM_SCHEDULER_ENABLED:
+        return provider
+    fallback = None
+    if provider.backend == "ollama" and settings.LLM_LOCAL_FALLBACK and settings.OPENROUTER_API_KEY:
+        fallback = partial(registry.create, "llm", "openrouter")
+    return ScheduledLLMProvider(provider, priority, fallback=fallback)
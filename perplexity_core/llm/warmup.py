@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional
+from .ollama import OllamaProvider
+from ..config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaKeeper:
+    """
+    Preloads the configured Ollama model and keeps it resident while local traffic is active.
+    
+    Every chat request already carries OLLAMA_KEEP_ALIVE, so Ollama extends
+    residency on its own; the keeper covers the first request after startup
+    and reloads the model if Ollama evicted it (restart, memory pressure,
+    another model) while requests arrived within OLLAMA_KEEPALIVE_IDLE_S.
+    """
+    
+    def __init__(self):
+        self.provider = OllamaProvider()
+        self.last_load_s: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._started = time.time()
+        self._task: Optional[asyncio.Task] = None
+    
+    async def warm(self) -> bool:
+        """
+        Load the model now; returns whether it succeeded.
+        """
+        try:
+            self.last_load_s = await self.provider.load()
+            self.last_error = None
+            logger.info("Ollama model %s loaded in %.2fs", self.provider.model, self.last_load_s)
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning("Ollama warm-up failed: %s", e)
+            return False
+    
+    def _traffic_active(self) -> bool:
+        # Treat startup as activity so an early eviction is repaired too
+        last = max(OllamaProvider.last_used, self._started)
+        return time.time() - last < settings.OLLAMA_KEEPALIVE_IDLE_S
+    
+    async def _run(self) -> None:
+        await self.warm()
+        while True:
+            await asyncio.sleep(settings.OLLAMA_KEEPALIVE_CHECK_S)
+            if not self._traffic_active():
+                continue
+            try:
+                if await self.provider.running() is None:
+                    logger.info("Ollama model is not loaded while traffic is active, reloading")
+                    await self.warm()
+            except Exception as e:
+                self.last_error = str(e)
+    
+    def start(self) -> None:
+        """
+        Warm up in the background and start the keep-alive loop.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def status(self) -> Dict[str, Any]:
+        """
+        Whether the model is loaded, per Ollama's list of running models.
+        """
+        status: Dict[str, Any] = {
+            "model": self.provider.model,
+            "keepAlive": settings.OLLAMA_KEEP_ALIVE,
+            "lastLoadS": self.last_load_s,
+            "lastError": self.last_error,
+        }
+        try:
+            running = await self.provider.running()
+            status.update(
+                reachable=True,
+                loaded=running is not None,
+                expiresAt=running.get("expires_at") if running else None,
+                sizeVram=running.get("size_vram") if running else None
+            )
+        except Exception as e:
+            status.update(reachable=False, loaded=False, lastError=str(e))
+        return status
@@ -0,0 +1,432 @@
+import asyncio
+import bisect
+import logging
+import math
+import random
+import time
+from collections import Counter as Tally
+from typing import Any, Callable, Dict, List, Optional, Set
+import httpx
+from .contracts import SearchRequest
+from .metrics import DEFAULT_BUCKETS, rss_bytes
+
+
+logger = logging.getLogger(__name__)
+
+# Event-loop lag is sampled by a task that sleeps this long and measures how late it wakes
+LAG_PROBE_S = 0.1
+
+# Log-spaced bounds (1 ms to ~3 min, 10% apart) for percentiles over runs too long to keep every sample
+_FINE_BUCKETS_MS = tuple(1.1 ** k for k in range(128))
+
+_MB = 1024 * 1024
+
+
+class LatencyHistogram:
+    """
+    Millisecond samples in log-spaced buckets; percentiles are accurate to about 10%.
+
+    Memory stays constant however long a soak test runs. The coarse counts
+    use the /metrics bucket bounds, so both can be compared.
+    """
+
+    def __init__(self):
+        self.fine = [0] * (len(_FINE_BUCKETS_MS) + 1)
+        self.coarse = [0] * (len(DEFAULT_BUCKETS) + 1)
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.fine[bisect.bisect_left(_FINE_BUCKETS_MS, ms)] += 1
+        self.coarse[bisect.bisect_left(DEFAULT_BUCKETS, ms / 1000)] += 1
+        self.count += 1
+        self.max = max(self.max, ms)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for bound, count in zip(_FINE_BUCKETS_MS, self.fine):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def buckets(self) -> List[Dict[str, Any]]:
+        """
+        Count per coarse bucket, as {"leMs": upper bound or None for the overflow, "count": n}.
+        """
+        bounds = [bound * 1000 for bound in DEFAULT_BUCKETS] + [None]
+        return [{"leMs": bound, "count": count} for bound, count in zip(bounds, self.coarse)]
+
+
+def _percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def _round(value: Optional[float], digits: int = 1) -> Optional[float]:
+    return None if value is None else round(value, digits)
+
+
+class QueryMix:
+    """
+    Chooses the request for each arrival from a list of requests.
+
+    With probability repeat_ratio an arrival repeats one of the last
+    `pool_size` fresh requests, which the answer cache should serve.
+    Otherwise it takes the next request from the list; after the list is
+    used up, fresh requests get a " #n" suffix so they still miss the cache.
+    The pool is bounded so a soak test does not grow its own memory.
+    """
+
+    def __init__(self, requests: List[SearchRequest], repeat_ratio: float = 0.0, pool_size: int = 1000,
+                 seed: int = 0):
+        if not requests:
+            raise ValueError("no requests in the query mix")
+        self.requests = requests
+        self.repeat_ratio = min(max(repeat_ratio, 0.0), 1.0)
+        self.pool_size = max(1, pool_size)
+        self.rng = random.Random(seed)
+        self.sent: List[SearchRequest] = []
+        self._fresh = 0
+
+    def next(self) -> SearchRequest:
+        if self.sent and self.rng.random() < self.repeat_ratio:
+            return self.rng.choice(self.sent)
+        index, rounds = self._fresh % len(self.requests), self._fresh // len(self.requests)
+        req = self.requests[index]
+        if rounds:
+            req = req.model_copy(update={"query": f"{req.query} #{rounds}"})
+        if len(self.sent) < self.pool_size:
+            self.sent.append(req)
+        else:
+            self.sent[self._fresh % self.pool_size] = req
+        self._fresh += 1
+        return req
+
+
+class PipelineTarget:
+    """
+    Sends load to a Pipeline in this process; memory and event-loop lag are the pipeline's own.
+    """
+
+    name = "pipeline"
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    async def search(self, req: SearchRequest) -> bool:
+        """
+        Run one search; returns whether it was answered from the cache.
+        """
+        response = await self.pipeline.run(req)
+        return response.diagnostics.cached
+
+    async def memory_mb(self) -> Optional[float]:
+        rss = rss_bytes()
+        return None if rss is None else rss / _MB
+
+    async def close(self) -> None:
+        await self.pipeline.close()
+
+
+class ApiTarget:
+    """
+    Sends load to POST /api/search; memory is the server's, read from /metrics.
+
+    Event-loop lag is measured in the load generator, so it shows when the
+    generator itself cannot keep up, not lag inside the server.
+    """
+
+    def __init__(self, url: str, timeout: float = 60.0):
+        self.name = url
+        self.client = httpx.AsyncClient(
+            base_url=url, timeout=timeout,
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=100)
+        )
+
+    async def search(self, req: SearchRequest) -> bool:
+        response = await self.client.post(
+            "/api/search", content=req.model_dump_json(), headers={"Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+        return bool(response.json().get("diagnostics", {}).get("cached"))
+
+    async def memory_mb(self) -> Optional[float]:
+        try:
+            response = await self.client.get("/metrics")
+            for line in response.text.splitlines():
+                if line.startswith("process_resident_memory_bytes "):
+                    return float(line.split()[1]) / _MB
+        except (httpx.HTTPError, ValueError):
+            pass
+        return None
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def error_kind(e: BaseException) -> str:
+    """
+    Short label for a failed request: "http_503", "ReadTimeout", ...
+    """
+    if isinstance(e, httpx.HTTPStatusError):
+        return f"http_{e.response.status_code}"
+    return type(e).__name__
+
+
+class _Window:
+    """
+    What happened during one report interval.
+    """
+
+    def __init__(self):
+        self.arrivals = 0
+        self.dropped = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors: Tally = Tally()
+        self.latencies: List[float] = []
+        self.lags: List[float] = []
+
+
+class LoadTest:
+    """
+    Open-loop load: requests arrive at the given rate whether or not earlier ones have finished.
+
+    Arrivals follow a Poisson process (or a fixed interval with
+    arrivals="uniform") at `rate` per second, ramping linearly to `rate_end`
+    over the run if given, so a slow target builds a backlog instead of
+    slowing the load down. Arrivals are scheduled against the start time, so
+    a late wake-up sends the overdue requests at once. When `max_inflight`
+    requests are outstanding, further arrivals are dropped and counted.
+
+    Every `interval_s` seconds a row of the last interval's rates,
+    latency percentiles, error and cache-hit ratios, event-loop lag and
+    memory is appended to `rows` and passed to on_interval; run() returns a
+    summary of the whole run.
+    """
+
+    def __init__(self, target, mix: QueryMix, rate: float, duration_s: float, rate_end: Optional[float] = None,
+                 arrivals: str = "poisson", max_inflight: int = 1000, interval_s: float = 10.0,
+                 drain_s: float = 30.0, seed: int = 0,
+                 on_interval: Optional[Callable[[Dict[str, Any]], None]] = None):
+        if rate <= 0 or (rate_end is not None and rate_end <= 0):
+            raise ValueError("rates must be positive")
+        if arrivals not in ("poisson", "uniform"):
+            raise ValueError(f"unknown arrival process {arrivals!r}")
+        self.target = target
+        self.mix = mix
+        self.rate = rate
+        self.rate_end = rate if rate_end is None else rate_end
+        self.duration_s = duration_s
+        self.arrivals = arrivals
+        self.max_inflight = max(1, max_inflight)
+        self.interval_s = interval_s
+        self.drain_s = drain_s
+        self.rng = random.Random(seed)
+        self.on_interval = on_interval
+        self.rows: List[Dict[str, Any]] = []
+        self.latency = LatencyHistogram()
+        self.lag = LatencyHistogram()
+        self.totals: Tally = Tally()
+        self.errors: Tally = Tally()
+        self._window = _Window()
+        self._inflight: Set[asyncio.Task] = set()
+        self._start = 0.0
+
+    def rate_at(self, elapsed_s: float) -> float:
+        share = min(max(elapsed_s / self.duration_s, 0.0), 1.0) if self.duration_s > 0 else 0.0
+        return self.rate + (self.rate_end - self.rate) * share
+
+    def _gap_s(self, elapsed_s: float) -> float:
+        rate = self.rate_at(elapsed_s)
+        return self.rng.expovariate(rate) if self.arrivals == "poisson" else 1.0 / rate
+
+    async def _one(self, req: SearchRequest) -> None:
+        start = time.perf_counter()
+        try:
+            cached = await self.target.search(req)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            kind = error_kind(e)
+            self._window.errors[kind] += 1
+            self.errors[kind] += 1
+            logger.debug("Load test request failed: %s", e)
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        # Counted in the interval it finished in
+        window = self._window
+        window.latencies.append(elapsed_ms)
+        self.latency.observe(elapsed_ms)
+        if cached:
+            window.hits += 1
+        else:
+            window.misses += 1
+        self.totals["hits" if cached else "misses"] += 1
+
+    def _fire(self) -> None:
+        self._window.arrivals += 1
+        self.totals["sent"] += 1
+        if len(self._inflight) >= self.max_inflight:
+            self._window.dropped += 1
+            self.totals["dropped"] += 1
+            return
+        task = asyncio.ensure_future(self._one(self.mix.next()))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _send(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_at = self._start
+        while next_at - self._start < self.duration_s:
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._fire()
+            next_at += self._gap_s(next_at - self._start)
+
+    async def _probe_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            before = loop.time()
+            await asyncio.sleep(LAG_PROBE_S)
+            lag_ms = max(0.0, (loop.time() - before - LAG_PROBE_S) * 1000)
+            self._window.lags.append(lag_ms)
+            self.lag.observe(lag_ms)
+
+    async def _report(self, elapsed_s: float, span_s: float) -> None:
+        window, self._window = self._window, _Window()
+        completed = window.hits + window.misses
+        failed = sum(window.errors.values())
+        row = {
+            "t": round(elapsed_s, 1),
+            "rate": round(self.rate_at(elapsed_s - span_s / 2), 2),
+            "offered": round(window.arrivals / span_s, 2),
+            "throughput": round(completed / span_s, 2),
+            "p50Ms": _round(_percentile(window.latencies, 50)),
+            "p95Ms": _round(_percentile(window.latencies, 95)),
+            "p99Ms": _round(_percentile(window.latencies, 99)),
+            "errorRate": round(failed / (completed + failed), 4) if completed + failed else 0.0,
+            "errors": dict(window.errors),
+            "hitRatio": round(window.hits / completed, 4) if completed else None,
+            "dropped": window.dropped,
+            "inflight": len(self._inflight),
+            "lagP99Ms": _round(_percentile(window.lags, 99)),
+            "lagMaxMs": _round(max(window.lags, default=None)),
+            "memoryMb": _round(await self.target.memory_mb()),
+        }
+        self.rows.append(row)
+        if self.on_interval:
+            self.on_interval(row)
+
+    async def _reporter(self) -> None:
+        loop = asyncio.get_running_loop()
+        last = self._start
+        while True:
+            await asyncio.sleep(max(0.0, last + self.interval_s - loop.time()))
+            now = loop.time()
+            await self._report(now - self._start, now - last)
+            last = now
+
+    async def run(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        memory_start = await self.target.memory_mb()
+        self._start = loop.time()
+        background = [asyncio.ensure_future(self._probe_lag()), asyncio.ensure_future(self._reporter())]
+        try:
+            await self._send()
+            if self._inflight:
+                _, pending = await asyncio.wait(set(self._inflight), timeout=self.drain_s)
+                for task in pending:
+                    task.cancel()
+                self.totals["unfinished"] = len(pending)
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+        elapsed = loop.time() - self._start
+        last = self.rows[-1]["t"] if self.rows else 0.0
+        if elapsed - last > 0.5:
+            await self._report(elapsed, elapsed - last)
+        return self.summary(elapsed, memory_start)
+
+    def _memory_growth(self) -> Optional[float]:
+        """
+        Least-squares slope of memory over the intervals after the first, in MB per hour.
+        """
+        points = [(row["t"], row["memoryMb"]) for row in self.rows[1:] if row["memoryMb"] is not None]
+        if len(points) < 5:
+            return None
+        mean_t = sum(t for t, _ in points) / len(points)
+        mean_m = sum(m for _, m in points) / len(points)
+        spread = sum((t - mean_t) ** 2 for t, _ in points)
+        if not spread:
+            return None
+        return sum((t - mean_t) * (m - mean_m) for t, m in points) / spread * 3600
+
+    def _saturation(self) -> Optional[Dict[str, Any]]:
+        """
+        Where the target fell behind: the first interval that dropped
+        arrivals, or the first of two in a row that completed under 90% of
+        the offered rate while the backlog grew.
+        """
+        behind = []
+        previous = 0
+        for row in self.rows:
+            if row["dropped"]:
+                behind = [row]
+                break
+            if row["offered"] and row["throughput"] < 0.9 * row["offered"] and row["inflight"] > previous:
+                behind.append(row)
+                if len(behind) == 2:
+                    break
+            else:
+                behind = []
+            previous = row["inflight"]
+        if not behind or (len(behind) < 2 and not behind[0]["dropped"]):
+            return None
+        row = behind[0]
+        return {"t": row["t"], "offered": row["offered"], "throughput": row["throughput"]}
+
+    def summary(self, elapsed_s: float, memory_start: Optional[float] = None) -> Dict[str, Any]:
+        hits, misses = self.totals["hits"], self.totals["misses"]
+        failed = sum(self.errors.values())
+        memory = [row["memoryMb"] for row in self.rows if row["memoryMb"] is not None]
+        growth = self._memory_growth()
+        return {
+            "target": self.target.name,
+            "durationS": round(elapsed_s, 1),
+            "sent": self.totals["sent"],
+            "completed": hits + misses,
+            "failed": failed,
+            "dropped": self.totals["dropped"],
+            "unfinished": self.totals["unfinished"],
+            "throughput": round((hits + misses) / elapsed_s, 2) if elapsed_s else 0.0,
+            "maxThroughput": max((row["throughput"] for row in self.rows), default=0.0),
+            "errorRate": round(failed / (hits + misses + failed), 4) if hits + misses + failed else 0.0,
+            "errors": dict(self.errors),
+            "hitRatio": round(hits / (hits + misses), 4) if hits + misses else None,
+            "latencyMs": {
+                "p50": _round(self.latency.percentile(50)),
+                "p90": _round(self.latency.percentile(90)),
+                "p95": _round(self.latency.percentile(95)),
+                "p99": _round(self.latency.percentile(99)),
+                "max": _round(self.latency.max),
+            },
+            "histogram": self.latency.buckets(),
+            "lagMs": {"p99": _round(self.lag.percentile(99)), "max": _round(self.lag.max)},
+            "memoryMb": {
+                "start": _round(memory_start),
+                "end": memory[-1] if memory else None,
+                "peak": max(memory, default=None),
+                "growthPerHour": _round(growth),
+            },
+            "saturation": self._saturation(),
+        }
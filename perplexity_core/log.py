@@ -0,0 +1,199 @@
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Optional
+from .config import settings
+from .metrics import counter
+
+
+# Correlates every record logged while handling one request
+request_id: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Pass as extra= on verbose per-item records (per URL, per document) to sample them per request
+SAMPLED = {"sampled": True}
+
+# LogRecord attributes that are not user-supplied extra fields
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "sampled"}
+
+_writer: Optional["BackgroundWriter"] = None
+
+DROPPED = counter(
+    "log_records_dropped_total",
+    "Log records discarded because the writer queue was full"
+)
+
+# Random per-process prefix plus a counter: unique without a urandom call per request
+_ID_PREFIX = os.urandom(4).hex()
+_ID_COUNTER = itertools.count(1)
+
+
+def new_request_id() -> str:
+    return f"{_ID_PREFIX}{next(_ID_COUNTER):08x}"
+
+
+class BackgroundWriter:
+    """
+    Drains queued records on a daemon thread every LOG_FLUSH_INTERVAL_S.
+
+    Records are appended to a deque without waking the writer, so a burst of
+    log calls costs the event loop no thread switches; the writer formats
+    each batch and writes it with a single call. The deque holds at most
+    max_records; when a slow sink lets it fill, the oldest records are
+    dropped and counted in log_records_dropped_total.
+    """
+
+    def __init__(self, handler: logging.Handler, interval: float, max_records: int = 10000):
+        self.handler = handler
+        self.interval = interval
+        self.records: Deque[logging.LogRecord] = deque(maxlen=max(1, max_records))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _drain(self) -> None:
+        lines = []
+        while self.records:
+            record = self.records.popleft()
+            try:
+                lines.append(self.handler.format(record))
+            except Exception:
+                self.handler.handleError(record)
+        if lines:
+            stream = self.handler.stream
+            try:
+                stream.write("\n".join(lines) + "\n")
+                stream.flush()
+            except Exception:
+                pass
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._drain()
+        self._drain()
+
+    def stop(self) -> None:
+        """
+        Write everything still queued and stop the thread.
+        """
+        self._stop.set()
+        self._thread.join()
+
+
+class RequestQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that only stamps the request ID on the caller's side.
+
+    The stock QueueHandler formats the record before enqueueing; here
+    formatting and I/O both happen on the writer thread, so a log call on
+    the event loop costs a record allocation and a deque append.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # A full deque drops its oldest record on append
+        if len(self.queue) == self.queue.maxlen:
+            DROPPED.inc()
+        self.queue.append(record)
+
+
+class SampleFilter(logging.Filter):
+    """
+    Keep records marked sampled for LOG_SAMPLE_RATE of requests.
+
+    The decision hashes the request ID, so a sampled request keeps all of
+    its per-URL records and an unsampled one drops all of them.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.threshold = int(max(0.0, min(1.0, rate)) * 10000)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sampled", False):
+            return True
+        return zlib.crc32(request_id.get().encode("utf-8")) % 10000 < self.threshold
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, request ID, message and any extra fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: Optional[str] = None, fmt: Optional[str] = None, stream=None) -> None:
+    """
+    Route the perplexity_core and apps loggers through a queue to a background writer thread.
+
+    Safe to call more than once; later calls replace the handlers.
+
+    Args:
+        level: Log level name (defaults to LOG_LEVEL)
+        fmt: "json" or "text" (defaults to LOG_FORMAT)
+        stream: Output stream (defaults to stderr)
+    """
+    global _writer
+    level = (level or settings.LOG_LEVEL).upper()
+    fmt = (fmt or settings.LOG_FORMAT).lower()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+        ))
+
+    if _writer is not None:
+        _writer.stop()
+    _writer = BackgroundWriter(output, settings.LOG_FLUSH_INTERVAL_S, settings.LOG_QUEUE_SIZE)
+    _writer.start()
+
+    handler = RequestQueueHandler(_writer.records)
+    handler.addFilter(SampleFilter(settings.LOG_SAMPLE_RATE))
+    for name in ("perplexity_core", "apps"):
+        logger = logging.getLogger(name)
+        logger.handlers = [handler]
+        logger.setLevel(level)
+        logger.propagate = False
+
+
+def shutdown_logging() -> None:
+    """
+    Flush queued records and stop the writer thread.
+    """
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,204 @@
+import bisect
+import os
+import sys
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[Dict[str, str], float]]:
+        """
+        Current value for every label combination seen so far.
+        """
+        with self._lock:
+            items = list(self._values.items())
+        return [(dict(zip(self.labelnames, key)), value) for key, value in items]
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down, with optional labels.
+    """
+    
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+    
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with optional labels.
+    """
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label combination: per-bucket counts (last is +Inf), sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+    
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+    
+    def samples(self) -> List[Tuple[Dict[str, str], List[Tuple[float, int]], int, float]]:
+        """
+        For every label combination: labels, cumulative (upper bound, count) pairs, count and sum.
+        """
+        with self._lock:
+            items = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        samples = []
+        for key, counts, total in items:
+            cumulative, running = [], 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                cumulative.append((bound, running))
+            samples.append((dict(zip(self.labelnames, key)), cumulative, running, total))
+        return samples
+
+
+_REGISTRY: Dict[str, object] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def counter(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+    """
+    Get or create a process-wide counter.
+    """
+    with _REGISTRY_LOCK:
+        metric = _REGISTRY.get(name)
+        if metric is None:
+            metric = Counter(name, documentation, labelnames)
+            _REGISTRY[name] = metric
+        return metric
+
+
+def gauge(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+    """
+    Get or create a process-wide gauge.
+    """
+    with _REGISTRY_LOCK:
+        metric = _REGISTRY.get(name)
+        if metric is None:
+            metric = Gauge(name, documentation, labelnames)
+            _REGISTRY[name] = metric
+        return metric
+
+
+def histogram(name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    """
+    Get or create a process-wide histogram.
+    """
+    with _REGISTRY_LOCK:
+        metric = _REGISTRY.get(name)
+        if metric is None:
+            metric = Histogram(name, documentation, labelnames, buckets)
+            _REGISTRY[name] = metric
+        return metric
+
+
+def rss_bytes() -> Optional[int]:
+    """
+    Resident memory of this process: current on Linux, the peak elsewhere, None if unknown.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = [(name, value) for name, value in labels.items()] + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render_prometheus() -> str:
+    """
+    Every registered metric in the Prometheus text exposition format (0.0.4).
+    """
+    with _REGISTRY_LOCK:
+        metrics = sorted(_REGISTRY.values(), key=lambda metric: metric.name)
+    lines: List[str] = []
+    rss = rss_bytes()
+    if rss is not None:
+        lines += ["# HELP process_resident_memory_bytes Resident memory size in bytes",
+                  "# TYPE process_resident_memory_bytes gauge",
+                  f"process_resident_memory_bytes {rss}"]
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+        if isinstance(metric, Histogram):
+            lines.append(f"# TYPE {metric.name} histogram")
+            for labels, buckets, count, total in metric.samples():
+                for bound, cumulative in buckets:
+                    lines.append(f"{metric.name}_bucket{_labels(labels, (('le', _number(bound)),))} {cumulative}")
+                lines.append(f"{metric.name}_sum{_labels(labels)} {_number(total)}")
+                lines.append(f"{metric.name}_count{_labels(labels)} {count}")
+        else:
+            kind = "gauge" if isinstance(metric, Gauge) else "counter"
+            lines.append(f"# TYPE {metric.name} {kind}")
+            for labels, value in metric.samples():
+                lines.append(f"{metric.name}{_labels(labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from collections import deque
+from contextlib import nullcontext
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+from ..admission import AdmissionController, Overloaded, SHED
+from ..config import settings
+from ..contracts import BatchResult, SearchRequest
+from ..log import request_id, new_request_id
+
+
+logger = logging.getLogger(__name__)
+
+# Shared by every batch in the process, so concurrent batches stay within BATCH_CONCURRENCY
+_slots: Optional[asyncio.Semaphore] = None
+
+
+def _batch_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(max(1, settings.BATCH_CONCURRENCY))
+    return _slots
+
+
+async def run_batch(pipeline, requests: List[SearchRequest], concurrency: Optional[int] = None,
+                    admission: Optional[AdmissionController] = None) -> AsyncIterator[BatchResult]:
+    """
+    Run a batch of searches, yielding each result as soon as it finishes.
+
+    Results arrive in completion order; BatchResult.index gives the input
+    position. At most `concurrency` searches of the batch run at once, and at
+    most BATCH_CONCURRENCY across all batches. Identical requests run once.
+    Queries that hit the same pages share their extraction through the
+    pipeline's in-flight table and URL cache, and a failed search yields a
+    result with error set instead of ending the batch.
+
+    With an admission controller, each search also takes one of its slots,
+    so a batch counts against the same in-flight limit as single searches.
+    A search that is not admitted gets the cached answer if there is one,
+    and otherwise a result with the overload error.
+    """
+    limit = max(1, min(concurrency or settings.BATCH_CONCURRENCY, settings.BATCH_CONCURRENCY))
+    if request_id.get() == "-":
+        request_id.set(new_request_id())
+    batch_id = request_id.get()
+
+    # Identical requests share one run
+    groups: Dict[str, List[int]] = {}
+    for index, req in enumerate(requests):
+        groups.setdefault(req.model_dump_json(), []).append(index)
+    pending: Deque[Tuple[List[int], SearchRequest]] = deque(
+        (indices, requests[indices[0]]) for indices in groups.values()
+    )
+    logger.info("Starting batch of %d searches (%d distinct)", len(requests), len(pending))
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        while pending:
+            indices, req = pending.popleft()
+            async with _batch_slots():
+                request_id.set(f"{batch_id}.{indices[0]}")
+                response, error = None, None
+                try:
+                    async with admission.slot() if admission is not None else nullcontext():
+                        response = await pipeline.run(req)
+                except Overloaded as e:
+                    response = await pipeline.cached_response(req)
+                    SHED.inc(reason=e.reason, served="cache" if response else "rejected")
+                    if response is None:
+                        error = str(e)
+                except Exception as e:
+                    logger.warning("Batch search %d failed: %s", indices[0], e)
+                    error = f"Pipeline error: {str(e)}"
+            for index in indices:
+                results.put_nowait(BatchResult(index=index, query=req.query, response=response, error=error))
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(limit, len(pending)))]
+    try:
+        for _ in range(len(requests)):
+            yield await results.get()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,216 @@
+import asyncio
+import inspect
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from ..config import settings
+from ..contracts import SearchRequest, SearchResult
+from ..extract.dedup import dedupe_documents
+from ..rank.batch import rank_batch
+from ..tracing import span
+from ..util.urls import canonicalize_url
+
+
+logger = logging.getLogger(__name__)
+
+# End-of-stream marker put on a channel once all of its producers are done
+_CLOSED = object()
+
+
+class Channel:
+    """
+    Bounded queue connecting stages.
+
+    put() waits while the queue is full, so a slow consumer holds back its
+    producers. The channel ends once every producer has closed it, and all
+    consumers iterating it then stop.
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.producers = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    async def put(self, item: Any) -> None:
+        await self._queue.put(item)
+
+    async def close(self) -> None:
+        """
+        Called once by each producer when it is done.
+        """
+        self.producers -= 1
+        if self.producers <= 0:
+            await self._queue.put(_CLOSED)
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        while True:
+            item = await self._queue.get()
+            if item is _CLOSED:
+                # Leave the marker for the other workers reading this channel
+                self._queue.put_nowait(_CLOSED)
+                return
+            yield item
+
+
+class StageGraph:
+    """
+    Async stages running concurrently, connected by bounded channels.
+
+    A source writes to its outbox; a map stage runs a pool of workers that
+    take items from the inbox and write what the function returns (or yields,
+    for async generator functions) to the outbox; a sink consumes its inbox.
+    Each outbox is closed when every stage worker writing to it has finished.
+    Stages are traced as spans named after them. If a stage fails, the other
+    stages are cancelled and run() raises its exception.
+    """
+
+    def __init__(self, queue_size: Optional[int] = None):
+        self.queue_size = queue_size or settings.DATAFLOW_QUEUE_SIZE
+        self._stages: List[Callable[[], Awaitable[None]]] = []
+
+    def channel(self, name: str) -> Channel:
+        return Channel(name, self.queue_size)
+
+    def source(self, name: str, fn: Callable[[Channel], Awaitable[None]], outbox: Channel) -> None:
+        self._add(name, [lambda: fn(outbox)], outbox)
+
+    def map(self, name: str, fn: Callable[[Any], Any], inbox: Channel,
+            outbox: Optional[Channel] = None, workers: int = 1) -> None:
+        async def worker():
+            async for item in inbox:
+                if inspect.isasyncgenfunction(fn):
+                    async for result in fn(item):
+                        if outbox is not None:
+                            await outbox.put(result)
+                else:
+                    result = await fn(item)
+                    if outbox is not None and result is not None:
+                        await outbox.put(result)
+
+        self._add(name, [worker] * max(1, workers), outbox)
+
+    def sink(self, name: str, fn: Callable[[Channel], Awaitable[None]], inbox: Channel) -> None:
+        self._add(name, [lambda: fn(inbox)], None)
+
+    def _add(self, name: str, workers: List[Callable[[], Awaitable[None]]], outbox: Optional[Channel]) -> None:
+        if outbox is not None:
+            outbox.producers += len(workers)
+
+        async def run_worker(worker):
+            await worker()
+            if outbox is not None:
+                await outbox.close()
+
+        async def stage():
+            with span(name):
+                await asyncio.gather(*(run_worker(worker) for worker in workers))
+
+        self._stages.append(stage)
+
+    async def run(self) -> None:
+        tasks = [asyncio.ensure_future(stage()) for stage in self._stages]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def gather_documents(pipeline, req: SearchRequest,
+                           emit: Callable[[str, Dict[str, Any]], None]) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """
+    Normalize, search, rank and extract as a stage graph built from the pipeline's steps.
+
+        discover -> candidates -> rank -> urls -> extract (workers) -> docs -> pack
+
+    Extraction starts on the raw-query results while normalization and any
+    second search are still running, and documents are reranked as they
+    arrive once the query is known. The final ranking decides which documents
+    reach synthesis; pages extracted for URLs that dropped out of it are still
+    cached and stored. Returns the same values as Pipeline._gather_documents.
+    """
+    graph = StageGraph()
+    candidates = graph.channel("candidates")
+    urls = graph.channel("urls")
+    docs = graph.channel("docs")
+
+    # Resolved with the query passages are reranked against, once normalization settles
+    query: asyncio.Future = asyncio.get_running_loop().create_future()
+    state: Dict[str, Any] = {"normalized": None, "ranked": [], "raw": None}
+    sent: Set[str] = set()
+    packed: Dict[str, Dict[str, Any]] = {}
+    reranked: Set[str] = set()
+
+    async def discover(outbox: Channel) -> None:
+        async def on_raw_results(results: List[SearchResult]) -> None:
+            state["raw"] = results
+            await outbox.put((None, results))
+
+        logger.debug("Step 2: Normalizing query...")
+        emit("status", {"stage": "normalize"})
+        normalized, results = await pipeline._normalize_and_search(req, emit, on_raw_results=on_raw_results)
+        state["normalized"] = normalized
+        query.set_result(normalized or req.query)
+        logger.debug("Found %d search results", len(results))
+        # Unchanged raw results were already ranked
+        if results is not state["raw"]:
+            await outbox.put((normalized, results))
+
+    async def rank(item: Tuple[Optional[str], List[SearchResult]]) -> AsyncIterator[Tuple[str, str]]:
+        normalized, results = item
+        with span("rank", candidates=len(results)):
+            ranked = rank_batch(
+                results,
+                req.includeDomains,
+                req.excludeDomains,
+                req.maxResults,
+                query=req.query if settings.RANK_QUERY_RELEVANCE else None
+            )
+        emit("search", {"results": [result.model_dump() for result in ranked]})
+        if settings.EXTRACT_PRESELECT:
+            with span("preselect"):
+                ranked = await pipeline._preselect(req, normalized, ranked)
+        state["ranked"] = ranked
+        for result in ranked:
+            key = canonicalize_url(result.url)
+            if key in sent:
+                continue
+            if not sent:
+                emit("status", {"stage": "extract"})
+            sent.add(key)
+            yield key, result.url
+
+    async def extract(item: Tuple[str, str]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        key, url = item
+        doc = await pipeline._extract_one(url)
+        return (key, doc) if doc else None
+
+    async def pack(inbox: Channel) -> None:
+        async for key, doc in inbox:
+            packed[key] = doc
+            if query.done():
+                with span("rerank"):
+                    packed[key] = (await pipeline._rerank_passages(query.result(), [doc]))[0]
+                reranked.add(key)
+
+    graph.source("flow.discover", discover, candidates)
+    graph.map("flow.rank", rank, candidates, urls)
+    graph.map("flow.extract", extract, urls, docs, workers=min(settings.MAX_CONCURRENCY, 3))
+    graph.sink("flow.pack", pack, docs)
+    await graph.run()
+
+    # Documents in final rank order, as the sequential executor passes them on
+    keys = [key for key in dict.fromkeys(canonicalize_url(result.url) for result in state["ranked"]) if key in packed]
+    logger.debug("Extracted %d URLs, %d in the final ranking", len(packed), len(keys))
+    with span("dedupe"):
+        final = await asyncio.to_thread(dedupe_documents, [packed[key] for key in keys])
+    keys_by_doc = {id(packed[key]): key for key in keys}
+    late = [i for i, doc in enumerate(final) if keys_by_doc[id(doc)] not in reranked]
+    if late:
+        with span("rerank"):
+            for i, doc in zip(late, await pipeline._rerank_passages(query.result(), [final[i] for i in late])):
+                final[i] = doc
+    return state["normalized"], final
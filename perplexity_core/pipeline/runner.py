@@ -1,24 +1,67 @@
+import asyncio
+import logging
 import time
-import json
-from typing import List, Dict, Any, Optional
+import httpx
+from functools import cached_property
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Any, Optional, Tuple, Union
 from ..contracts import SearchRequest, SearchResponse, SearchResult, Diagnostics
 from ..config import settings
-from ..hashing import query_key
-from ..cache.redis_cache import Cache
-from ..search.tavily import TavilySearchProvider
-from ..search.brave import BraveSearchProvider
-from ..search.searchapi import SearchApiProvider
-from ..extract.firecrawl import FirecrawlExtractor
-from ..extract.readability import ReadabilityExtractor
-from ..rank.ranker import rank
-from ..llm.openrouter import OpenRouterProvider
-from ..llm.ollama import OllamaProvider
+from ..hashing import query_key, url_key
+from ..extract.boilerplate import BoilerplateFilter
+from ..extract.dedup import dedupe_documents
+from ..rank.batch import rank_batch
+from ..rank.prefetch import select_for_extraction, probe_pdf_sizes
+from ..llm.base import LLMProvider, load_durations, served_by
+from ..llm.cached import with_cache
+from ..llm.scheduler import schedule, CALL_PRIORITIES
 from ..synth.prompts import QUERY_NORMALIZER_SYSTEM, QUERY_NORMALIZER_USER, SYNTHESIS_SYSTEM
-from ..synth.prompts import SYNTHESIS_USER, SAFETY_GUARD_SYSTEM
+from ..synth.prompts import SYNTHESIS_USER, SYNTHESIS_USER_NATIVE, SAFETY_GUARD_SYSTEM
+from ..synth.schema import synthesis_json_schema
 from ..synth.composer import compose_synthesis_prompt, compose_query_normalization_prompt
 from ..synth.repair import ensure_json
+from ..synth.jsonstream import IncrementalJSONParser
+from ..synth.normalize import should_normalize, query_change
 from ..safety.guard import apply_safety_guard
+from ..store.records import RecordSink, build_record
 from ..util.text import clean_text
+from ..util.urls import canonicalize_url, unique_urls
+from ..util.singleflight import SingleFlight
+from ..util import fastjson
+from ..metrics import counter, histogram
+from .. import registry
+from ..tracing import Trace, current_trace, span
+from ..log import SAMPLED, request_id, new_request_id
+from .dataflow import gather_documents
+from .warmer import PopularQueries
+
+
+logger = logging.getLogger(__name__)
+
+NORMALIZE_OUTCOMES = counter(
+    "query_normalization_total",
+    "Query normalization outcomes by kind",
+    ("outcome",)
+)
+REQUEST_SECONDS = histogram(
+    "pipeline_request_seconds",
+    "End-to-end pipeline latency",
+    ("cached",)
+)
+CACHE_LOOKUPS = counter(
+    "cache_lookups_total",
+    "Answer, URL content and document store lookups by result",
+    ("cache", "result")
+)
+SEARCH_ERRORS = counter(
+    "search_provider_errors_total",
+    "Search provider failures",
+    ("provider",)
+)
+FALLBACKS = counter(
+    "pipeline_fallbacks_total",
+    "Fallbacks taken after a search or extraction failure",
+    ("stage", "to")
+)
 
 
 class Pipeline:
@@ -27,89 +70,244 @@ class Pipeline:
     """
     
     def __init__(self):
-        self.cache = Cache()
-        self.firecrawl = FirecrawlExtractor()
-        self.readability = ReadabilityExtractor()
-        print("Pipeline initialized with Firecrawl and Readability extractors")
+        # Shared across extractors so the per-domain frequency table sees every page
+        self.boilerplate = BoilerplateFilter() if settings.BOILERPLATE_FILTER else None
+        # URLs being extracted right now, shared by concurrent requests (and batch queries)
+        self.inflight = SingleFlight()
+        # Live request counts per query for the cache warmer running in this process
+        self.popular = PopularQueries(settings.WARM_TRACK_SIZE, settings.WARM_HALF_LIFE_S) if settings.WARM_ENABLED else None
+    
+    # Components are imported and built on first use: a cached answer needs
+    # only the cache, and a missing Firecrawl key fails the Firecrawl call
+    # (falling back to Readability) instead of the constructor.
+    
+    @cached_property
+    def cache(self):
+        return registry.create("cache", "redis")
+    
+    @cached_property
+    def firecrawl(self):
+        return registry.create("extract", "firecrawl", boilerplate=self.boilerplate)
+    
+    @cached_property
+    def readability(self):
+        return registry.create("extract", "readability", boilerplate=self.boilerplate)
+    
+    @cached_property
+    def docstore(self):
+        if not settings.DOCSTORE_ENABLED:
+            return None
+        try:
+            return registry.create("store", "docstore")
+        except Exception as e:
+            logger.warning("Document store unavailable, continuing without it: %s", e)
+            return None
+    
+    @cached_property
+    def passages(self):
+        if not settings.VECTOR_ENABLED:
+            return None
+        try:
+            # Passage text is read back from the document store, not kept in the index
+            return registry.create("store", "passages", texts=self.docstore.text if self.docstore else None)
+        except Exception as e:
+            logger.warning("Passage index unavailable, continuing without it: %s", e)
+            return None
+    
+    @cached_property
+    def records(self) -> Optional[RecordSink]:
+        return RecordSink() if settings.RECORDS_ENABLED else None
+    
+    async def close(self) -> None:
+        """
+        Write buffered query records; call before the event loop ends.
+        """
+        if self.__dict__.get("records") is not None:
+            await self.records.close()
     
     async def run(self, req: SearchRequest) -> SearchResponse:
         """
         Run the complete search pipeline.
         """
-        print(f"Starting pipeline for query: {req.query}")
+        return await self._execute(req)
+    
+    async def run_json(self, req: SearchRequest) -> bytes:
+        """
+        Run the complete search pipeline, returning the SearchResponse as JSON bytes.
+        
+        Cache hits take a fast path that patches the cached JSON instead of
+        validating and re-serializing a model, so API handlers can return the
+        bytes as they are.
+        """
+        return await self._execute(req, raw=True)
+    
+    async def refresh(self, req: SearchRequest) -> SearchResponse:
+        """
+        Run the pipeline without reading the answer cache, replacing the cached answer.
+        
+        Used by the cache warmer: the run is not counted as a request for
+        popularity or written to the query history.
+        """
+        return await self._execute(req, refresh=True)
+    
+    async def run_stream(self, req: SearchRequest) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Run the pipeline, yielding (event, data) pairs as stages complete.
+        
+        Events: "status" (stage started), "query" (query used for search),
+        "search" (ranked results), "sources" (URLs chosen for synthesis),
+        "token" (synthesis output chunk) and finally "result" (the complete
+        SearchResponse). Exceptions propagate after pending events are yielded.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        
+        async def produce():
+            try:
+                response = await self._execute(req, emit=lambda event, data: queue.put_nowait((event, data)))
+                queue.put_nowait(("result", response.model_dump()))
+            finally:
+                queue.put_nowait(done)
+        
+        task = asyncio.create_task(produce())
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                yield item
+            await task
+        finally:
+            if not task.done():
+                task.cancel()
+    
+    async def cached_response(self, req: SearchRequest) -> Optional[SearchResponse]:
+        """
+        The cached answer for a request without running the pipeline.
+        
+        Falls back to the stale copy kept for STALE_TTL_S (noted in
+        diagnostics.notes). Used to answer requests that are shed under load.
+        """
+        cache_key = query_key(req)
+        stale = False
+        data = await self.cache.get(cache_key)
+        if not data:
+            data = await self.cache.get_stale(cache_key)
+            stale = True
+        if not data:
+            return None
+        try:
+            response = SearchResponse.model_validate_json(data)
+        except Exception as e:
+            logger.warning("Cached answer unreadable: %s", e)
+            return None
+        response.diagnostics.cached = True
+        response.diagnostics.latencyMs = 0
+        response.diagnostics.llmLoadMs = None
+        if stale:
+            response.diagnostics.notes = "Stale answer served while the server is overloaded"
+        return response
+    
+    async def _execute(self, req: SearchRequest,
+                       emit: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                       raw: bool = False, refresh: bool = False) -> Union[SearchResponse, bytes]:
+        """
+        Pipeline body shared by run, run_json and run_stream; emit receives stage events when streaming.
+        
+        With raw set the response is returned as JSON bytes, and cache hits
+        never go through pydantic (see _patch_cached).
+        """
+        stream_tokens = emit
+        emit = emit or (lambda event, data: None)
+        # The API sets the request ID from X-Request-ID; CLI and library runs get a fresh one
+        if request_id.get() == "-":
+            request_id.set(new_request_id())
+        logger.info("Starting pipeline for query: %s", req.query)
         start_time = time.time()
+        # Ollama calls append their model load times here and stages their spans
+        # (each request runs in its own task, so these do not leak between requests)
+        model_loads: List[float] = []
+        load_durations.set(model_loads)
+        trace = Trace()
+        current_trace.set(trace)
         
         # 1. Cache lookup
-        print("Step 1: Checking cache...")
+        logger.debug("Step 1: Checking cache...")
+        emit("status", {"stage": "cache"})
         cache_key = query_key(req)
-        cached_result = await self.cache.get(cache_key)
+        cached_result = None
+        if not refresh:
+            if self.popular is not None:
+                self.popular.add(cache_key, req)
+            with span("cache") as attrs:
+                cached_result = await self.cache.get(cache_key)
+                attrs["hit"] = bool(cached_result)
+            CACHE_LOOKUPS.inc(cache="query", result="hit" if cached_result else "miss")
         if cached_result:
             try:
-                print("Cache hit! Returning cached result...")
-                cached_data = json.loads(cached_result)
-                response = SearchResponse(**cached_data)
-                response.diagnostics.latencyMs = int((time.time() - start_time) * 1000)
-                response.diagnostics.cached = True
+                logger.debug("Cache hit! Returning cached result...")
+                latency_ms = int((time.time() - start_time) * 1000)
+                spans = trace.sorted_spans() if req.trace else None
+                if raw:
+                    response = self._patch_cached(cached_result, latency_ms, spans)
+                else:
+                    response = SearchResponse.model_validate_json(cached_result)
+                    response.diagnostics.latencyMs = latency_ms
+                    response.diagnostics.cached = True
+                    response.diagnostics.llmLoadMs = None
+                    response.diagnostics.spans = spans
+                REQUEST_SECONDS.observe(time.time() - start_time, cached="true")
+                logger.info("Pipeline completed from cache", extra={"latency_ms": latency_ms, "cached": True})
                 return response
             except Exception as e:
-                print(f"Cache corrupted, continuing with normal processing: {e}")
+                logger.warning("Cache corrupted, continuing with normal processing: %s", e)
                 # If cache is corrupted, continue with normal processing
                 pass
         else:
-            print("Cache miss, proceeding with search...")
-        
-        # 2. Query normalization (optional)
-        print("Step 2: Normalizing query...")
-        normalized_query = await self._maybe_normalize(req)
-        query_to_use = normalized_query or req.query
-        print(f"Using query: {query_to_use}")
-        
-        # 3. Search
-        print("Step 3: Performing search...")
-        search_results = await self._search(query_to_use, req)
-        print(f"Found {len(search_results)} search results")
-        
-        # 4. Rank and deduplicate
-        print("Step 4: Ranking and deduplicating results...")
-        ranked_results = rank(
-            search_results, 
-            req.includeDomains, 
-            req.excludeDomains, 
-            req.maxResults
-        )
-        print(f"Ranked down to {len(ranked_results)} results")
+            logger.debug("Cache miss, proceeding with search...")
         
-        # 5. Extract content
-        print("Step 5: Extracting content from URLs...")
-        urls = [result.url for result in ranked_results]
-        print(f"Extracting from {len(urls)} URLs: {urls}")
-        extracted_docs = await self._fetch_extract(urls)
-        print(f"Successfully extracted content from {len(extracted_docs)} URLs")
+        # 2-5. Normalize, search, rank and extract
+        if settings.PIPELINE_EXECUTOR.lower() == "dataflow":
+            normalized_query, extracted_docs = await gather_documents(self, req, emit)
+        else:
+            normalized_query, extracted_docs = await self._gather_documents(req, emit)
+        emit("sources", {"sources": [
+            {"url": doc.get("url", ""), "title": doc.get("title", "")} for doc in extracted_docs
+        ]})
         
         # 6. Synthesize answer
-        print("Step 6: Synthesizing answer...")
+        logger.debug("Step 6: Synthesizing answer...")
+        emit("status", {"stage": "synthesize"})
         synthesis_payload = compose_synthesis_prompt(req, extracted_docs)
-        raw_response = await self._synthesize(synthesis_payload)
-        print("Synthesis completed, repairing JSON...")
-        repaired_response = await ensure_json(raw_response)
-        print("JSON repair completed")
+        served_by.set(None)
+        with span("synthesize", provider="ollama" if req.forceLocal else "openrouter"):
+            raw_response = await self._synthesize(synthesis_payload, req.forceLocal, stream_tokens)
+        # The scheduler may have moved a local call to OpenRouter
+        served = served_by.get()
+        logger.debug("Synthesis completed, repairing JSON...")
+        with span("repair"):
+            repaired_response = await ensure_json(raw_response)
+        logger.debug("JSON repair completed")
         
         # 7. Apply safety guard
-        print("Step 7: Applying safety guard...")
-        safe_response = apply_safety_guard(repaired_response)
-        print("Safety guard applied")
+        logger.debug("Step 7: Applying safety guard...")
+        with span("safety"):
+            safe_response = apply_safety_guard(repaired_response, req.query)
+        logger.debug("Safety guard applied")
         
         # 8. Create diagnostics
-        print("Step 8: Creating diagnostics...")
+        logger.debug("Step 8: Creating diagnostics...")
         diagnostics = Diagnostics(
             searchProvider="brave",  # Default to brave since it's configured
-            llm=settings.OPENROUTER_MODEL if not req.forceLocal else settings.OLLAMA_MODEL,
+            llm=served[1] if served else (settings.OLLAMA_MODEL if req.forceLocal else settings.OPENROUTER_MODEL),
             latencyMs=int((time.time() - start_time) * 1000),
-            cached=False
+            cached=False,
+            llmLoadMs=int(sum(model_loads) * 1000) if model_loads else None,
+            spans=trace.sorted_spans() if req.trace else None
         )
         
         # 9. Create final response
-        print("Step 9: Creating final response...")
+        logger.debug("Step 9: Creating final response...")
         response = SearchResponse(
             answer=safe_response.get("answer", ""),
             bullets=safe_response.get("bullets", []),
@@ -118,181 +316,572 @@ class Pipeline:
         )
         
         # 10. Cache result
-        print("Step 10: Caching result...")
+        logger.debug("Step 10: Caching result...")
         try:
-            await self.cache.set(
-                cache_key, 
-                response.model_dump_json(), 
-                ttl=settings.CACHE_TTL_S
-            )
-            print("Result cached successfully")
+            # Spans describe this run only, so they are not cached
+            payload = response.model_dump_json(exclude={"diagnostics": {"spans"}})
+            await self.cache.set(cache_key, payload, ttl=settings.CACHE_TTL_S)
+            if settings.STALE_TTL_S > 0:
+                await self.cache.set_stale(cache_key, payload, ttl=settings.STALE_TTL_S)
+            logger.debug("Result cached successfully")
         except Exception as e:
-            print(f"Failed to cache result: {e}")
+            logger.warning("Failed to cache result: %s", e)
             # Cache failure shouldn't break the pipeline
         
-        print("Pipeline completed successfully")
+        # 11. Record the query; written in batches off the request path
+        if self.records and not refresh:
+            try:
+                await self.records.submit(build_record(req, normalized_query, response))
+            except Exception as e:
+                logger.warning("Failed to record query: %s", e)
+        
+        latency = time.time() - start_time
+        REQUEST_SECONDS.observe(latency, cached="false")
+        logger.info("Pipeline completed successfully",
+                    extra={"latency_ms": int(latency * 1000), "cached": False, "sources": len(response.sources)})
+        if raw:
+            return response.model_dump_json().encode("utf-8")
         return response
     
+    @staticmethod
+    def _patch_cached(cached: str, latency_ms: int, spans: Optional[List[Dict[str, Any]]]) -> bytes:
+        """
+        Serve a cached answer as JSON bytes with only its diagnostics updated.
+        
+        The cached JSON was written from a validated SearchResponse, so it is
+        parsed and re-serialized (with orjson when installed) without building
+        the model again.
+        """
+        data = fastjson.loads(cached)
+        diagnostics = data.get("diagnostics") if isinstance(data, dict) else None
+        if not isinstance(diagnostics, dict):
+            raise ValueError("cached answer has no diagnostics")
+        diagnostics["latencyMs"] = latency_ms
+        diagnostics["cached"] = True
+        diagnostics["llmLoadMs"] = None
+        diagnostics["spans"] = spans
+        return fastjson.dumps(data)
+    
+    async def _gather_documents(self, req: SearchRequest,
+                                emit: Callable[[str, Dict[str, Any]], None]) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """
+        Normalize, search, rank and extract one stage after another.
+        
+        Returns the normalized query (or None) and the deduplicated, reranked
+        documents for synthesis. PIPELINE_EXECUTOR=dataflow replaces this with
+        dataflow.gather_documents, which overlaps the stages.
+        """
+        # 2-3. Query normalization (optional) and search
+        logger.debug("Step 2: Normalizing query...")
+        emit("status", {"stage": "normalize"})
+        normalized_query, search_results = await self._normalize_and_search(req, emit)
+        query_to_use = normalized_query or req.query
+        logger.debug("Found %d search results", len(search_results))
+        
+        # 4. Rank and deduplicate
+        logger.debug("Step 4: Ranking and deduplicating results...")
+        with span("rank", candidates=len(search_results)):
+            ranked_results = rank_batch(
+                search_results, 
+                req.includeDomains, 
+                req.excludeDomains, 
+                req.maxResults,
+                query=req.query if settings.RANK_QUERY_RELEVANCE else None
+            )
+        logger.debug("Ranked down to %d results", len(ranked_results))
+        emit("search", {"results": [result.model_dump() for result in ranked_results]})
+        
+        # 5. Extract content
+        logger.debug("Step 5: Extracting content from URLs...")
+        emit("status", {"stage": "extract"})
+        if settings.EXTRACT_PRESELECT:
+            with span("preselect"):
+                ranked_results = await self._preselect(req, normalized_query, ranked_results)
+        urls = unique_urls(result.url for result in ranked_results)
+        logger.debug("Extracting from %d URLs: %s", len(urls), urls)
+        with span("extract", urls=len(urls)) as attrs:
+            extracted_docs = await self._fetch_extract(urls)
+            attrs["documents"] = len(extracted_docs)
+        logger.debug("Successfully extracted content from %d URLs", len(extracted_docs))
+        with span("dedupe"):
+            extracted_docs = await asyncio.to_thread(dedupe_documents, extracted_docs)
+        with span("rerank"):
+            extracted_docs = await self._rerank_passages(query_to_use, extracted_docs)
+        return normalized_query, extracted_docs
+    
+    async def _normalize_and_search(self, req: SearchRequest,
+                                    emit: Callable[[str, Dict[str, Any]], None],
+                                    on_raw_results: Optional[Callable[[List[SearchResult]], Awaitable[None]]] = None
+                                    ) -> Tuple[Optional[str], List[SearchResult]]:
+        """
+        Normalize the query and search according to NORMALIZE_MODE.
+        
+        "blocking" waits for the normalized query before searching with it.
+        "speculative" searches the raw query while normalization runs, and
+        searches again only when the normalized query differs by at least
+        NORMALIZE_MIN_CHANGE; the second results are merged with the first
+        (normalized first) or replace them. Queries the classifier expects no
+        benefit from skip normalization in both modes.
+        
+        In speculative mode on_raw_results, when given, receives the raw-query
+        results as soon as they arrive, before normalization has finished.
+        """
+        mode = settings.NORMALIZE_MODE.lower()
+        if mode == "off" or (settings.NORMALIZE_CLASSIFIER and not should_normalize(req)):
+            logger.debug("Query normalization skipped")
+            NORMALIZE_OUTCOMES.inc(outcome="skipped")
+            emit("query", {"query": req.query, "normalized": None})
+            logger.debug("Step 3: Performing search...")
+            emit("status", {"stage": "search"})
+            return None, await self._search(req.query, req)
+        
+        if mode != "speculative":
+            normalized_query = await self._maybe_normalize(req)
+            query_to_use = normalized_query or req.query
+            logger.debug("Using query: %s", query_to_use)
+            NORMALIZE_OUTCOMES.inc(outcome="blocking" if normalized_query else "failed")
+            emit("query", {"query": req.query, "normalized": normalized_query})
+            logger.debug("Step 3: Performing search...")
+            emit("status", {"stage": "search"})
+            return normalized_query, await self._search(query_to_use, req)
+        
+        logger.debug("Step 3: Performing search on the raw query while normalizing...")
+        emit("status", {"stage": "search"})
+        normalize = asyncio.ensure_future(self._maybe_normalize(req))
+        try:
+            raw_results = await self._search(req.query, req)
+            if on_raw_results is not None:
+                await on_raw_results(raw_results)
+            normalized_query = await normalize
+        finally:
+            normalize.cancel()
+        emit("query", {"query": req.query, "normalized": normalized_query})
+        if not normalized_query:
+            NORMALIZE_OUTCOMES.inc(outcome="failed")
+            return None, raw_results
+        
+        change = query_change(req.query, normalized_query)
+        if change < settings.NORMALIZE_MIN_CHANGE:
+            logger.debug("Normalized query is close to the raw query (%.2f), keeping raw results", change)
+            NORMALIZE_OUTCOMES.inc(outcome="unchanged")
+            return normalized_query, raw_results
+        
+        logger.debug("Normalized query differs (%.2f), searching again: %s", change, normalized_query)
+        normalized_results = await self._search(normalized_query, req)
+        if settings.NORMALIZE_MERGE.lower() == "replace" and normalized_results:
+            NORMALIZE_OUTCOMES.inc(outcome="replaced")
+            return normalized_query, normalized_results
+        NORMALIZE_OUTCOMES.inc(outcome="merged")
+        # Ranking keeps the first occurrence of each canonical URL, so normalized results win ties
+        return normalized_query, normalized_results + raw_results
+    
+    def _llm(self, provider: LLMProvider, call_type: str) -> LLMProvider:
+        """
+        Put the response cache and the backend's scheduler queue in front of a provider.
+        """
+        return with_cache(schedule(provider, CALL_PRIORITIES[call_type]), call_type, self.cache)
+    
     async def _maybe_normalize(self, req: SearchRequest) -> Optional[str]:
         """
         Optionally normalize the query using an LLM.
         """
-        print("Normalizing query...")
+        logger.debug("Normalizing query...")
         try:
             # Use OpenRouter for normalization (or Ollama if forced local)
             if req.forceLocal:
-                provider = OllamaProvider()
-                print("Using Ollama for query normalization")
+                provider = self._llm(registry.create("llm", "ollama"), "normalize")
+                logger.debug("Using Ollama for query normalization")
             else:
-                provider = OpenRouterProvider()
-                print("Using OpenRouter for query normalization")
+                provider = self._llm(registry.create("llm", "openrouter"), "normalize")
+                logger.debug("Using OpenRouter for query normalization")
             
             prompt_data = compose_query_normalization_prompt(req)
             user_prompt = QUERY_NORMALIZER_USER.format(**prompt_data)
             
-            normalized = await provider.chat(
-                QUERY_NORMALIZER_SYSTEM,
-                user_prompt,
-                temperature=0.2
-            )
+            with span("normalize", provider=provider.backend):
+                normalized = await provider.chat(
+                    QUERY_NORMALIZER_SYSTEM,
+                    user_prompt,
+                    temperature=0.2
+                )
             
             cleaned = clean_text(normalized)
-            print(f"Query normalized to: {cleaned}")
+            logger.debug("Query normalized to: %s", cleaned)
             return cleaned
         except Exception as e:
-            print(f"Query normalization failed: {e}")
+            logger.warning("Query normalization failed: %s", e)
             # If normalization fails, return None to use original query
             return None
     
+    async def _preselect(self, req: SearchRequest, normalized_query: Optional[str],
+                         results: List[SearchResult]) -> List[SearchResult]:
+        """
+        Keep only the results whose snippets are expected to cover the answer.
+        """
+        try:
+            pdf_sizes = await probe_pdf_sizes([result.url for result in results])
+            selected = select_for_extraction(results, req.query, normalized_query, pdf_sizes=pdf_sizes)
+            logger.debug("Selected %d of %d results for extraction", len(selected), len(results))
+            return selected
+        except Exception as e:
+            logger.warning("Pre-extraction selection failed, extracting all results: %s", e)
+            return results
+    
     async def _search(self, query: str, req: SearchRequest) -> List[SearchResult]:
         """
         Perform search using the appropriate provider.
         """
-        print(f"Searching for: {query}")
+        logger.debug("Searching for: %s", query)
+        # Answer from already-fetched documents when the store covers the query
+        if self.docstore and settings.DOCSTORE_PREFER_LOCAL:
+            with span("search", provider="local"):
+                results = await self._search_local(query, req)
+            if len(results) >= settings.DOCSTORE_MIN_LOCAL_RESULTS:
+                logger.debug("Local document store returned %d results, skipping web search", len(results))
+                return results
+        
         # Try Brave first since it's configured in the .env file
         try:
-            print("Trying Brave Search...")
-            provider = BraveSearchProvider()
-            results = await provider.search(
-                query, 
-                req.maxResults, 
-                req.includeDomains, 
-                req.excludeDomains
-            )
-            print(f"Brave Search returned {len(results)} results")
+            logger.debug("Trying Brave Search...")
+            provider = registry.create("search", "brave")
+            with span("search", provider="brave"):
+                results = await provider.search(
+                    query, 
+                    req.maxResults, 
+                    req.includeDomains, 
+                    req.excludeDomains
+                )
+            logger.debug("Brave Search returned %d results", len(results))
             return results
         except Exception as e:
-            print(f"Brave search failed: {e}")
+            logger.warning("Brave search failed: %s", e)
+            SEARCH_ERRORS.inc(provider="brave")
         
         # Fallback to Tavily
         try:
-            print("Trying Tavily Search...")
-            provider = TavilySearchProvider()
-            results = await provider.search(
-                query, 
-                req.maxResults, 
-                req.includeDomains, 
-                req.excludeDomains
-            )
-            print(f"Tavily Search returned {len(results)} results")
+            logger.debug("Trying Tavily Search...")
+            FALLBACKS.inc(stage="search", to="tavily")
+            provider = registry.create("search", "tavily")
+            with span("search", provider="tavily"):
+                results = await provider.search(
+                    query, 
+                    req.maxResults, 
+                    req.includeDomains, 
+                    req.excludeDomains
+                )
+            logger.debug("Tavily Search returned %d results", len(results))
             return results
         except Exception as e:
-            print(f"Tavily search failed: {e}")
+            logger.warning("Tavily search failed: %s", e)
+            SEARCH_ERRORS.inc(provider="tavily")
         
         # Fallback to SearchAPI
         try:
-            print("Trying SearchAPI...")
-            provider = SearchApiProvider()
-            results = await provider.search(
-                query, 
-                req.maxResults, 
-                req.includeDomains, 
-                req.excludeDomains
-            )
-            print(f"SearchAPI returned {len(results)} results")
+            logger.debug("Trying SearchAPI...")
+            FALLBACKS.inc(stage="search", to="searchapi")
+            provider = registry.create("search", "searchapi")
+            with span("search", provider="searchapi"):
+                results = await provider.search(
+                    query, 
+                    req.maxResults, 
+                    req.includeDomains, 
+                    req.excludeDomains
+                )
+            logger.debug("SearchAPI returned %d results", len(results))
             return results
         except Exception as e:
-            print(f"SearchAPI search failed: {e}")
+            logger.warning("SearchAPI search failed: %s", e)
+            SEARCH_ERRORS.inc(provider="searchapi")
+        
+        # Fallback to previously extracted documents
+        if self.docstore:
+            FALLBACKS.inc(stage="search", to="local")
+            with span("search", provider="local"):
+                results = await self._search_local(query, req)
+            if results:
+                logger.warning("All web providers failed, local document store returned %d results", len(results))
+                return results
         
         # If all providers fail, return empty list
-        print("All search providers failed, returning empty results")
+        logger.warning("All search providers failed, returning empty results")
         return []
     
+    async def _search_local(self, query: str, req: SearchRequest) -> List[SearchResult]:
+        """
+        Search the local document store.
+        """
+        try:
+            provider = registry.create("search", "local", self.docstore)
+            return await provider.search(
+                query,
+                req.maxResults,
+                req.includeDomains,
+                req.excludeDomains
+            )
+        except Exception as e:
+            logger.warning("Local document search failed: %s", e)
+            return []
+    
     async def _fetch_extract(self, urls: List[str]) -> List[Dict[str, Any]]:
         """
-        Fetch and extract content from URLs.
+        Fetch and extract content from URLs, returning documents in the order of urls.
         """
-        print(f"Fetching and extracting from {len(urls)} URLs")
+        logger.debug("Fetching and extracting from %d URLs", len(urls))
         # Try to get from cache first
         docs = []
         uncached_urls = []
         
         for url in urls:
-            url_cache_key = query_key(SearchRequest(query=url))  # Reuse query_key for URL hashing
+            url_cache_key = url_key(canonicalize_url(url))
             cached_content = await self.cache.get_url_content(url_cache_key)
+            CACHE_LOOKUPS.inc(cache="url", result="hit" if cached_content else "miss")
             if cached_content:
-                print(f"Cache hit for URL: {url}")
+                logger.debug("Cache hit for URL: %s", url, extra=SAMPLED)
                 docs.append(cached_content)
+                continue
+            
+            stored = await self._get_stored(url)
+            if self.docstore:
+                CACHE_LOOKUPS.inc(cache="docstore", result="hit" if stored else "miss")
+            if stored:
+                logger.debug("Document store hit for URL: %s", url, extra=SAMPLED)
+                docs.append(stored)
+                await self.cache.set_url_content(url_cache_key, stored)
             else:
-                print(f"Cache miss for URL: {url}")
+                logger.debug("Cache miss for URL: %s", url, extra=SAMPLED)
                 uncached_urls.append(url)
         
-        # Extract content for uncached URLs
+        # Extract content for uncached URLs, waiting on those another request is already extracting
         if uncached_urls:
-            print(f"Extracting content from {len(uncached_urls)} uncached URLs")
-            # Try Firecrawl first
+            by_key = {canonicalize_url(url): url for url in uncached_urls}
+            owned, waiting = self.inflight.claim(by_key)
+            for key in by_key:
+                CACHE_LOOKUPS.inc(cache="inflight", result="hit" if key in waiting else "miss")
+            extracted: List[Dict[str, Any]] = []
             try:
-                print("Using Firecrawl extractor...")
-                extracted = await self.firecrawl.extract_many(uncached_urls)
-                docs.extend(extracted)
-                print(f"Firecrawl extracted {len(extracted)} documents")
-                
-                # Cache the results
-                for doc in extracted:
-                    url_cache_key = query_key(SearchRequest(query=doc["url"]))
-                    await self.cache.set_url_content(url_cache_key, doc)
-                    print(f"Cached content for URL: {doc['url']}")
-            except Exception as e:
-                print(f"Firecrawl extraction failed: {e}")
-                
-                # Fallback to readability
-                try:
-                    print("Using Readability fallback extractor...")
-                    extracted = await self.readability.extract_many(uncached_urls)
-                    docs.extend(extracted)
-                    print(f"Readability extracted {len(extracted)} documents")
-                except Exception as e:
-                    print(f"Readability extraction failed: {e}")
+                if owned:
+                    extracted = await self._extract_uncached([by_key[key] for key in owned])
+            finally:
+                fresh = {canonicalize_url(doc["url"]): doc for doc in extracted}
+                for key in owned:
+                    self.inflight.resolve(key, fresh.get(key))
+            docs.extend(extracted)
+            if waiting:
+                logger.debug("Waiting for %d URLs already being extracted", len(waiting))
+                shared = await self.inflight.wait(waiting)
+                docs.extend(doc for doc in shared.values() if doc)
         else:
-            print("All URLs were cached, no extraction needed")
+            logger.debug("All URLs were cached, no extraction needed")
         
-        print(f"Total documents extracted: {len(docs)}")
+        # Cache hits were collected first; restore rank order so dedupe keeps the best-ranked copy
+        order = {canonicalize_url(url): position for position, url in enumerate(urls)}
+        docs.sort(key=lambda doc: order.get(canonicalize_url(doc.get("url", "")), len(order)))
+        logger.debug("Total documents extracted: %d", len(docs))
         return docs
     
-    async def _synthesize(self, payload: Dict[str, str]) -> str:
+    async def _extract_uncached(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """
+        Extract URLs with Firecrawl, falling back to Readability, and cache and store the results.
+        """
+        logger.debug("Extracting content from %d uncached URLs", len(urls))
+        # Try Firecrawl first
+        try:
+            logger.debug("Using Firecrawl extractor...")
+            extracted = await self.firecrawl.extract_many(urls)
+            logger.debug("Firecrawl extracted %d documents", len(extracted))
+            
+            # Cache the results
+            for doc in extracted:
+                url_cache_key = url_key(canonicalize_url(doc["url"]))
+                await self.cache.set_url_content(url_cache_key, doc)
+                logger.debug("Cached content for URL: %s", doc["url"], extra=SAMPLED)
+            await self._store_docs(extracted)
+            return extracted
+        except Exception as e:
+            logger.warning("Firecrawl extraction failed: %s", e)
+        
+        # Fallback to readability
+        try:
+            logger.debug("Using Readability fallback extractor...")
+            FALLBACKS.inc(stage="extract", to="readability")
+            extracted = await self.readability.extract_many(urls)
+            logger.debug("Readability extracted %d documents", len(extracted))
+            await self._store_docs(extracted)
+            return extracted
+        except Exception as e:
+            logger.warning("Readability extraction failed: %s", e)
+            return []
+    
+    async def _extract_one(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch and extract one URL: cache, then document store, then Firecrawl
+        with Readability as the fallback. Used by the dataflow executor.
+        """
+        url_cache_key = url_key(canonicalize_url(url))
+        cached_content = await self.cache.get_url_content(url_cache_key)
+        CACHE_LOOKUPS.inc(cache="url", result="hit" if cached_content else "miss")
+        if cached_content:
+            logger.debug("Cache hit for URL: %s", url, extra=SAMPLED)
+            return cached_content
+        
+        stored = await self._get_stored(url)
+        if self.docstore:
+            CACHE_LOOKUPS.inc(cache="docstore", result="hit" if stored else "miss")
+        if stored:
+            logger.debug("Document store hit for URL: %s", url, extra=SAMPLED)
+            await self.cache.set_url_content(url_cache_key, stored)
+            return stored
+        
+        logger.debug("Cache miss for URL: %s", url, extra=SAMPLED)
+        
+        async def extract() -> Optional[Dict[str, Any]]:
+            for name in ("firecrawl", "readability"):
+                if name == "readability":
+                    FALLBACKS.inc(stage="extract", to="readability")
+                with span("extract.url", provider=name, url=url) as attrs:
+                    try:
+                        # Built on first use; Firecrawl raises here when its key is missing
+                        extractor = getattr(self, name)
+                    except Exception as e:
+                        logger.warning("%s extractor unavailable: %s", name, e, extra=SAMPLED)
+                        extractor = None
+                    doc = await extractor.extract(url) if extractor else None
+                    attrs["ok"] = doc is not None
+                if doc:
+                    await self.cache.set_url_content(url_cache_key, doc)
+                    await self._store_docs([doc])
+                    return doc
+            return None
+        
+        # Another request extracting the same URL shares its result
+        return await self.inflight.do(canonicalize_url(url), extract)
+    
+    async def _get_stored(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a still-fresh document in the local store.
+        """
+        if not self.docstore:
+            return None
+        try:
+            return await self.docstore.get(url, max_age_s=settings.DOCSTORE_MAX_AGE_S)
+        except Exception as e:
+            logger.warning("Document store lookup failed for %s: %s", url, e)
+            return None
+    
+    async def _store_docs(self, docs: List[Dict[str, Any]]) -> None:
+        """
+        Persist extracted documents to the local store for offline retrieval.
+        """
+        if not self.docstore or not docs:
+            return
+        try:
+            written = await self.docstore.put_many(docs)
+            logger.debug("Stored %d documents in the local document store", written)
+        except Exception as e:
+            # Store failure shouldn't break the pipeline
+            logger.warning("Failed to store documents: %s", e)
+        
+        if self.passages:
+            try:
+                added = await asyncio.to_thread(self.passages.add_documents, docs)
+                logger.debug("Indexed %d passages", added)
+            except Exception as e:
+                logger.warning("Failed to index passages: %s", e)
+    
+    async def _rerank_passages(self, query: str, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Pick each document's passages most relevant to the query for the synthesis excerpt.
+        """
+        if not self.passages or not docs:
+            return docs
+        try:
+            return await asyncio.to_thread(self.passages.rerank, query, docs)
+        except Exception as e:
+            logger.warning("Passage reranking failed, using leading excerpts: %s", e)
+            return docs
+    
+    async def _synthesize(self, payload: Dict[str, str], force_local: bool = False,
+                          emit: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> str:
         """
-        Synthesize the final answer using an LLM.
+        Synthesize the final answer using an LLM, streaming tokens to emit when given.
         """
-        print("Synthesizing final answer...")
+        logger.debug("Synthesizing final answer...")
+        
+        # Use OpenRouter (or Ollama if forced local)
+        if force_local:
+            provider = self._llm(registry.create("llm", "ollama"), "synthesis")
+            logger.debug("Using Ollama for synthesis")
+        else:
+            provider = self._llm(registry.create("llm", "openrouter"), "synthesis")
+            logger.debug("Using OpenRouter for synthesis")
+        
+        # Send the schema once as a native structured output option when the model supports it
+        if settings.LLM_STRUCTURED_OUTPUT and provider.supports_structured_output():
+            user_prompt = SYNTHESIS_USER_NATIVE.format(
+                query=payload["query"],
+                docs_json=payload["docs_json"]
+            )
+            try:
+                response = await self._complete(
+                    provider,
+                    user_prompt,
+                    emit,
+                    provider.structured_output_kwargs(synthesis_json_schema())
+                )
+                logger.debug("Synthesis completed successfully (structured output)")
+                return response
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code not in (400, 404, 422, 501):
+                    raise
+                logger.warning("Model %s rejected structured output (%d), falling back to schema in prompt",
+                               provider.model, e.response.status_code)
+                provider.disable_structured_output()
+        
         user_prompt = SYNTHESIS_USER.format(
             query=payload["query"],
             docs_json=payload["docs_json"]
         )
+        response = await self._complete(provider, user_prompt, emit)
         
-        # Use OpenRouter (or Ollama if forced local)
-        if payload.get("style_hints") == "local" or "forceLocal" in payload:
-            provider = OllamaProvider()
-            print("Using Ollama for synthesis")
-        else:
-            provider = OpenRouterProvider()
-            print("Using OpenRouter for synthesis")
+        logger.debug("Synthesis completed successfully")
+        return response
+    
+    async def _complete(self, provider: LLMProvider, user_prompt: str,
+                        emit: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                        options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Run the synthesis chat call, streaming tokens and completed fields to emit when given.
+        """
+        if emit is None:
+            return await provider.chat(
+                SYNTHESIS_SYSTEM,
+                user_prompt,
+                temperature=0.2,
+                top_p=0.9,
+                **(options or {})
+            )
         
-        response = await provider.chat(
+        # Surface answer, bullets and sources as soon as each one is complete
+        parser = IncrementalJSONParser()
+        async for chunk in provider.chat_stream(
             SYNTHESIS_SYSTEM,
             user_prompt,
             temperature=0.2,
-            top_p=0.9
-        )
-        
-        print("Synthesis completed successfully")
-        return response
\ No newline at end of file
+            top_p=0.9,
+            **(options or {})
+        ):
+            emit("token", {"text": chunk})
+            self._emit_fields(parser.feed(chunk), emit)
+        # A truncated stream leaves its last value open; flush what repair recovers
+        self._emit_fields(parser.close(), emit)
+        return parser.text
+    
+    @staticmethod
+    def _emit_fields(events: List[Tuple[str, str, Any]], emit: Callable[[str, Dict[str, Any]], None]) -> None:
+        for kind, name, value in events:
+            if kind == "field" and name == "answer":
+                emit("answer", {"text": value})
+            elif kind == "item" and name == "bullets":
+                emit("bullet", {"text": value})
+            elif kind == "item" and name == "sources":
+                emit("source", {"source": value})
@@ -0,0 +1,262 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from ..config import settings
+from ..contracts import SearchRequest
+from ..hashing import query_key
+from ..llm.scheduler import PRIORITY_BACKGROUND, priority_floor
+from ..log import request_id, new_request_id
+from ..metrics import counter, histogram
+from .. import registry
+
+
+logger = logging.getLogger(__name__)
+
+WARMED = counter(
+    "cache_warm_total",
+    "Popular queries checked by the cache warmer by result (refreshed, fresh, failed, deferred)",
+    ("result",)
+)
+WARM_SECONDS = histogram(
+    "cache_warm_seconds",
+    "Time to refresh one cached answer"
+)
+
+
+class PopularQueries:
+    """
+    Request counts per cache key with exponential decay, for the most-requested live queries.
+
+    Counts halve every half_life_s seconds. Past 2 * size keys, the least
+    requested are pruned down to size, so a long tail of one-off queries
+    costs bounded memory.
+    """
+
+    def __init__(self, size: int = 1000, half_life_s: float = 3600.0):
+        self.size = max(1, size)
+        self.half_life_s = half_life_s
+        self._counts: Dict[str, List[Any]] = {}  # key -> [request, count]
+        self._decayed_at = time.monotonic()
+
+    def add(self, key: str, req: SearchRequest) -> None:
+        entry = self._counts.get(key)
+        if entry is None:
+            self._counts[key] = [req, 1.0]
+            if len(self._counts) > 2 * self.size:
+                self._prune()
+        else:
+            entry[1] += 1
+
+    def _prune(self) -> None:
+        ranked = sorted(self._counts.items(), key=lambda item: item[1][1], reverse=True)
+        self._counts = dict(ranked[:self.size])
+
+    def decay(self) -> None:
+        now = time.monotonic()
+        if self.half_life_s > 0:
+            factor = 0.5 ** ((now - self._decayed_at) / self.half_life_s)
+            for entry in self._counts.values():
+                entry[1] *= factor
+        self._decayed_at = now
+
+    def top(self, n: int) -> List[Tuple[str, SearchRequest, float]]:
+        self.decay()
+        ranked = sorted(self._counts.items(), key=lambda item: item[1][1], reverse=True)[:n]
+        return [(key, req, count) for key, (req, count) in ranked]
+
+
+def load_queries(path: str) -> List[SearchRequest]:
+    """
+    One query or SearchRequest JSON object per line; bad lines are logged and skipped.
+    """
+    requests = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                requests.append(SearchRequest.model_validate_json(line) if line.startswith("{")
+                                else SearchRequest(query=line))
+            except Exception as e:
+                logger.warning("Skipping line %d of %s: %s", number, path, e)
+    return requests
+
+
+class CacheWarmer:
+    """
+    Refreshes the cached answers of popular queries shortly before they expire.
+
+    Each pass ranks candidate queries by request count from three sources,
+    summed per cache key:
+    - the query history (RECORDS_BACKEND) over the last WARM_HISTORY_HOURS,
+      read by default when RECORDS_ENABLED is set
+    - live request counts when given a PopularQueries (the API process)
+    - a file of queries (WARM_QUERIES_PATH), each counted once
+
+    The top WARM_TOP_N whose answer is missing or expires within
+    WARM_REFRESH_BEFORE_S are re-run through Pipeline.refresh, most requested
+    first. At most WARM_RATE refreshes start per second and WARM_CONCURRENCY
+    run at once. Their LLM calls queue behind live ones at PRIORITY_BACKGROUND,
+    and no refresh starts while busy() reports live load.
+    """
+
+    def __init__(self, pipeline, popular: Optional[PopularQueries] = None, path: Optional[str] = None,
+                 history: Optional[bool] = None, busy: Optional[Callable[[], bool]] = None,
+                 top_n: Optional[int] = None, rate: Optional[float] = None,
+                 concurrency: Optional[int] = None, refresh_before_s: Optional[int] = None):
+        self.pipeline = pipeline
+        self.popular = popular
+        self.path = path if path is not None else settings.WARM_QUERIES_PATH
+        self.history = settings.RECORDS_ENABLED if history is None else history
+        self.busy = busy or (lambda: False)
+        self.top_n = top_n or settings.WARM_TOP_N
+        self.rate = rate or settings.WARM_RATE
+        self.concurrency = max(1, concurrency or settings.WARM_CONCURRENCY)
+        self.refresh_before_s = refresh_before_s if refresh_before_s is not None else settings.WARM_REFRESH_BEFORE_S
+        self.passes = 0
+        self.last_pass: Dict[str, Any] = {}
+        self.last_error: Optional[str] = None
+        self._writer = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _history_counts(self) -> List[Tuple[str, Dict[str, Any], int]]:
+        if self._writer is None:
+            self._writer = registry.create("records", settings.RECORDS_BACKEND)
+        since = datetime.now(timezone.utc) - timedelta(hours=settings.WARM_HISTORY_HOURS)
+        return self._writer.top_queries(since, self.top_n)
+
+    async def candidates(self) -> List[Tuple[str, SearchRequest, float]]:
+        """
+        (cache key, request, request count) for the most requested queries, highest count first.
+        """
+        ranked: Dict[str, List[Any]] = {}
+
+        def add(req: SearchRequest, count: float) -> None:
+            key = query_key(req)
+            entry = ranked.setdefault(key, [req, 0.0])
+            entry[1] += count
+
+        if self.history:
+            try:
+                for query, params, count in await asyncio.to_thread(self._history_counts):
+                    add(SearchRequest(query=query, **params), count)
+            except Exception as e:
+                self.last_error = f"history: {e}"
+                logger.warning("Cache warmer could not read query history: %s", e)
+        if self.popular is not None:
+            for _, req, count in self.popular.top(self.top_n):
+                add(req, count)
+        if self.path:
+            try:
+                for req in await asyncio.to_thread(load_queries, self.path):
+                    add(req, 1.0)
+            except OSError as e:
+                self.last_error = f"queries: {e}"
+                logger.warning("Cache warmer could not read %s: %s", self.path, e)
+        ordered = sorted(ranked.items(), key=lambda item: item[1][1], reverse=True)[:self.top_n]
+        return [(key, req, count) for key, (req, count) in ordered]
+
+    async def _due(self, candidates: List[Tuple[str, SearchRequest, float]],
+                   force: bool) -> List[Tuple[str, SearchRequest, float]]:
+        if force:
+            return candidates
+        due = []
+        for key, req, count in candidates:
+            remaining = await self.pipeline.cache.ttl(key)
+            # None: never expires, or Redis is down and a refresh could not be stored
+            if remaining is not None and remaining <= self.refresh_before_s:
+                due.append((key, req, count))
+            else:
+                WARMED.inc(result="fresh")
+        return due
+
+    async def _refresh(self, req: SearchRequest, results: Dict[str, int]) -> None:
+        request_id.set(f"warm-{new_request_id()}")
+        priority_floor.set(PRIORITY_BACKGROUND)
+        start = time.perf_counter()
+        try:
+            await self.pipeline.refresh(req)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning("Cache warmer failed to refresh %r: %s", req.query, e)
+            results["failed"] += 1
+            WARMED.inc(result="failed")
+            return
+        WARM_SECONDS.observe(time.perf_counter() - start)
+        results["refreshed"] += 1
+        WARMED.inc(result="refreshed")
+
+    async def warm_once(self, force: bool = False, deadline_s: Optional[float] = None) -> Dict[str, int]:
+        """
+        One pass: refresh the popular answers that are due (all of them with force).
+
+        Refreshes still waiting for a quiet moment after deadline_s seconds
+        are deferred to the next pass. Returns counts by result.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        candidates = await self.candidates()
+        due = await self._due(candidates, force)
+        results = {"candidates": len(candidates), "due": len(due), "refreshed": 0, "failed": 0, "deferred": 0}
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = []
+        next_start = started
+        for index, (_, req, _) in enumerate(due):
+            # Pace starts at WARM_RATE and hold back while live traffic is heavy
+            while loop.time() < next_start or self.busy():
+                if deadline_s is not None and loop.time() - started > deadline_s:
+                    break
+                await asyncio.sleep(max(0.05, min(1.0, next_start - loop.time())))
+            if loop.time() < next_start or self.busy():
+                results["deferred"] = len(due) - index
+                WARMED.inc(results["deferred"], result="deferred")
+                break
+            await slots.acquire()
+            task = asyncio.ensure_future(self._refresh(req, results))
+            task.add_done_callback(lambda _: slots.release())
+            tasks.append(task)
+            next_start = loop.time() + 1.0 / self.rate
+        await asyncio.gather(*tasks)
+        self.passes += 1
+        self.last_pass = dict(results, seconds=round(loop.time() - started, 1))
+        logger.info("Cache warmer pass: %s", self.last_pass)
+        return results
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.warm_once(deadline_s=settings.WARM_INTERVAL_S)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning("Cache warmer pass failed: %s", e)
+            await asyncio.sleep(settings.WARM_INTERVAL_S)
+
+    def start(self) -> None:
+        """
+        Run a pass every WARM_INTERVAL_S in the background.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writer is not None and hasattr(self._writer, "close"):
+            await asyncio.to_thread(self._writer.close)
+            self._writer = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "passes": self.passes,
+            "lastPass": self.last_pass,
+            "lastError": self.last_error,
+        }
@@ -0,0 +1,135 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import List, Optional
+from ..contracts import SearchResult
+from ..util.urls import canonicalize_with_domain
+from .ranker import rank
+from .vectors import HashingEmbedder, np
+
+
+INCLUDE_BOOST = 0.25
+RECENCY_WEIGHT = 0.2
+RELEVANCE_WEIGHT = 0.3
+# Below this many candidates the per-call numpy overhead outweighs vectorizing
+MIN_BATCH = 32
+
+_embedder: Optional[HashingEmbedder] = None
+
+
+@lru_cache(maxsize=4096)
+def _published_ts(published: str) -> float:
+    """
+    Parse an ISO publication date to a POSIX timestamp (NaN if unparseable).
+    """
+    try:
+        parsed = datetime.fromisoformat(published.replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    except Exception:
+        return float("nan")
+
+
+class CandidateTable:
+    """
+    Columnar view of search results: each URL is parsed once for both its
+    canonical key and its domain, and every per-candidate quantity is held
+    in a parallel array.
+    """
+
+    def __init__(self, results: List[SearchResult]):
+        self.results = results
+        self.keys: List[str] = []
+        self.domains: List[str] = []
+        for result in results:
+            key, domain = canonicalize_with_domain(result.url)
+            self.keys.append(key)
+            self.domains.append(domain)
+        self.scores = np.fromiter((r.score for r in results), dtype=np.float64, count=len(results))
+        self.published = np.fromiter(
+            (_published_ts(r.published) if r.published else np.nan for r in results),
+            dtype=np.float64, count=len(results)
+        )
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def domain_mask(self, domains: Optional[List[str]]) -> "np.ndarray":
+        """
+        Boolean mask of candidates whose domain is in the given list.
+        """
+        if not domains:
+            return np.zeros(len(self), dtype=bool)
+        wanted = {domain.lower() for domain in domains}
+        return np.fromiter((d in wanted for d in self.domains), dtype=bool, count=len(self))
+
+    def first_occurrence_mask(self, keep: "np.ndarray") -> "np.ndarray":
+        """
+        Boolean mask selecting the first kept candidate for each canonical URL.
+        """
+        first = np.zeros(len(self), dtype=bool)
+        kept_idx = np.flatnonzero(keep)
+        if kept_idx.size:
+            keys = np.asarray(self.keys, dtype=object)[kept_idx]
+            _, first_pos = np.unique(keys, return_index=True)
+            first[kept_idx[first_pos]] = True
+        return first
+
+    def recency_boost(self, now: Optional[float] = None) -> "np.ndarray":
+        """
+        Linear recency boost over the last year (0 when the date is unknown).
+        """
+        now = now if now is not None else datetime.now(timezone.utc).timestamp()
+        age_days = np.floor((now - self.published) / 86400.0)
+        age_days = np.clip(age_days, 0, 365)
+        boost = (1 - age_days / 365) * RECENCY_WEIGHT
+        return np.nan_to_num(boost, nan=0.0)
+
+    def relevance(self, query: str) -> "np.ndarray":
+        """
+        Lexical cosine similarity between the query and each title + snippet.
+        """
+        global _embedder
+        if _embedder is None:
+            _embedder = HashingEmbedder()
+        texts = [f"{r.title} {r.snippet}" for r in self.results]
+        return _embedder.embed(texts) @ _embedder.embed([query])[0]
+
+
+def rank_batch(results: List[SearchResult], include_domains: Optional[List[str]] = None,
+               exclude_domains: Optional[List[str]] = None, max_results: int = 6,
+               query: Optional[str] = None) -> List[SearchResult]:
+    """
+    Vectorized equivalent of `rank` for large multi-provider candidate sets.
+
+    Filters, boosts, deduplicates and applies recency exactly like `rank`,
+    plus an optional lexical relevance term when a query is given. The
+    relevance term embeds every title and snippet, which costs more than the
+    rest of the ranking, so the pipeline only passes the query when
+    RANK_QUERY_RELEVANCE is set. Input results are not mutated; the returned
+    results are copies carrying the final score. Small candidate sets without
+    a query, and every set when numpy is not installed, go through `rank`.
+    """
+    if not results:
+        return []
+    if np is None or (not query and len(results) < MIN_BATCH):
+        # rank() adds its boosts to the scores in place
+        return rank([result.model_copy() for result in results], include_domains, exclude_domains, max_results)
+
+    table = CandidateTable(results)
+
+    keep = ~table.domain_mask(exclude_domains)
+    keep &= table.first_occurrence_mask(keep)
+
+    scores = table.scores + INCLUDE_BOOST * table.domain_mask(include_domains)
+    scores = scores + table.recency_boost()
+    if query:
+        scores = scores + RELEVANCE_WEIGHT * table.relevance(query)
+
+    idx = np.flatnonzero(keep)
+    # Stable descending sort keeps provider order among ties, like list.sort
+    order = idx[np.argsort(-scores[idx], kind="stable")][:max_results]
+    return [
+        results[i].model_copy(update={"score": float(scores[i])})
+        for i in order
+    ]
@@ -0,0 +1,146 @@
+import asyncio
+import re
+from typing import List, Dict, Optional, Set
+from urllib.parse import urlparse
+import httpx
+from ..contracts import SearchResult
+from ..config import settings
+from ..http_client import new_client
+from .vectors import tokenize
+
+
+STOPWORDS = {
+    "the", "and", "for", "are", "was", "were", "what", "when", "where", "which", "who", "why",
+    "how", "with", "from", "that", "this", "these", "those", "into", "about", "does", "did",
+    "can", "could", "should", "would", "will", "has", "have", "had", "its", "it", "is", "of",
+    "on", "in", "to", "a", "an", "or", "by", "as", "at", "be", "do", "me", "my", "you", "your",
+    "latest", "news", "today",
+}
+
+_OPERATOR = re.compile(r'\b\w+:\S+')
+_LOW_INFO_PATH = re.compile(
+    r'/(tags?|categor(y|ies)|topics?|archives?|search|authors?|page/\d+|index(\.html?|\.php)?)(/|$)',
+    re.IGNORECASE
+)
+# Whole path segments only, so article slugs like /how-to-register-to-vote are not login walls
+_LOGIN_WALL = re.compile(
+    r'/(login|log-in|signin|sign-in|signup|sign-up|register|subscribe|paywall|account|auth)(\.\w+)?(/|$)',
+    re.IGNORECASE
+)
+
+LOW_INFO_PENALTY = 0.3
+LOGIN_PENALTY = 0.6
+PDF_PENALTY = 0.1
+PDF_OVERSIZE_PENALTY = 1.0
+
+
+def query_terms(*queries: Optional[str]) -> Set[str]:
+    """
+    Content terms of one or more queries, ignoring search operators and stopwords.
+    """
+    terms: Set[str] = set()
+    for query in queries:
+        if query:
+            terms.update(t for t in tokenize(_OPERATOR.sub(" ", query)) if t not in STOPWORDS)
+    return terms
+
+
+def is_pdf(url: str) -> bool:
+    return urlparse(url).path.lower().endswith(".pdf")
+
+
+def url_penalty(url: str, pdf_size: Optional[int] = None) -> float:
+    """
+    Penalty for URLs unlikely to be worth a full extraction.
+    """
+    try:
+        path = urlparse(url).path or "/"
+    except Exception:
+        return 0.0
+
+    penalty = 0.0
+    if path in ("", "/") or _LOW_INFO_PATH.search(path):
+        penalty += LOW_INFO_PENALTY
+    if _LOGIN_WALL.search(path):
+        penalty += LOGIN_PENALTY
+    if path.lower().endswith(".pdf"):
+        if pdf_size is not None and pdf_size > settings.EXTRACT_PDF_MAX_BYTES:
+            penalty += PDF_OVERSIZE_PENALTY
+        else:
+            penalty += PDF_PENALTY
+    return penalty
+
+
+async def probe_pdf_sizes(urls: List[str], timeout: float = 3.0) -> Dict[str, Optional[int]]:
+    """
+    HEAD each PDF URL to learn its size before deciding whether to extract it.
+    """
+    pdf_urls = [url for url in urls if is_pdf(url)]
+    if not pdf_urls:
+        return {}
+
+    async def head(client: httpx.AsyncClient, url: str) -> Optional[int]:
+        try:
+            response = await client.head(url, follow_redirects=True)
+            length = response.headers.get("content-length")
+            return int(length) if length else None
+        except Exception:
+            return None
+
+    async with new_client(timeout=timeout) as client:
+        sizes = await asyncio.gather(*(head(client, url) for url in pdf_urls))
+    return dict(zip(pdf_urls, sizes))
+
+
+def select_for_extraction(results: List[SearchResult], query: str, normalized_query: Optional[str] = None,
+                          min_docs: Optional[int] = None, max_docs: Optional[int] = None,
+                          pdf_sizes: Optional[Dict[str, Optional[int]]] = None) -> List[SearchResult]:
+    """
+    Pick the smallest set of results whose titles and snippets cover the query.
+
+    Each result is scored on the share of query terms (original and
+    normalized) found in its title and snippet, its ranking score, and URL
+    penalties (index pages, login walls, PDFs). Results are then chosen
+    greedily by marginal term coverage until EXTRACT_COVERAGE of the terms
+    is covered and at least min_docs are chosen, or max_docs is reached.
+    PDFs known to exceed EXTRACT_PDF_MAX_BYTES are never chosen.
+
+    Returns:
+        Selected results in selection order (most useful first)
+    """
+    min_docs = min_docs or settings.EXTRACT_MIN_DOCS
+    max_docs = max_docs or len(results)
+    pdf_sizes = pdf_sizes or {}
+    terms = query_terms(query, normalized_query)
+    if not results:
+        return []
+
+    candidates = []
+    for position, result in enumerate(results):
+        size = pdf_sizes.get(result.url)
+        if size is not None and size > settings.EXTRACT_PDF_MAX_BYTES and is_pdf(result.url):
+            continue
+        covered = terms & set(tokenize(f"{result.title} {result.snippet}"))
+        coverage = len(covered) / len(terms) if terms else 0.0
+        value = 0.6 * coverage + 0.4 * result.score - url_penalty(result.url, size)
+        candidates.append((value, position, covered, result))
+
+    selected: List[SearchResult] = []
+    covered_terms: Set[str] = set()
+    remaining = sorted(candidates, key=lambda c: (-c[0], c[1]))
+    while remaining and len(selected) < max_docs:
+        enough_coverage = not terms or len(covered_terms) >= settings.EXTRACT_COVERAGE * len(terms)
+        if enough_coverage and len(selected) >= min_docs:
+            break
+        # Prefer results that add new terms; fall back to plain value once coverage stalls
+        best = max(
+            remaining,
+            key=lambda c: (len(c[2] - covered_terms) / len(terms) if terms else 0.0) + c[0]
+        )
+        if best[0] <= -LOGIN_PENALTY and len(selected) >= min_docs:
+            break
+        remaining.remove(best)
+        selected.append(best[3])
+        covered_terms |= best[2]
+
+    return selected
@@ -1,6 +1,7 @@
 from typing import List, Optional
 from urllib.parse import urlparse
 from ..contracts import SearchResult
+from ..util.urls import canonicalize_url
 import time
 from datetime import datetime
 
@@ -58,18 +59,13 @@ def rank(results: List[SearchResult], include_domains: Optional[List[str]] = Non
         if include_set and domain in include_set:
             result.score += 0.25
     
-    # Deduplicate by URL path
-    seen_paths = set()
+    # Deduplicate by canonical URL (scheme, host aliases, tracking params, AMP)
+    seen_urls = set()
     deduped_results = []
     for result in filtered_results:
-        try:
-            parsed = urlparse(result.url)
-            path_key = f"{get_domain(result.url)}|{parsed.path}"
-            if path_key not in seen_paths:
-                seen_paths.add(path_key)
-                deduped_results.append(result)
-        except Exception:
-            # If we can't parse the URL, just include it
+        url_key = canonicalize_url(result.url)
+        if url_key not in seen_urls:
+            seen_urls.add(url_key)
             deduped_results.append(result)
     
     # Apply recency boost
@@ -0,0 +1,377 @@
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from functools import lru_cache
+from typing import Callable, List, Dict, Any, Optional, Tuple
+from ..config import settings
+from ..registry import lazy_module
+from ..util.urls import canonicalize_url
+
+# Imported on first use; None when not installed (optional: pip install perplexity-engine[vector])
+np = lazy_module("numpy")
+
+
+logger = logging.getLogger(__name__)
+
+# Per-passage row record: document number and word range within its text
+_PASSAGE_ROW = [("doc", "<i4"), ("start", "<i4"), ("words", "<i4")]
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens, dropping single characters.
+    """
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) > 1]
+
+
+def _chunk_spans(text: str, words: Optional[int] = None, overlap: int = 20) -> List[Tuple[int, int, str]]:
+    """
+    (first word, word count, passage) for each overlapping word window of text.
+    """
+    size = words or settings.VECTOR_PASSAGE_WORDS
+    tokens = text.split()
+    if len(tokens) <= size:
+        return [(0, len(tokens), " ".join(tokens))] if tokens else []
+
+    step = max(1, size - overlap)
+    spans = []
+    for start in range(0, len(tokens), step):
+        window = tokens[start:start + size]
+        spans.append((start, len(window), " ".join(window)))
+        if start + size >= len(tokens):
+            break
+    return spans
+
+
+def chunk_passages(text: str, words: Optional[int] = None, overlap: int = 20) -> List[str]:
+    """
+    Split text into overlapping word windows.
+    """
+    return [passage for _, _, passage in _chunk_spans(text, words, overlap)]
+
+
+@lru_cache(maxsize=65536)
+def _feature_hash(feature: str) -> int:
+    return zlib.crc32(feature.encode('utf-8'))
+
+
+class HashingEmbedder:
+    """
+    Dependency-free embedder using signed feature hashing of unigrams and bigrams.
+
+    Not semantic, but cheap, deterministic and good enough to rank passages
+    lexically against a query on CPU.
+    """
+
+    def __init__(self, dim: Optional[int] = None):
+        self.dim = dim or settings.VECTOR_DIM
+        self.name = f"hashing-{self.dim}"
+
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        rows: List[int] = []
+        hashes: List[int] = []
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            hashes.extend(_feature_hash(feature) for feature in features)
+            rows.extend([row] * len(features))
+
+        # Scatter all features of the batch at once
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        h = np.fromiter(hashes, dtype=np.int64, count=len(hashes))
+        signs = np.where(h & 0x80000000, 1.0, -1.0).astype(np.float32)
+        np.add.at(matrix, (np.asarray(rows, dtype=np.int64), h % self.dim), signs)
+
+        # Sublinear term frequency, then L2-normalize so dot product is cosine
+        np.copysign(np.log1p(np.abs(matrix)), matrix, out=matrix)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+class SentenceTransformerEmbedder:
+    """
+    Small CPU embedding model via sentence-transformers (optional dependency).
+    """
+
+    def __init__(self, model_name: Optional[str] = None):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model_name or settings.VECTOR_MODEL
+        self.model = SentenceTransformer(self.name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        vectors = self.model.encode(
+            texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True
+        )
+        return vectors.astype(np.float32, copy=False)
+
+
+def get_embedder():
+    """
+    Build the configured embedder, falling back to feature hashing.
+    """
+    if settings.VECTOR_EMBEDDER == "sentence-transformers":
+        try:
+            return SentenceTransformerEmbedder()
+        except Exception as e:
+            logger.warning("Embedding model unavailable, using hashed features: %s", e)
+    return HashingEmbedder()
+
+
+class VectorIndex:
+    """
+    Append-only matrix of unit-length float32 vectors with batched top-k search.
+
+    Each row carries a fixed-size record of row_dtype (for passages, a
+    document number and a word range) held in a NumPy array, not Python
+    objects. With a path the matrix lives in a memory-mapped .npy file and
+    the records are appended to a binary .rows file, so the index survives
+    restarts and the matrix can grow beyond RAM while the records cost a
+    few bytes per row.
+    """
+
+    def __init__(self, dim: int, path: Optional[str] = None, capacity: int = 1024,
+                 row_dtype: Any = None):
+        self.dim = dim
+        self.path = path
+        self.row_dtype = np.dtype(row_dtype if row_dtype is not None else [("key", np.int64)])
+        self.size = 0
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(self._matrix_path) and os.path.exists(self._rows_path):
+            self._matrix = np.load(self._matrix_path, mmap_mode="r+")
+            if self._matrix.shape[1] != dim:
+                raise ValueError(f"Index at {path} has dim {self._matrix.shape[1]}, expected {dim}")
+            rows = np.fromfile(self._rows_path, dtype=self.row_dtype)
+            # Rows whose vectors did not reach the matrix file are dropped
+            self.size = min(len(rows), self._matrix.shape[0])
+            self.rows = np.zeros(max(capacity, self._matrix.shape[0]), dtype=self.row_dtype)
+            self.rows[:self.size] = rows[:self.size]
+        else:
+            if path and os.path.exists(self._matrix_path):
+                logger.warning("Discarding vector index at %s written without row records", path)
+            self._matrix = self._allocate(capacity)
+            self.rows = np.zeros(capacity, dtype=self.row_dtype)
+            if path and os.path.exists(self._rows_path):
+                os.remove(self._rows_path)
+
+    @property
+    def _matrix_path(self) -> str:
+        return f"{self.path}.npy"
+
+    @property
+    def _rows_path(self) -> str:
+        return f"{self.path}.rows"
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _allocate(self, rows: int, target: Optional[str] = None) -> "np.ndarray":
+        if not self.path:
+            return np.zeros((rows, self.dim), dtype=np.float32)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        return np.lib.format.open_memmap(
+            target or self._matrix_path, mode="w+", dtype=np.float32, shape=(rows, self.dim)
+        )
+
+    def _grow(self, needed: int) -> None:
+        capacity = self._matrix.shape[0]
+        if needed > capacity:
+            while capacity < needed:
+                capacity *= 2
+            # Copy into a larger file next to the old one, then swap it in
+            tmp_path = f"{self.path}.tmp.npy" if self.path else None
+            grown = self._allocate(capacity, tmp_path)
+            grown[:self.size] = self._matrix[:self.size]
+            if self.path:
+                grown.flush()
+                os.replace(tmp_path, self._matrix_path)
+            self._matrix = grown
+        if needed > len(self.rows):
+            rows = np.zeros(self._matrix.shape[0], dtype=self.row_dtype)
+            rows[:self.size] = self.rows[:self.size]
+            self.rows = rows
+
+    def add(self, vectors: "np.ndarray", rows: "np.ndarray") -> None:
+        """
+        Append vectors (already L2-normalized) with one row_dtype record per vector.
+        """
+        rows = np.asarray(rows, dtype=self.row_dtype)
+        if len(vectors) != len(rows):
+            raise ValueError("vectors and rows must have the same length")
+        if not len(rows):
+            return
+        with self._lock:
+            start = self.size
+            self._grow(start + len(rows))
+            self._matrix[start:start + len(rows)] = vectors
+            self.rows[start:start + len(rows)] = rows
+            if self.path:
+                self._matrix.flush()
+                with open(self._rows_path, "ab") as f:
+                    rows.tofile(f)
+            self.size = start + len(rows)
+
+    def search(self, queries: "np.ndarray", k: int = 10,
+               block_rows: int = 65536) -> List[List[Tuple[int, float]]]:
+        """
+        Top-k cosine search for a batch of query vectors.
+
+        The matrix is scanned in row blocks so memory stays bounded for
+        memory-mapped indexes; each block is one matrix product plus an
+        argpartition.
+
+        Returns:
+            For each query, a list of (row, score) pairs, best first
+        """
+        queries = np.atleast_2d(queries).astype(np.float32, copy=False)
+        with self._lock:
+            n = self.size
+            matrix = self._matrix
+        if n == 0 or k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, n, block_rows):
+            block = matrix[start:min(n, start + block_rows)]
+            scores = queries @ block.T
+            take = min(k, scores.shape[1])
+            part = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, part, axis=1)], axis=1)
+            best_rows = np.concatenate([best_rows, part + start], axis=1)
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        return [
+            [(int(row), float(score)) for row, score in zip(rows, scores)]
+            for rows, scores in zip(best_rows, best_scores)
+        ]
+
+
+class PassageIndex:
+    """
+    Passage-level retrieval over extracted documents, fully offline.
+
+    Documents from the pipeline are chunked into passages and appended to a
+    VectorIndex; the same embedder reranks candidate passages before
+    synthesis. Each row records only its document number and word range, and
+    documents keep just url and title (in {path}.docs.jsonl). Passage text is
+    rebuilt on demand from the document text returned by texts(url), usually
+    the document store.
+    """
+
+    def __init__(self, path: Optional[str] = None, texts: Optional[Callable[[str], Optional[str]]] = None):
+        if np is None:
+            raise ImportError("numpy is required for the passage index (pip install perplexity-engine[vector])")
+        self.embedder = get_embedder()
+        self.texts = texts
+        path = path if path is not None else settings.VECTOR_INDEX_PATH
+        self.index = VectorIndex(self.embedder.dim, path=path, row_dtype=_PASSAGE_ROW)
+        self._docs_path = f"{path}.docs.jsonl" if path else None
+        # One (url, title, crc32 of the chunked text) per document; rows refer to it by position
+        self._docs: List[Tuple[str, str, int]] = []
+        if self._docs_path and len(self.index) and os.path.exists(self._docs_path):
+            with open(self._docs_path, encoding="utf-8") as f:
+                for line in f:
+                    item = json.loads(line)
+                    self._docs.append((item["url"], item["title"], item["crc"]))
+        elif self._docs_path and os.path.exists(self._docs_path):
+            os.remove(self._docs_path)
+        self._doc_ids = {canonicalize_url(url): i for i, (url, _, _) in enumerate(self._docs)}
+
+    def add_documents(self, docs: List[Dict[str, Any]]) -> int:
+        """
+        Chunk, embed and insert documents not yet indexed. Returns passages added.
+        """
+        passages, rows, new_docs = [], [], []
+        for doc in docs:
+            url = doc.get("url")
+            if not url or canonicalize_url(url) in self._doc_ids:
+                continue
+            text = doc.get("text") or doc.get("markdown") or ""
+            doc_id = len(self._docs)
+            self._doc_ids[canonicalize_url(url)] = doc_id
+            self._docs.append((url, doc.get("title") or "", zlib.crc32(text.encode("utf-8"))))
+            new_docs.append(self._docs[-1])
+            for start, words, passage in _chunk_spans(text):
+                passages.append(passage)
+                rows.append((doc_id, start, words))
+        if self._docs_path and new_docs:
+            with open(self._docs_path, "a", encoding="utf-8") as f:
+                for url, title, crc in new_docs:
+                    f.write(json.dumps({"url": url, "title": title, "crc": crc}) + "\n")
+        if not passages:
+            return 0
+        self.index.add(self.embedder.embed(passages), np.array(rows, dtype=_PASSAGE_ROW))
+        return len(passages)
+
+    def related(self, query: str, k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Find indexed passages related to a query.
+
+        passage is None when the document text is no longer available or has
+        changed since it was indexed.
+        """
+        hits = self.index.search(self.embedder.embed([query]), k)[0]
+        tokens: Dict[int, Optional[List[str]]] = {}
+        results = []
+        for row, score in hits:
+            doc_id, start, words = (int(v) for v in self.index.rows[row])
+            url, title, crc = self._docs[doc_id]
+            if doc_id not in tokens:
+                text = self.texts(url) if self.texts else None
+                valid = text is not None and zlib.crc32(text.encode("utf-8")) == crc
+                tokens[doc_id] = text.split() if valid else None
+            doc_tokens = tokens[doc_id]
+            passage = " ".join(doc_tokens[start:start + words]) if doc_tokens is not None else None
+            results.append({"url": url, "title": title, "passage": passage, "score": score})
+        return results
+
+    def rerank(self, query: str, docs: List[Dict[str, Any]], max_chars: int = 2000) -> List[Dict[str, Any]]:
+        """
+        Replace each document's leading excerpt with its passages most relevant to the query.
+
+        Passages from all documents are embedded in one batch and scored with a
+        single matrix product; the best ones per document are kept in their
+        original order up to max_chars.
+        """
+        spans = []
+        passages = []
+        for doc in docs:
+            chunks = chunk_passages(doc.get("markdown") or doc.get("text") or "")
+            spans.append((len(passages), len(passages) + len(chunks)))
+            passages.extend(chunks)
+        if not passages:
+            return docs
+
+        scores = self.embedder.embed(passages) @ self.embedder.embed([query])[0]
+
+        reranked = []
+        for doc, (start, end) in zip(docs, spans):
+            if end - start <= 1:
+                reranked.append(doc)
+                continue
+            order = start + np.argsort(-scores[start:end])
+            chosen, length = [], 0
+            for i in order:
+                if length + len(passages[i]) > max_chars and chosen:
+                    break
+                chosen.append(int(i))
+                length += len(passages[i]) + 1
+            excerpt = " ".join(passages[i] for i in sorted(chosen))
+            reranked.append(dict(doc, excerpt=excerpt[:max_chars]))
+        return reranked
+
@@ -0,0 +1,128 @@
+import importlib
+import importlib.util
+import logging
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Any, Dict, Optional, Tuple, Union
+
+
+logger = logging.getLogger(__name__)
+
+# Provider kind -> name -> "module:attribute", imported on first use so that
+# importing the pipeline does not pull in redis, BeautifulSoup or every client
+PROVIDERS: Dict[str, Dict[str, str]] = {
+    "search": {
+        "brave": "perplexity_core.search.brave:BraveSearchProvider",
+        "tavily": "perplexity_core.search.tavily:TavilySearchProvider",
+        "searchapi": "perplexity_core.search.searchapi:SearchApiProvider",
+        "local": "perplexity_core.search.local:LocalSearchProvider",
+    },
+    "extract": {
+        "firecrawl": "perplexity_core.extract.firecrawl:FirecrawlExtractor",
+        "readability": "perplexity_core.extract.readability:ReadabilityExtractor",
+    },
+    "llm": {
+        "openrouter": "perplexity_core.llm.openrouter:OpenRouterProvider",
+        "ollama": "perplexity_core.llm.ollama:OllamaProvider",
+    },
+    "cache": {
+        "redis": "perplexity_core.cache.redis_cache:Cache",
+    },
+    "store": {
+        "docstore": "perplexity_core.store.docstore:DocumentStore",
+        "passages": "perplexity_core.rank.vectors:PassageIndex",
+    },
+    "records": {
+        "postgres": "perplexity_core.store.postgres:PostgresRecordWriter",
+        "sqlite": "perplexity_core.store.records:SQLiteRecordWriter",
+    },
+}
+
+_loaded: Dict[Tuple[str, str], Any] = {}
+_import_ms: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def register(kind: str, name: str, target: Union[str, Any]) -> None:
+    """
+    Add or replace a provider.
+
+    Args:
+        kind: Provider kind ("search", "extract", "llm", "cache", "store", "records")
+        name: Provider name within the kind
+        target: "module:attribute" to import on first use, or the class itself
+    """
+    with _lock:
+        _loaded.pop((kind, name), None)
+        if isinstance(target, str):
+            PROVIDERS.setdefault(kind, {})[name] = target
+        else:
+            PROVIDERS.setdefault(kind, {})[name] = f"{target.__module__}:{target.__qualname__}"
+            _loaded[(kind, name)] = target
+
+
+def load(kind: str, name: str) -> Any:
+    """
+    Import a provider's class, once per process.
+
+    Raises KeyError for an unknown provider; import errors propagate, so a
+    missing optional dependency fails where the provider is used.
+    """
+    cls = _loaded.get((kind, name))
+    if cls is not None:
+        return cls
+    with _lock:
+        cls = _loaded.get((kind, name))
+        if cls is None:
+            spec = PROVIDERS[kind][name]
+            module_name, _, attribute = spec.partition(":")
+            start = time.perf_counter()
+            module = importlib.import_module(module_name)
+            cls = getattr(module, attribute)
+            _import_ms[f"{kind}.{name}"] = round((time.perf_counter() - start) * 1000, 1)
+            logger.debug("Loaded %s provider %s in %.1fms", kind, name, _import_ms[f"{kind}.{name}"])
+            _loaded[(kind, name)] = cls
+    return cls
+
+
+def create(kind: str, name: str, *args, **kwargs) -> Any:
+    """
+    Import a provider's class if needed and construct it.
+    """
+    return load(kind, name)(*args, **kwargs)
+
+
+def import_times() -> Dict[str, float]:
+    """
+    Milliseconds each loaded provider took to import, in load order.
+
+    A provider whose module was already imported by an earlier one shows
+    only its own share.
+    """
+    return dict(_import_ms)
+
+
+def lazy_module(name: str) -> Optional[ModuleType]:
+    """
+    Return a module that is executed on first attribute access, or None if it is not installed.
+
+    For optional dependencies that are slow to import (numpy): call sites keep
+    the `if np is None` checks of a guarded import, while processes that never
+    touch the module, like a CLI answering from the cache, don't pay for it.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    if spec is None or spec.loader is None:
+        return None
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,283 @@
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+import httpx
+from .config import settings
+
+
+PROVIDER_HOSTS = {
+    "api.search.brave.com": "brave",
+    "api.tavily.com": "tavily",
+    "www.searchapi.io": "searchapi",
+    "api.firecrawl.dev": "firecrawl",
+    "openrouter.ai": "openrouter",
+}
+
+# Credential fields in query strings and JSON bodies: never written to a cassette, ignored when matching
+SECRET_FIELDS = {"api_key", "apikey", "key", "token"}
+
+# Settings a cassette depends on: replay restores them so requests match the recording
+RECORDED_SETTINGS = ("OPENROUTER_MODEL", "OLLAMA_MODEL", "OLLAMA_HOST", "NORMALIZE_MODE", "NORMALIZE_CLASSIFIER",
+                     "EXTRACT_PRESELECT", "LLM_STRUCTURED_OUTPUT")
+
+# Providers refuse to run without their key
+PROVIDER_KEYS = {"brave": "BRAVE_API_KEY", "tavily": "TAVILY_API_KEY", "searchapi": "SEARCHAPI_IO_KEY",
+                 "firecrawl": "FIRECRAWL_API_KEY", "openrouter": "OPENROUTER_API_KEY"}
+
+# Response headers that describe the wire encoding of a body that is stored decoded
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def provider_of(url: httpx.URL) -> str:
+    """
+    Provider name for a request URL: a search, extraction or LLM API, or "web" for page fetches.
+    """
+    if url.host in PROVIDER_HOSTS:
+        return PROVIDER_HOSTS[url.host]
+    ollama = httpx.URL(settings.OLLAMA_HOST)
+    if (url.host, url.port) == (ollama.host, ollama.port):
+        return "ollama"
+    return "web"
+
+
+def _scrub_url(url: httpx.URL) -> str:
+    params = [(k, v) for k, v in parse_qsl(url.query.decode("ascii"), keep_blank_values=True) if k not in SECRET_FIELDS]
+    return str(url.copy_with(query=urlencode(sorted(params)).encode("ascii") if params else None))
+
+
+def _json_body(request: httpx.Request) -> Any:
+    if not request.content:
+        return None
+    try:
+        body = json.loads(request.content)
+    except ValueError:
+        return None
+    if isinstance(body, dict):
+        body = {k: v for k, v in body.items() if k not in SECRET_FIELDS}
+    return body
+
+
+def _digest(value: Any) -> str:
+    if isinstance(value, bytes):
+        data = value
+    else:
+        data = json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def request_key(request: httpx.Request) -> str:
+    """
+    Exact match: method, URL without credentials and the body (JSON compared by content).
+    """
+    body = _json_body(request)
+    return _digest([request.method, _scrub_url(request.url), body if body is not None else _digest(request.content)])
+
+
+def route_key(request: httpx.Request) -> str:
+    """
+    Loose match for requests whose body changed since recording (prompts embed dates and page text).
+
+    Method, host and path; for chat requests also the system prompt and the
+    stream flag, so normalization and synthesis calls stay apart.
+    """
+    parts: List[Any] = [request.method, request.url.host, request.url.path]
+    body = _json_body(request)
+    if isinstance(body, dict) and isinstance(body.get("messages"), list) and body["messages"]:
+        first = body["messages"][0]
+        parts += [_digest(first.get("content", "") if isinstance(first, dict) else first), bool(body.get("stream"))]
+    return _digest(parts)
+
+
+class Cassette:
+    """
+    Recorded provider responses plus the search requests that produced them, stored as JSON.
+    """
+
+    def __init__(self, interactions: Optional[List[Dict[str, Any]]] = None,
+                 requests: Optional[List[Dict[str, Any]]] = None, meta: Optional[Dict[str, Any]] = None):
+        self.interactions = interactions or []
+        self.requests = requests or []
+        self.meta = meta or {}
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("interactions"), data.get("requests"), data.get("meta"))
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"meta": self.meta, "requests": self.requests, "interactions": self.interactions},
+                      f, ensure_ascii=False, indent=1)
+            f.write("\n")
+
+    def add(self, request: httpx.Request, status: int, headers: httpx.Headers, body: bytes, elapsed_ms: float) -> None:
+        try:
+            text, encoding = body.decode("utf-8"), "text"
+        except UnicodeDecodeError:
+            text, encoding = base64.b64encode(body).decode("ascii"), "base64"
+        self.interactions.append({
+            "provider": provider_of(request.url),
+            "method": request.method,
+            "url": _scrub_url(request.url),
+            "key": request_key(request),
+            "route": route_key(request),
+            "status": status,
+            "headers": {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS},
+            "body": text,
+            "encoding": encoding,
+            "elapsedMs": round(elapsed_ms, 1),
+        })
+
+    @staticmethod
+    def response(interaction: Dict[str, Any], request: httpx.Request) -> httpx.Response:
+        body = interaction["body"]
+        content = base64.b64decode(body) if interaction.get("encoding") == "base64" else body.encode("utf-8")
+        return httpx.Response(interaction["status"], headers=interaction.get("headers"), content=content, request=request)
+
+
+def apply_settings(cassette: Cassette) -> None:
+    """
+    Restore the settings a cassette was recorded with, and give each recorded provider a placeholder key if it has none.
+    """
+    for name, value in cassette.meta.get("settings", {}).items():
+        setattr(settings, name, value)
+    for provider in {interaction["provider"] for interaction in cassette.interactions}:
+        if provider in PROVIDER_KEYS and not getattr(settings, PROVIDER_KEYS[provider]):
+            setattr(settings, PROVIDER_KEYS[provider], "replay")
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """
+    Sends requests over the network and adds each response to a cassette.
+
+    Bodies are read in full before they are returned, so streamed LLM
+    responses arrive at once while recording.
+    """
+
+    def __init__(self, cassette: Cassette, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.cassette = cassette
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        try:
+            body = await response.aread()
+        finally:
+            await response.aclose()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.cassette.add(request, response.status_code, response.headers, body, elapsed_ms)
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _DROP_HEADERS]
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self) -> None:
+        # Shared by every client; closed by the harness with close()
+        pass
+
+    async def close(self) -> None:
+        await self.inner.aclose()
+
+
+def parse_specs(text: Optional[str]) -> Dict[str, Tuple[str, ...]]:
+    """
+    "brave=400:0.5,firecrawl=900" -> {"brave": ("400", "0.5"), "firecrawl": ("900",)}
+    """
+    specs: Dict[str, Tuple[str, ...]] = {}
+    for item in (text or "").split(","):
+        if item.strip():
+            provider, _, value = item.partition("=")
+            specs[provider.strip()] = tuple(value.strip().split(":"))
+    return specs
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Answers requests from a cassette, with injected latency and errors.
+
+    A request takes the next recording with the same exact key, else the
+    next one on the same route (see route_key), cycling through repeats.
+    Requests with no recording fail with ConnectError, as if offline.
+
+    Latency per provider is the recorded time times latency_scale, or a
+    log-normal draw around latency[provider] = (median_ms, sigma). Errors are
+    injected with probability errors[provider] = (rate, kind), where kind is
+    an HTTP status (default 503) or "timeout".
+    """
+
+    def __init__(self, cassette: Cassette, latency: Optional[Dict[str, Tuple[str, ...]]] = None,
+                 errors: Optional[Dict[str, Tuple[str, ...]]] = None, latency_scale: float = 1.0, seed: int = 0):
+        self.latency = latency or {}
+        self.errors = errors or {}
+        self.latency_scale = latency_scale
+        self.rng = random.Random(seed)
+        self.by_key: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.by_route: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for interaction in cassette.interactions:
+            self.by_key[interaction["key"]].append(interaction)
+            self.by_route[interaction["route"]].append(interaction)
+        self._next: Dict[str, int] = defaultdict(int)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.loose: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+        self.injected: Dict[str, int] = defaultdict(int)
+
+    def _take(self, table: Dict[str, List[Dict[str, Any]]], key: str) -> Optional[Dict[str, Any]]:
+        matches = table.get(key)
+        if not matches:
+            return None
+        index = self._next[key]
+        self._next[key] = index + 1
+        return matches[index % len(matches)]
+
+    def _delay_s(self, provider: str, interaction: Optional[Dict[str, Any]]) -> float:
+        spec = self.latency.get(provider)
+        if spec:
+            median_ms = float(spec[0])
+            sigma = float(spec[1]) if len(spec) > 1 else 0.0
+            return median_ms * math.exp(sigma * self.rng.gauss(0, 1)) / 1000
+        recorded = interaction.get("elapsedMs", 0) if interaction else 0
+        return recorded * self.latency_scale / 1000
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        provider = provider_of(request.url)
+        self.calls[provider] += 1
+        interaction = self._take(self.by_key, request_key(request))
+        if interaction is None:
+            interaction = self._take(self.by_route, route_key(request))
+            if interaction is not None:
+                self.loose[provider] += 1
+        error = self.errors.get(provider)
+        failed = error is not None and self.rng.random() < float(error[0])
+        await asyncio.sleep(self._delay_s(provider, interaction))
+        if failed:
+            self.injected[provider] += 1
+            kind = error[1] if len(error) > 1 else "503"
+            if kind == "timeout":
+                raise httpx.ReadTimeout("injected timeout", request=request)
+            return httpx.Response(int(kind), json={"error": "injected"}, request=request)
+        if interaction is None:
+            self.misses[provider] += 1
+            raise httpx.ConnectError(f"no recording for {request.method} {_scrub_url(request.url)}", request=request)
+        return Cassette.response(interaction, request)
+
+    async def aclose(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            provider: {
+                "calls": self.calls[provider],
+                "loose": self.loose[provider],
+                "misses": self.misses[provider],
+                "injected": self.injected[provider],
+            }
+            for provider in sorted(self.calls)
+        }
@@ -1,18 +1,155 @@
-from typing import Dict, Any
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional
+from ..config import settings
+from ..metrics import counter
+from .rules import RuleSet, SafetyRule
 
 
-def apply_safety_guard(response: Dict[str, Any]) -> Dict[str, Any]:
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json")
+
+RULE_HITS = counter(
+    "safety_rule_hits_total",
+    "Answers matched by each safety rule",
+    ("rule",)
+)
+RELOADS = counter(
+    "safety_rules_reloads_total",
+    "Safety rule file loads by result (ok, error)",
+    ("result",)
+)
+
+
+class SafetyGuard:
+    """
+    Adds disclaimers to answers about medical, legal, financial and other sensitive topics.
+
+    The lexicon is a JSON rules file (SAFETY_RULES_PATH, or the bundled
+    rules.json) compiled into one regex, so the query, answer and bullets are
+    scanned once however many rules there are. Every SAFETY_RELOAD_INTERVAL_S
+    the file's modification time is checked; a changed file is compiled in a
+    background thread and swapped in when ready, and a file that fails to
+    load leaves the previous rules in place.
+    """
+
+    def __init__(self, path: Optional[str] = None, reload_interval_s: Optional[float] = None):
+        self.path = path or settings.SAFETY_RULES_PATH or DEFAULT_RULES_PATH
+        self.reload_interval_s = (reload_interval_s if reload_interval_s is not None
+                                  else settings.SAFETY_RELOAD_INTERVAL_S)
+        self.loaded_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._mtime = self._stat()
+        self._checked = time.monotonic()
+        self._reloading = threading.Lock()
+        self.rules = RuleSet([])
+        self.reload()
+
+    def _stat(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self) -> bool:
+        """
+        Load and compile the rules file now; returns whether it succeeded.
+        """
+        start = time.perf_counter()
+        mtime = self._stat()
+        try:
+            rules = RuleSet.load(self.path)
+        except Exception as e:
+            # Retried when the file changes again
+            self._mtime = mtime
+            self.last_error = str(e)
+            RELOADS.inc(result="error")
+            logger.warning("Failed to load safety rules from %s, keeping version %r: %s",
+                           self.path, self.rules.version, e)
+            return False
+        self.rules = rules
+        self._mtime = mtime
+        self.loaded_at = time.time()
+        self.last_error = None
+        RELOADS.inc(result="ok")
+        logger.info("Loaded safety rules version %r: %d rules, %d patterns in %.1fms", rules.version,
+                    len(rules.rules), rules.pattern_count, (time.perf_counter() - start) * 1000)
+        return True
+
+    def _reload_in_background(self) -> None:
+        try:
+            self.reload()
+        finally:
+            self._reloading.release()
+
+    def _maybe_reload(self) -> None:
+        if self.reload_interval_s <= 0:
+            return
+        now = time.monotonic()
+        if now - self._checked < self.reload_interval_s:
+            return
+        self._checked = now
+        mtime = self._stat()
+        if mtime is not None and mtime != self._mtime and self._reloading.acquire(blocking=False):
+            # Requests keep using the current rules while the new file compiles
+            threading.Thread(target=self._reload_in_background, name="safety-rules-reload", daemon=True).start()
+
+    def match(self, query: str, response: Dict[str, Any]) -> List[SafetyRule]:
+        """
+        Rules matching the query, answer or bullets, in lexicon order.
+        """
+        self._maybe_reload()
+        bullets = response.get("bullets") or []
+        text = "\n".join([query or "", str(response.get("answer", ""))] + [str(b) for b in bullets])
+        return self.rules.match(text)
+
+    def apply(self, response: Dict[str, Any], query: str = "") -> Dict[str, Any]:
+        disclaimers: List[str] = []
+        for rule in self.match(query, response):
+            RULE_HITS.inc(rule=rule.id)
+            if rule.disclaimer and rule.disclaimer not in disclaimers:
+                disclaimers.append(rule.disclaimer)
+        if disclaimers:
+            response["answer"] = " ".join([response.get("answer", "")] + disclaimers)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "version": self.rules.version,
+            "rules": len(self.rules.rules),
+            "patterns": self.rules.pattern_count,
+            "loadedAt": self.loaded_at,
+            "lastError": self.last_error,
+        }
+
+
+_guard: Optional[SafetyGuard] = None
+_guard_lock = threading.Lock()
+
+
+def get_guard() -> SafetyGuard:
+    """
+    The process-wide guard, loading the rules on first use.
+    """
+    global _guard
+    if _guard is None:
+        with _guard_lock:
+            if _guard is None:
+                _guard = SafetyGuard()
+    return _guard
+
+
+def apply_safety_guard(response: Dict[str, Any], query: Optional[str] = None) -> Dict[str, Any]:
     """
     Apply safety guard to the response.
+
+    Appends the disclaimer of every rule matching the query, answer or
+    bullets to the answer (each distinct disclaimer once).
     """
-    # Check if topic is medical/legal/financial and add disclaimer
-    query = response.get("query", "")
-    answer = response.get("answer", "")
-    
-    sensitive_topics = ['medical', 'legal', 'financial', 'health', 'law', 'finance', 'medicine', 'doctor', 'lawyer', 'investment']
-    is_sensitive = any(topic in query.lower() or topic in answer.lower() for topic in sensitive_topics)
-    
-    if is_sensitive:
-        response["answer"] += " Note: This is not professional advice."
-    
-    return response
\ No newline at end of file
+    if query is None:
+        query = response.get("query", "")
+    return get_guard().apply(response, query)
@@ -0,0 +1,159 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class SafetyRule:
+    """
+    A named list of patterns and the disclaimer added when one of them matches.
+
+    Patterns are words or phrases matched case-insensitively at word
+    boundaries; a trailing "*" matches any word ending ("invest*" matches
+    "investing"), and spaces match any run of whitespace.
+    """
+
+    def __init__(self, rule_id: str, patterns: List[str], disclaimer: str):
+        self.id = rule_id
+        self.patterns = patterns
+        self.disclaimer = disclaimer
+
+
+def _parse_pattern(pattern: str) -> Tuple[str, bool]:
+    """
+    "Medical  advice*" -> ("medical advice", True): lowercased words joined by one space, and whether it is a prefix.
+    """
+    text = pattern.strip().lower()
+    prefix = text.endswith("*")
+    text = " ".join(text.rstrip("*").split())
+    if not text:
+        raise ValueError(f"empty safety pattern {pattern!r}")
+    return text, prefix
+
+
+def _trie_regex(terms: List[str]) -> str:
+    """
+    One regex alternation for many terms, factored into a prefix tree.
+
+    The regex engine follows a single branch per character instead of
+    trying every term, so matching cost barely grows with the number of
+    terms. Optional tails are greedy, so the longest term wins and shorter
+    ones are tried on backtracking.
+    """
+    trie: Dict[str, Any] = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def render(node: Dict[str, Any]) -> str:
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + render(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ""
+        if len(branches) > 1:
+            body = "(?:" + "|".join(branches) + ")"
+        elif "" in node and len(branches[0]) > 1:
+            body = f"(?:{branches[0]})"
+        else:
+            body = branches[0]
+        return body + "?" if "" in node else body
+
+    return render(trie)
+
+
+class RuleSet:
+    """
+    A version of the safety lexicon, compiled into one regex.
+
+    match() scans the text once, resuming inside each match so overlapping
+    terms are all found; each match is mapped back to every rule whose
+    pattern covers it, exact terms by lookup at its word boundaries and
+    prefix terms by looking up the prefixes of the matched word.
+    """
+
+    def __init__(self, rules: List[SafetyRule], version: str = ""):
+        self.rules = rules
+        self.version = version
+        self._order = {rule.id: index for index, rule in enumerate(rules)}
+        self._exact: Dict[str, Set[str]] = {}
+        self._prefix: Dict[str, Set[str]] = {}
+        for rule in rules:
+            for pattern in rule.patterns:
+                text, prefix = _parse_pattern(pattern)
+                (self._prefix if prefix else self._exact).setdefault(text, set()).add(rule.id)
+        self.pattern_count = len(self._exact) + len(self._prefix)
+        self._max_prefix = max(map(len, self._prefix), default=0)
+        branches = []
+        if self._exact:
+            branches.append(f"(?:{_trie_regex(list(self._exact))})(?!\\w)")
+        if self._prefix:
+            branches.append(f"(?:{_trie_regex(list(self._prefix))})\\w*")
+        self._regex: Optional[re.Pattern] = (
+            re.compile(r"(?<!\w)(?:" + "|".join(branches) + ")") if branches else None
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RuleSet":
+        """
+        Build from the rules file format:
+        {"version": "...", "disclaimer": "...", "rules": [{"id": "...", "patterns": [...], "disclaimer": "...", "enabled": true}]}
+        """
+        default = data.get("disclaimer", "")
+        rules, seen = [], set()
+        for entry in data.get("rules", []):
+            rule_id = entry.get("id")
+            patterns = entry.get("patterns")
+            if not rule_id or not isinstance(patterns, list):
+                raise ValueError(f"safety rule needs an id and a list of patterns: {entry!r}")
+            if rule_id in seen:
+                raise ValueError(f"duplicate safety rule id {rule_id!r}")
+            seen.add(rule_id)
+            if entry.get("enabled", True):
+                rules.append(SafetyRule(rule_id, [str(p) for p in patterns], entry.get("disclaimer", default)))
+        return cls(rules, str(data.get("version", "")))
+
+    @classmethod
+    def load(cls, path: str) -> "RuleSet":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def _rules_for(self, text: str) -> Set[str]:
+        """
+        Rules covering a matched term or any shorter term it starts with.
+
+        The regex reports only the longest term at each position, so
+        "legal advice" also fires a rule listing just "legal": exact terms
+        are looked up at every word boundary of the match, prefix terms at
+        every character.
+        """
+        matched = set(self._exact.get(text, ()))
+        for end, char in enumerate(text):
+            if char == " ":
+                matched.update(self._exact.get(text[:end], ()))
+        if self._prefix:
+            for end in range(min(len(text), self._max_prefix), 0, -1):
+                matched.update(self._prefix.get(text[:end], ()))
+        return matched
+
+    def match(self, text: str) -> List[SafetyRule]:
+        """
+        Rules with a pattern in text, in lexicon order.
+        """
+        if self._regex is None:
+            return []
+        matched: Set[str] = set()
+        seen: Set[str] = set()
+        lowered = text.lower()
+        found = self._regex.search(lowered)
+        while found is not None:
+            term = " ".join(found.group().split())
+            if term not in seen:
+                seen.add(term)
+                matched.update(self._rules_for(term))
+            # Resume at the next word start inside the match, so "advice" in
+            # "legal advice" still fires a rule of its own
+            found = self._regex.search(lowered, found.start() + 1)
+        return [self.rules[index] for index in sorted(self._order[rule_id] for rule_id in matched)]
@@ -1,9 +1,9 @@
-import httpx
 from typing import List, Optional
 from urllib.parse import urlencode
 from .base import SearchProvider
 from ..contracts import SearchResult
 from ..config import settings
+from ..http_client import new_client
 
 
 class BraveSearchProvider(SearchProvider):
@@ -34,7 +34,7 @@ class BraveSearchProvider(SearchProvider):
             "X-Subscription-Token": settings.BRAVE_API_KEY
         }
         
-        async with httpx.AsyncClient() as client:
+        async with new_client() as client:
             response = await client.get(url, headers=headers)
             response.raise_for_status()
             data = response.json()
@@ -0,0 +1,34 @@
+from typing import List
+from .base import SearchProvider
+from ..contracts import SearchResult
+from ..store.docstore import DocumentStore
+
+
+class LocalSearchProvider(SearchProvider):
+    """
+    Search provider backed by the local document store (no network calls).
+    """
+
+    def __init__(self, store: DocumentStore):
+        self.store = store
+
+    async def search(self, query: str, max_results: int, include_domains: List[str] = None,
+                     exclude_domains: List[str] = None) -> List[SearchResult]:
+        """
+        Search previously extracted documents by content.
+        """
+        hits = await self.store.search(query, max_results, include_domains, exclude_domains)
+
+        results = []
+        for hit in hits:
+            # bm25 is negative and unbounded; squash it into 0..1 like provider scores
+            strength = max(0.0, -hit["score"])
+            results.append(SearchResult(
+                url=hit["url"],
+                title=hit.get("title") or "",
+                snippet=hit.get("snippet") or "",
+                score=strength / (1 + strength),
+                published=hit.get("published")
+            ))
+
+        return results
@@ -1,9 +1,9 @@
-import httpx
 from typing import List, Optional
 from urllib.parse import urlencode
 from .base import SearchProvider
 from ..contracts import SearchResult
 from ..config import settings
+from ..http_client import new_client
 
 
 class SearchApiProvider(SearchProvider):
@@ -28,7 +28,7 @@ class SearchApiProvider(SearchProvider):
         
         url = f"https://www.searchapi.io/api/v1/search?{urlencode(params)}"
         
-        async with httpx.AsyncClient() as client:
+        async with new_client() as client:
             response = await client.get(url)
             response.raise_for_status()
             data = response.json()
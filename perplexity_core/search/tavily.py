@@ -1,8 +1,8 @@
-import httpx
 from typing import List, Optional
 from .base import SearchProvider
 from ..contracts import SearchResult
 from ..config import settings
+from ..http_client import new_client
 
 
 class TavilySearchProvider(SearchProvider):
@@ -32,7 +32,7 @@ class TavilySearchProvider(SearchProvider):
             "exclude_domains": exclude_domains or []
         }
         
-        async with httpx.AsyncClient() as client:
+        async with new_client() as client:
             response = await client.post(url, json=payload, headers=headers)
             response.raise_for_status()
             data = response.json()
@@ -0,0 +1,209 @@
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Optional
+from ..config import settings
+from ..rank.ranker import get_domain
+from ..util.urls import canonicalize_url
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    key TEXT NOT NULL UNIQUE,
+    domain TEXT,
+    title TEXT,
+    text TEXT,
+    markdown TEXT,
+    published TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    title, text, content='documents', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts(rowid, title, text) VALUES (new.id, new.title, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+    INSERT INTO documents_fts(rowid, title, text) VALUES (new.id, new.title, new.text);
+END;
+"""
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 MATCH expression (OR of quoted terms).
+    """
+    terms = [t for t in _TOKEN.findall(query.lower()) if len(t) > 1]
+    return " OR ".join(f'"{t}"' for t in dict.fromkeys(terms))
+
+
+class DocumentStore:
+    """
+    Persistent local store of extracted documents with a full-text index.
+
+    Every document written by the pipeline is kept in SQLite (FTS5) so it can
+    be found again by content after its URL-cache TTL, without a provider call.
+    Documents are keyed on canonicalize_url, like the URL cache, so tracking
+    parameters and www./m. variants of a page share one entry.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.DOCSTORE_PATH
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Calls are serialized through a lock and run in worker threads
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._add_keys()
+            self._conn.commit()
+
+    def _add_keys(self) -> None:
+        """
+        Give stores created before documents were keyed on the canonical URL a key column.
+
+        Of several rows with the same key only the most recently fetched is kept.
+        """
+        columns = [row["name"] for row in self._conn.execute("PRAGMA table_info(documents)")]
+        if "key" in columns:
+            return
+        self._conn.execute("ALTER TABLE documents ADD COLUMN key TEXT")
+        rows = self._conn.execute("SELECT id, url FROM documents ORDER BY fetched_at DESC").fetchall()
+        seen = set()
+        for row in rows:
+            key = canonicalize_url(row["url"])
+            if key in seen:
+                self._conn.execute("DELETE FROM documents WHERE id = ?", (row["id"],))
+            else:
+                seen.add(key)
+                self._conn.execute("UPDATE documents SET key = ? WHERE id = ?", (key, row["id"]))
+        self._conn.execute("CREATE UNIQUE INDEX documents_key ON documents(key)")
+
+    def _put_many(self, docs: List[Dict[str, Any]]) -> int:
+        now = time.time()
+        rows = [
+            (
+                doc["url"],
+                canonicalize_url(doc["url"]),
+                get_domain(doc["url"]),
+                doc.get("title") or "",
+                doc.get("text") or doc.get("markdown") or "",
+                doc.get("markdown") or "",
+                doc.get("published"),
+                now,
+            )
+            for doc in docs
+            if doc.get("url") and (doc.get("text") or doc.get("markdown"))
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO documents (url, key, domain, title, text, markdown, published, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    url=excluded.url, domain=excluded.domain, title=excluded.title, text=excluded.text,
+                    markdown=excluded.markdown, published=excluded.published,
+                    fetched_at=excluded.fetched_at
+                """,
+                rows,
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def _get(self, url: str, max_age_s: Optional[int]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, title, text, markdown, published, fetched_at FROM documents WHERE key = ?",
+                (canonicalize_url(url),),
+            ).fetchone()
+        if row is None:
+            return None
+        if max_age_s is not None and time.time() - row["fetched_at"] > max_age_s:
+            return None
+        return {
+            "url": row["url"],
+            "title": row["title"],
+            "markdown": row["markdown"],
+            "text": row["text"],
+            "published": row["published"],
+        }
+
+    def _search(self, query: str, limit: int, include_domains: Optional[List[str]],
+                exclude_domains: Optional[List[str]]) -> List[Dict[str, Any]]:
+        match = fts_query(query)
+        if not match:
+            return []
+
+        sql = """
+            SELECT d.url, d.title, d.published, d.domain,
+                   snippet(documents_fts, 1, '', '', ' ... ', 32) AS snippet,
+                   bm25(documents_fts, 4.0, 1.0) AS score
+            FROM documents_fts
+            JOIN documents d ON d.id = documents_fts.rowid
+            WHERE documents_fts MATCH ?
+        """
+        params: List[Any] = [match]
+        if include_domains:
+            sql += f" AND d.domain IN ({','.join('?' * len(include_domains))})"
+            params.extend(domain.lower() for domain in include_domains)
+        if exclude_domains:
+            sql += f" AND d.domain NOT IN ({','.join('?' * len(exclude_domains))})"
+            params.extend(domain.lower() for domain in exclude_domains)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def text(self, url: str) -> Optional[str]:
+        """
+        Stored plain text of a document, or None. Synchronous, for worker threads.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM documents WHERE key = ?", (canonicalize_url(url),)
+            ).fetchone()
+        return row["text"] if row else None
+
+    async def put_many(self, docs: List[Dict[str, Any]]) -> int:
+        """
+        Insert or refresh extracted documents. Returns the number written.
+        """
+        return await asyncio.to_thread(self._put_many, docs)
+
+    async def get(self, url: str, max_age_s: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get a stored document by URL, optionally ignoring entries older than max_age_s.
+        """
+        return await asyncio.to_thread(self._get, url, max_age_s)
+
+    async def search(self, query: str, limit: int = 10, include_domains: Optional[List[str]] = None,
+                     exclude_domains: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Full-text search over stored documents, best matches first.
+
+        Each hit has url, title, published, domain, snippet and a bm25 score
+        (lower is better, as reported by SQLite).
+        """
+        return await asyncio.to_thread(self._search, query, limit, include_domains, exclude_domains)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,110 @@
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from ..config import settings
+from ..contracts import InternalRecord
+from .records import COLUMNS, record_row
+
+try:
+    import psycopg
+except ImportError:  # optional: pip install perplexity-engine[postgres]
+    psycopg = None
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_records (
+    id SERIAL PRIMARY KEY,
+    query TEXT NOT NULL,
+    normalized_query TEXT,
+    params_json JSONB,
+    sources_json JSONB,
+    answer_json JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+class PostgresRecordWriter:
+    """
+    search_records in Postgres, one COPY per batch.
+
+    The connection is opened on construction and reopened on the next batch
+    after it breaks; the table is created if it does not exist.
+    """
+
+    def __init__(self, conninfo: Optional[str] = None):
+        if psycopg is None:
+            raise ImportError("psycopg is not installed (pip install perplexity-engine[postgres])")
+        self.conninfo = conninfo or (
+            f"host={settings.POSTGRES_HOST} port={settings.POSTGRES_PORT} dbname={settings.POSTGRES_DB} "
+            f"user={settings.POSTGRES_USER} password={settings.POSTGRES_PASSWORD}"
+        )
+        self._conn = None
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connect()
+
+    def _connect(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg.connect(self.conninfo, connect_timeout=settings.REQUEST_TIMEOUT_S)
+            with self._conn.transaction():
+                self._conn.execute(_SCHEMA)
+        return self._conn
+
+    def write_many(self, records: List[InternalRecord]) -> int:
+        # created_at is stored as UTC without a zone, like the column default
+        rows = [row[:-1] + (row[-1].replace(tzinfo=None),) for row in map(record_row, records)]
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn.transaction(), conn.cursor() as cur:
+                    with cur.copy(f"COPY search_records ({', '.join(COLUMNS)}) FROM STDIN") as copy:
+                        for row in rows:
+                            copy.write_row(row)
+            except psycopg.OperationalError:
+                # Reconnect on the next batch
+                conn.close()
+                raise
+        return len(rows)
+
+    def recent(self, limit: int = 100) -> List[InternalRecord]:
+        """
+        The latest records, newest first.
+        """
+        with self._lock:
+            conn = self._connect()
+            # Without it the read opens an implicit transaction, and the next
+            # write_many would become an uncommitted savepoint inside it
+            with conn.transaction():
+                rows = conn.execute(
+                    f"SELECT id, {', '.join(COLUMNS)} FROM search_records ORDER BY id DESC LIMIT %s",
+                    (limit,)
+                ).fetchall()
+        return [
+            InternalRecord(
+                id=row[0], query=row[1], normalized_query=row[2], params_json=row[3] or {},
+                sources_json=row[4] or [], answer_json=row[5] or {}, created_at=row[6]
+            )
+            for row in rows
+        ]
+
+    def top_queries(self, since: datetime, limit: int = 100) -> List[Tuple[str, Dict[str, Any], int]]:
+        """
+        The most recorded (query, params_json) pairs since a time, with their counts, most frequent first.
+        """
+        with self._lock:
+            conn = self._connect()
+            # An explicit transaction ends with the read instead of leaving the connection idle in one
+            with conn.transaction():
+                rows = conn.execute(
+                    "SELECT query, params_json, COUNT(*) AS n FROM search_records WHERE created_at >= %s "
+                    "GROUP BY query, params_json ORDER BY n DESC LIMIT %s",
+                    (since.replace(tzinfo=None), limit)
+                ).fetchall()
+        return [(row[0], row[1] or {}, row[2]) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,284 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from ..config import settings
+from ..contracts import InternalRecord, SearchRequest, SearchResponse
+from ..metrics import counter, gauge, histogram
+from .. import registry
+
+
+logger = logging.getLogger(__name__)
+
+BUFFERED = gauge(
+    "records_buffered",
+    "Query records waiting to be written"
+)
+WRITTEN = counter(
+    "records_written_total",
+    "Query records written to the history store"
+)
+DROPPED = counter(
+    "records_dropped_total",
+    "Query records lost by reason (buffer_full, write_error, shutdown)",
+    ("reason",)
+)
+FLUSH_SECONDS = histogram(
+    "records_flush_seconds",
+    "Time to write one batch of query records"
+)
+
+COLUMNS = ("query", "normalized_query", "params_json", "sources_json", "answer_json", "created_at")
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_records (
+    id INTEGER PRIMARY KEY,
+    query TEXT NOT NULL,
+    normalized_query TEXT,
+    params_json TEXT,
+    sources_json TEXT,
+    answer_json TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS search_records_created_at ON search_records (created_at);
+"""
+
+
+def build_record(req: SearchRequest, normalized_query: Optional[str], response: SearchResponse) -> InternalRecord:
+    """
+    The history record for one answered request.
+
+    params_json holds every request field but the query, so
+    SearchRequest(query=record.query, **record.params_json) rebuilds the request.
+    """
+    return InternalRecord(
+        query=req.query,
+        normalized_query=normalized_query,
+        params_json=req.model_dump(mode="json", exclude={"query"}),
+        sources_json=[source.model_dump(mode="json") for source in response.sources],
+        answer_json=response.model_dump(mode="json", include={"answer", "bullets", "diagnostics"},
+                                        exclude={"diagnostics": {"spans"}}),
+        created_at=datetime.now(timezone.utc)
+    )
+
+
+def record_row(record: InternalRecord) -> Tuple[Any, ...]:
+    """
+    Column values in COLUMNS order, with the JSON fields serialized.
+    """
+    return (
+        record.query,
+        record.normalized_query,
+        json.dumps(record.params_json, ensure_ascii=False),
+        json.dumps(record.sources_json, ensure_ascii=False),
+        json.dumps(record.answer_json, ensure_ascii=False),
+        record.created_at or datetime.now(timezone.utc),
+    )
+
+
+class SQLiteRecordWriter:
+    """
+    search_records in a local SQLite file, written with multi-row inserts.
+
+    Stands in for Postgres in local runs and tests; JSON columns are TEXT and
+    created_at is an ISO 8601 string.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.RECORDS_SQLITE_PATH
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SQLITE_SCHEMA)
+            self._conn.commit()
+
+    def write_many(self, records: List[InternalRecord]) -> int:
+        rows = [row[:-1] + (row[-1].isoformat(),) for row in map(record_row, records)]
+        # At most 999 bound parameters per statement in older SQLite builds
+        chunk = 999 // len(COLUMNS)
+        placeholders = "(" + ", ".join("?" * len(COLUMNS)) + ")"
+        with self._lock:
+            for start in range(0, len(rows), chunk):
+                part = rows[start:start + chunk]
+                self._conn.execute(
+                    f"INSERT INTO search_records ({', '.join(COLUMNS)}) VALUES "
+                    + ", ".join([placeholders] * len(part)),
+                    [value for row in part for value in row]
+                )
+            self._conn.commit()
+        return len(rows)
+
+    def recent(self, limit: int = 100) -> List[InternalRecord]:
+        """
+        The latest records, newest first.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, {', '.join(COLUMNS)} FROM search_records ORDER BY id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [
+            InternalRecord(
+                id=row[0], query=row[1], normalized_query=row[2], params_json=json.loads(row[3]),
+                sources_json=json.loads(row[4]), answer_json=json.loads(row[5]),
+                created_at=datetime.fromisoformat(row[6])
+            )
+            for row in rows
+        ]
+
+    def top_queries(self, since: datetime, limit: int = 100) -> List[Tuple[str, Dict[str, Any], int]]:
+        """
+        The most recorded (query, params_json) pairs since a time, with their counts, most frequent first.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT query, params_json, COUNT(*) AS n FROM search_records WHERE created_at >= ? "
+                "GROUP BY query, params_json ORDER BY n DESC LIMIT ?",
+                (since.isoformat(), limit)
+            ).fetchall()
+        return [(row[0], json.loads(row[1]), row[2]) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RecordSink:
+    """
+    Write-behind buffer for query records.
+
+    submit() puts a record on a bounded in-memory queue and returns; a
+    background task collects up to RECORDS_BATCH_SIZE records (waiting at
+    most RECORDS_FLUSH_INTERVAL_S for a batch to fill) and writes each batch
+    in a worker thread. When the buffer is full a record is dropped, or with
+    RECORDS_OVERFLOW=block the caller waits up to RECORDS_BLOCK_TIMEOUT_S
+    first. Failed batches are dropped too; every drop is counted in
+    records_dropped_total. The writer ("postgres" or "sqlite") is created on
+    the first flush, so an unreachable database never delays a request.
+    """
+
+    def __init__(self, backend: Optional[str] = None, writer: Any = None):
+        self.backend = (backend or settings.RECORDS_BACKEND).lower()
+        self.writer = writer
+        self.batch_size = max(1, settings.RECORDS_BATCH_SIZE)
+        self.interval = settings.RECORDS_FLUSH_INTERVAL_S
+        self.written = 0
+        self.dropped = 0
+        self.last_error: Optional[str] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _start(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Records left by an event loop that ended without close()
+            if self._queue is not None and self._queue.qsize():
+                self._drop(self._queue.qsize(), "shutdown")
+            self._queue = asyncio.Queue(max(1, settings.RECORDS_BUFFER_SIZE))
+            self._task = loop.create_task(self._run())
+            self._loop = loop
+        return self._queue
+
+    async def submit(self, record: InternalRecord) -> bool:
+        """
+        Queue a record for writing; returns False if it was dropped.
+        """
+        queue = self._start()
+        try:
+            queue.put_nowait(record)
+        except asyncio.QueueFull:
+            if settings.RECORDS_OVERFLOW.lower() != "block":
+                self._drop(1, "buffer_full")
+                return False
+            try:
+                await asyncio.wait_for(queue.put(record), settings.RECORDS_BLOCK_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                self._drop(1, "buffer_full")
+                return False
+        BUFFERED.set(queue.qsize())
+        return True
+
+    def _drop(self, count: int, reason: str) -> None:
+        self.dropped += count
+        DROPPED.inc(count, reason=reason)
+
+    async def _next_batch(self, queue: asyncio.Queue) -> List[InternalRecord]:
+        batch = [await queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.interval
+        while len(batch) < self.batch_size:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            batch = await self._next_batch(queue)
+            BUFFERED.set(queue.qsize())
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def _write(self, batch: List[InternalRecord]) -> None:
+        start = time.perf_counter()
+        try:
+            if self.writer is None:
+                self.writer = await asyncio.to_thread(registry.create, "records", self.backend)
+            written = await asyncio.to_thread(self.writer.write_many, batch)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning("Failed to write %d query records: %s", len(batch), e)
+            self._drop(len(batch), "write_error")
+            return
+        FLUSH_SECONDS.observe(time.perf_counter() - start)
+        WRITTEN.inc(written)
+        self.written += written
+        logger.debug("Wrote %d query records", written)
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """
+        Write what is buffered (waiting up to timeout seconds) and stop the background task.
+        """
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("%d query records not written at shutdown", self._queue.qsize())
+            self._drop(self._queue.qsize(), "shutdown")
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._loop = None
+        if self.writer is not None and hasattr(self.writer, "close"):
+            await asyncio.to_thread(self.writer.close)
+            self.writer = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "buffered": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+            "lastError": self.last_error,
+        }
@@ -11,8 +11,8 @@ def compose_synthesis_prompt(req: SearchRequest, docs: List[Dict[str, Any]]) ->
     prompt_docs = []
     for doc in docs:
         if doc.get("markdown") or doc.get("text"):
-            # Use markdown if available, otherwise text
-            excerpt = doc.get("markdown", "") or doc.get("text", "")
+            # Prefer passages reranked against the query, then markdown, then text
+            excerpt = doc.get("excerpt") or doc.get("markdown", "") or doc.get("text", "")
             # Limit excerpt length
             excerpt = excerpt[:2000]
             
@@ -0,0 +1,310 @@
+import json
+from typing import List, Dict, Any, Optional, Tuple
+
+
+_SCALAR_CHARS = set("0123456789+-.eEtruefalsn")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def repair_json(text: str) -> str:
+    """
+    Repair common LLM JSON defects in a single pass.
+
+    Handles prose or code fences around the object, trailing commas, raw
+    control characters inside strings, and truncation (unterminated strings,
+    dangling keys, unclosed arrays and objects). Truncated output is cut back
+    to the last complete value before the open containers are closed.
+
+    Raises:
+        ValueError: If the text contains no JSON object or array
+    """
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise ValueError("No JSON object found")
+
+    out: List[str] = []
+    stack: List[str] = []
+    expect: List[str] = []  # per container: key, colon, value or comma
+    in_string = escape = is_key = False
+    scalar_start: Optional[int] = None
+    string_start = 0
+    pending_comma = False
+    finished = False
+    safe: Tuple[int, List[str]] = (0, [])
+
+    def mark_safe() -> None:
+        nonlocal safe
+        safe = (len(out), list(stack))
+
+    def value_done() -> None:
+        if expect:
+            expect[-1] = "comma"
+        mark_safe()
+
+    def flush_comma() -> None:
+        nonlocal pending_comma
+        if pending_comma:
+            out.append(",")
+            pending_comma = False
+
+    for ch in text[min(starts):]:
+        if in_string:
+            if escape:
+                escape = False
+                out.append(ch)
+            elif ch == "\\":
+                escape = True
+                out.append(ch)
+            elif ch == '"':
+                in_string = False
+                out.append(ch)
+                if is_key:
+                    expect[-1] = "colon"
+                else:
+                    value_done()
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\r":
+                out.append("\\r")
+            elif ch == "\t":
+                out.append("\\t")
+            elif ord(ch) >= 0x20:
+                out.append(ch)
+            continue
+
+        if scalar_start is not None and ch not in _SCALAR_CHARS:
+            try:
+                json.loads("".join(out[scalar_start:]))
+            except ValueError:
+                break
+            scalar_start = None
+            value_done()
+
+        if ch.isspace():
+            continue
+        if ch == '"':
+            flush_comma()
+            in_string = True
+            is_key = bool(stack) and stack[-1] == "{" and expect[-1] == "key"
+            string_start = len(out)
+            out.append(ch)
+        elif ch in "{[":
+            if stack and expect[-1] not in ("value",):
+                break
+            flush_comma()
+            stack.append(ch)
+            expect.append("key" if ch == "{" else "value")
+            out.append(ch)
+            mark_safe()
+        elif ch in "}]":
+            # Dropping the pending comma removes trailing commas
+            pending_comma = False
+            if not stack or expect[-1] in ("colon",) or (stack[-1] == "{" and expect[-1] == "value"):
+                break
+            out.append(_CLOSERS[stack.pop()])
+            expect.pop()
+            if not stack:
+                finished = True
+                break
+            value_done()
+        elif ch == ":":
+            if stack and stack[-1] == "{" and expect[-1] == "colon":
+                expect[-1] = "value"
+                out.append(ch)
+        elif ch == ",":
+            if stack and expect[-1] == "comma":
+                expect[-1] = "key" if stack[-1] == "{" else "value"
+                pending_comma = True
+        elif scalar_start is None:
+            if stack and expect[-1] != "value":
+                break
+            flush_comma()
+            scalar_start = len(out)
+            out.append(ch)
+        else:
+            out.append(ch)
+    else:
+        # Ran out of input: finish whatever value was in progress
+        if in_string and not is_key:
+            if escape:
+                out.pop()
+            out.append('"')
+            try:
+                json.loads("".join(out[string_start:]))
+                value_done()
+            except ValueError:
+                pass
+        elif scalar_start is not None:
+            try:
+                json.loads("".join(out[scalar_start:]))
+                value_done()
+            except ValueError:
+                pass
+
+    if finished:
+        return "".join(out)
+
+    length, open_stack = safe
+    return "".join(out[:length]) + "".join(_CLOSERS[c] for c in reversed(open_stack))
+
+
+def tolerant_loads(text: str) -> Any:
+    """
+    json.loads that falls back to repair_json.
+
+    Raises:
+        ValueError: If the text cannot be repaired into JSON
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    return json.loads(repair_json(text))
+
+
+class IncrementalJSONParser:
+    """
+    Streaming parser for the synthesis JSON object.
+
+    Feed it raw LLM tokens; it scans each character once and reports each
+    top-level field as soon as its value is complete, plus each element of
+    top-level arrays (bullets, sources) as soon as that element is complete.
+    Text before the opening brace (prose, code fences) is ignored.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self._pos = 0
+        self._stack: List[str] = []
+        self._expect: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._is_key = False
+        self._string_start = 0
+        self._scalar_start: Optional[int] = None
+        self._starts: Dict[int, int] = {}
+        self._key: Optional[str] = None
+        self._items: Dict[str, int] = {}
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, Any]]:
+        """
+        Consume a chunk of output.
+
+        Returns:
+            Events completed by this chunk: ("field", name, value) for a
+            finished top-level field, ("item", name, value) for a finished
+            element of a top-level array
+        """
+        self.text += chunk
+        events: List[Tuple[str, str, Any]] = []
+        while self._pos < len(self.text) and not self.done:
+            self._step(self.text[self._pos], self._pos, events)
+            self._pos += 1
+        return events
+
+    def close(self) -> List[Tuple[str, str, Any]]:
+        """
+        Finish the stream, repairing defects and truncation in everything fed so far.
+
+        Returns:
+            Events for values that only the repair completed, in the same
+            form as feed(): array elements not yet reported, then fields not
+            yet reported. Empty when no JSON object can be recovered.
+        """
+        self.done = True
+        try:
+            result = tolerant_loads(self.text)
+        except ValueError:
+            return []
+        if not isinstance(result, dict):
+            return []
+
+        events: List[Tuple[str, str, Any]] = []
+        for name, value in result.items():
+            if name in self.fields:
+                continue
+            if isinstance(value, list):
+                for item in value[self._items.get(name, 0):]:
+                    events.append(("item", name, item))
+            self.fields[name] = value
+            events.append(("field", name, value))
+        return events
+
+    def _value_begin(self, pos: int) -> None:
+        self._starts[len(self._stack)] = pos
+
+    def _value_end(self, end: int, events: List[Tuple[str, str, Any]]) -> None:
+        depth = len(self._stack)
+        self._expect[-1] = "comma"
+        start = self._starts.pop(depth, None)
+        if start is None or self._key is None:
+            return
+        if depth == 1 or (depth == 2 and self._stack[1] == "["):
+            try:
+                value = tolerant_loads(self.text[start:end])
+            except ValueError:
+                return
+            if depth == 1:
+                self.fields[self._key] = value
+                events.append(("field", self._key, value))
+            else:
+                self._items[self._key] = self._items.get(self._key, 0) + 1
+                events.append(("item", self._key, value))
+
+    def _step(self, ch: str, pos: int, events: List[Tuple[str, str, Any]]) -> None:
+        if not self._stack:
+            if ch == "{":
+                self._stack.append("{")
+                self._expect.append("key")
+            return
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._is_key:
+                    self._expect[-1] = "colon"
+                    if len(self._stack) == 1:
+                        try:
+                            self._key = json.loads(self.text[self._string_start:pos + 1])
+                        except ValueError:
+                            self._key = None
+                else:
+                    self._value_end(pos + 1, events)
+            return
+
+        if self._scalar_start is not None and ch not in _SCALAR_CHARS:
+            self._scalar_start = None
+            self._value_end(pos, events)
+
+        if ch.isspace():
+            return
+        if ch == '"':
+            self._is_key = self._stack[-1] == "{" and self._expect[-1] == "key"
+            if not self._is_key:
+                self._value_begin(pos)
+            self._in_string = True
+            self._string_start = pos
+        elif ch in "{[":
+            self._value_begin(pos)
+            self._stack.append(ch)
+            self._expect.append("key" if ch == "{" else "value")
+        elif ch in "}]":
+            self._stack.pop()
+            self._expect.pop()
+            if not self._stack:
+                self.done = True
+                return
+            self._value_end(pos + 1, events)
+        elif ch == ":":
+            self._expect[-1] = "value"
+        elif ch == ",":
+            self._expect[-1] = "key" if self._stack[-1] == "{" else "value"
+        elif self._scalar_start is None:
+            self._value_begin(pos)
+            self._scalar_start = pos
@@ -0,0 +1,60 @@
+import re
+from typing import Set
+from ..contracts import SearchRequest
+from ..rank.prefetch import query_terms
+from ..rank.vectors import tokenize
+
+
+_OPERATOR = re.compile(r'(\b(site|filetype|intitle|inurl|before|after):\S+|"[^"]+"|(^|\s)-\w+|\bOR\b)')
+_URL = re.compile(r'^\s*(https?://|www\.)\S+\s*$', re.IGNORECASE)
+_QUESTION_START = re.compile(
+    r'^\s*(who|what|when|where|which|why|how|is|are|was|were|do|does|did|can|could|should|would|will)\b',
+    re.IGNORECASE
+)
+_CONVERSATIONAL = re.compile(
+    r"\b(please|tell me|can you|could you|i want|i need|i'm looking|help me|explain|compare|vs\.?|versus)\b",
+    re.IGNORECASE
+)
+_RELATIVE_TIME = re.compile(
+    r'\b(latest|recent|recently|today|yesterday|tomorrow|now|current|currently|this (week|month|year)|'
+    r'last (week|month|year)|upcoming|new)\b',
+    re.IGNORECASE
+)
+
+LONG_QUERY_WORDS = 8
+
+
+def should_normalize(req: SearchRequest) -> bool:
+    """
+    Guess whether LLM rewriting is likely to improve the search for this query.
+
+    Queries that already read as search strings (operators, quoted phrases,
+    bare URLs, short keyword lists) are sent as-is. Questions, conversational
+    phrasing, relative time references and long queries are rewritten.
+    """
+    query = req.query.strip()
+    if not query or _URL.match(query) or _OPERATOR.search(query):
+        return False
+    if _QUESTION_START.match(query) or query.endswith("?"):
+        return True
+    if _CONVERSATIONAL.search(query) or _RELATIVE_TIME.search(query):
+        return True
+    return len(query.split()) >= LONG_QUERY_WORDS
+
+
+def _signature(query: str) -> Set[str]:
+    """
+    Content terms plus search operators, the parts that change what a search returns.
+    """
+    operators = {match.group(0).strip().lower() for match in _OPERATOR.finditer(query)}
+    return (query_terms(query) | operators) or set(tokenize(query))
+
+
+def query_change(raw: str, normalized: str) -> float:
+    """
+    Jaccard distance between the raw and normalized query signatures (0 = same search).
+    """
+    a, b = _signature(raw), _signature(normalized)
+    if not a and not b:
+        return 0.0
+    return 1.0 - len(a & b) / len(a | b)
@@ -14,7 +14,8 @@ SYNTHESIS_SYSTEM = """You are a meticulous research assistant. Synthesize the pr
 concise, accurate answer with explicit citations. Do not speculate. If uncertain, say so.
 Return STRICT JSON matching the provided JSON Schema. No markdown, no prose."""
 
-SYNTHESIS_USER = """Schema:
+# Schema block embedded in the prompt for models without native structured output
+SYNTHESIS_SCHEMA = """Schema:
 {{
   "type": "object",
   "required": ["answer", "bullets", "sources", "diagnostics"],
@@ -44,7 +45,10 @@ SYNTHESIS_USER = """Schema:
   }}
 }}
 
-User query:
+"""
+
+# Used as-is when the schema is sent through the provider's structured output option
+SYNTHESIS_USER_NATIVE = """User query:
 "{query}"
 
 Documents (each has url, title, excerpt):
@@ -58,6 +62,8 @@ Instructions:
 - Never invent URLs or titles.
 - Output strict JSON only."""
 
+SYNTHESIS_USER = SYNTHESIS_SCHEMA + SYNTHESIS_USER_NATIVE
+
 # Safety guard prompt
 SAFETY_GUARD_SYSTEM = """Check the JSON for risky advice. If topic is medical/legal/financial, append a short
 "Note: This is not professional advice" disclaimer to the answer. Return the same JSON."""
\ No newline at end of file
@@ -1,9 +1,64 @@
 import json
-import re
-from typing import Dict, Any
-from ..llm.openrouter import OpenRouterProvider
-from ..llm.ollama import OllamaProvider
+from typing import Dict, Any, List
+from ..llm.cached import with_cache
+from ..llm.scheduler import schedule, PRIORITY_INTERACTIVE
 from ..config import settings
+from ..metrics import counter
+from .. import registry
+from .jsonstream import tolerant_loads
+
+
+# How each synthesis response was parsed: valid, local (repaired in-process), llm or failed
+REPAIR_OUTCOMES = counter(
+    "synthesis_json_parse_total",
+    "Synthesis responses by how their JSON was recovered",
+    ("outcome",)
+)
+
+
+def coerce_response(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Coerce parsed synthesis output to the response shape.
+    
+    Drops sources without a URL (e.g. cut off by truncation) and fills
+    missing optional source fields so SearchResponse validation succeeds.
+    """
+    answer = data.get("answer")
+    bullets = data.get("bullets")
+    sources = data.get("sources")
+    
+    clean_sources: List[Dict[str, Any]] = []
+    for source in sources if isinstance(sources, list) else []:
+        if not isinstance(source, dict) or not source.get("url"):
+            continue
+        relevance = source.get("relevance")
+        clean_sources.append({
+            "title": str(source.get("title") or ""),
+            "url": str(source["url"]),
+            "published": source.get("published") if isinstance(source.get("published"), str) else None,
+            "snippet": str(source.get("snippet") or ""),
+            "relevance": float(relevance) if isinstance(relevance, (int, float)) else 0.0,
+        })
+    
+    return dict(
+        data,
+        answer=answer if isinstance(answer, str) else "",
+        bullets=[str(b) for b in bullets] if isinstance(bullets, list) else [],
+        sources=clean_sources
+    )
+
+
+def parse_locally(raw_response: str) -> Dict[str, Any]:
+    """
+    Parse a synthesis response without any LLM call.
+    
+    Raises:
+        ValueError: If no object with an answer can be recovered
+    """
+    parsed = tolerant_loads(raw_response)
+    if not isinstance(parsed, dict) or "answer" not in parsed:
+        raise ValueError("Recovered JSON has no answer")
+    return parsed
 
 
 async def ensure_json(raw_response: str) -> Dict[str, Any]:
@@ -12,32 +67,28 @@ async def ensure_json(raw_response: str) -> Dict[str, Any]:
     """
     # First, try to parse as-is
     try:
-        return json.loads(raw_response)
+        result = json.loads(raw_response)
+        if isinstance(result, dict):
+            REPAIR_OUTCOMES.inc(outcome="valid")
+            return coerce_response(result)
     except json.JSONDecodeError:
         pass
     
-    # Try to extract JSON from markdown code blocks
-    json_match = re.search(r'```(?:json)?\s*({.*?})\s*```', raw_response, re.DOTALL)
-    if json_match:
-        try:
-            return json.loads(json_match.group(1))
-        except json.JSONDecodeError:
-            pass
-    
-    # Try to find JSON-like content in the response
-    brace_start = raw_response.find('{')
-    brace_end = raw_response.rfind('}')
-    if brace_start != -1 and brace_end != -1 and brace_end > brace_start:
-        json_str = raw_response[brace_start:brace_end+1]
-        try:
-            return json.loads(json_str)
-        except json.JSONDecodeError:
-            pass
+    # Repair fences, trailing commas, bad strings and truncation in-process
+    try:
+        result = parse_locally(raw_response)
+        REPAIR_OUTCOMES.inc(outcome="local")
+        return coerce_response(result)
+    except ValueError:
+        pass
     
     # If all else fails, try to repair with an LLM
     try:
-        return await repair_with_llm(raw_response)
+        result = await repair_with_llm(raw_response)
+        REPAIR_OUTCOMES.inc(outcome="llm")
+        return coerce_response(result)
     except Exception:
+        REPAIR_OUTCOMES.inc(outcome="failed")
         # If repair fails, return a basic error structure
         return {
             "answer": "Error processing response",
@@ -49,6 +100,16 @@ async def ensure_json(raw_response: str) -> Dict[str, Any]:
         }
 
 
+def repair_stats() -> Dict[str, float]:
+    """
+    Counts per parse outcome and the share of responses that needed an LLM repair call.
+    """
+    counts = {labels["outcome"]: value for labels, value in REPAIR_OUTCOMES.samples()}
+    total = sum(counts.values())
+    counts["llm_rate"] = (counts.get("llm", 0.0) + counts.get("failed", 0.0)) / total if total else 0.0
+    return counts
+
+
 async def repair_with_llm(broken_json: str) -> Dict[str, Any]:
     """
     Use an LLM to repair broken JSON.
@@ -58,14 +119,14 @@ async def repair_with_llm(broken_json: str) -> Dict[str, Any]:
     
     # Try OpenRouter first, fallback to Ollama
     try:
-        provider = OpenRouterProvider()
+        provider = with_cache(schedule(registry.create("llm", "openrouter"), PRIORITY_INTERACTIVE), "repair")
         repaired = await provider.chat(system_prompt, user_prompt)
-        return json.loads(repaired)
+        return tolerant_loads(repaired)
     except Exception:
         try:
-            provider = OllamaProvider()
+            provider = with_cache(schedule(registry.create("llm", "ollama"), PRIORITY_INTERACTIVE), "repair")
             repaired = await provider.chat(system_prompt, user_prompt)
-            return json.loads(repaired)
+            return tolerant_loads(repaired)
         except Exception:
             # If both fail, re-raise the original exception
-            raise ValueError(f"Failed to repair JSON: {broken_json}")
\ No newline at end of file
+            raise ValueError(f"Failed to repair JSON: {broken_json}")
@@ -0,0 +1,41 @@
+import copy
+from functools import lru_cache
+from typing import Dict, Any
+from ..contracts import SearchResponse
+
+
+def _inline_refs(node: Any, defs: Dict[str, Any]) -> Any:
+    """
+    Replace {"$ref": "#/$defs/X"} with the referenced schema, recursively.
+    """
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if isinstance(ref, str) and ref.startswith("#/$defs/"):
+            return _inline_refs(copy.deepcopy(defs[ref.split("/")[-1]]), defs)
+        # Drop pydantic's "title" annotations (strings), not properties named title
+        return {
+            key: _inline_refs(value, defs) for key, value in node.items()
+            if not (key == "title" and isinstance(value, str))
+        }
+    if isinstance(node, list):
+        return [_inline_refs(item, defs) for item in node]
+    return node
+
+
+@lru_cache(maxsize=1)
+def synthesis_json_schema() -> Dict[str, Any]:
+    """
+    JSON Schema the synthesis model must produce, derived from SearchResponse.
+
+    References are inlined (not every backend resolves $defs) and
+    diagnostics is narrowed to the one field the model fills in, notes; the
+    rest of Diagnostics is set by the pipeline.
+    """
+    schema = SearchResponse.model_json_schema()
+    defs = schema.pop("$defs", {})
+    schema = _inline_refs(schema, defs)
+    schema["properties"]["diagnostics"] = {
+        "type": "object",
+        "properties": {"notes": {"type": "string"}},
+    }
+    return schema
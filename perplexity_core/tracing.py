@@ -0,0 +1,64 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from .metrics import histogram
+
+
+STAGE_SECONDS = histogram(
+    "pipeline_stage_seconds",
+    "Pipeline stage latency by stage and provider",
+    ("stage", "provider")
+)
+
+
+class Trace:
+    """
+    Spans recorded for one pipeline run, relative to when the trace started.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+
+    def add(self, name: str, start: float, end: float, attrs: Dict[str, Any]) -> None:
+        span: Dict[str, Any] = {
+            "name": name,
+            "startMs": round((start - self.start) * 1000, 2),
+            "durationMs": round((end - start) * 1000, 2),
+            "attrs": attrs or None,
+        }
+        self.spans.append(span)
+
+    def sorted_spans(self) -> List[Dict[str, Any]]:
+        """
+        Spans in start order (they are recorded in end order).
+        """
+        return sorted(self.spans, key=lambda span: span["startMs"])
+
+
+# Set by the pipeline per run; child tasks share the same Trace object
+current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time a block as a span of the current trace and in the stage histogram.
+
+    Yields the span's attribute dict so the block can add attributes (such
+    as result counts); a "provider" attribute also labels the histogram.
+    Spans that raise are marked with error=True.
+    """
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException:
+        attrs["error"] = True
+        raise
+    finally:
+        end = time.perf_counter()
+        STAGE_SECONDS.observe(end - start, stage=name, provider=str(attrs.get("provider", "")))
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add(name, start, end, attrs)
@@ -0,0 +1,66 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Tuple
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent work by key.
+
+    The first caller for a key claims it and must resolve it; callers that
+    arrive while it is in flight wait for that result instead of repeating
+    the work. Keys are forgotten once resolved, so finished results are left
+    to the caches.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def claim(self, keys: Iterable[str]) -> Tuple[List[str], Dict[str, asyncio.Future]]:
+        """
+        Split keys into those the caller now owns and futures for those already in flight.
+        """
+        loop = asyncio.get_running_loop()
+        owned: List[str] = []
+        waiting: Dict[str, asyncio.Future] = {}
+        for key in keys:
+            future = self._calls.get(key)
+            if future is None:
+                self._calls[key] = loop.create_future()
+                owned.append(key)
+            else:
+                waiting[key] = future
+        return owned, waiting
+
+    def resolve(self, key: str, value: Any) -> None:
+        """
+        Publish the owner's result (None on failure) to every waiter and forget the key.
+        """
+        future = self._calls.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(value)
+
+    async def wait(self, waiting: Dict[str, asyncio.Future]) -> Dict[str, Any]:
+        """
+        Results for keys in flight elsewhere.
+
+        Shielded, so a waiter that is cancelled does not cancel the result for the others.
+        """
+        values = await asyncio.gather(*(asyncio.shield(future) for future in waiting.values()))
+        return dict(zip(waiting, values))
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn for key unless it is already running, in which case wait for that run.
+        """
+        owned, waiting = self.claim([key])
+        if waiting:
+            return (await self.wait(waiting))[key]
+        value = None
+        try:
+            value = await fn()
+            return value
+        finally:
+            self.resolve(key, value)
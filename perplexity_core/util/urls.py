@@ -0,0 +1,141 @@
+import re
+from typing import List, Iterable, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote
+
+
+# Query parameters that only carry attribution/tracking data. Generic names
+# (cid, share, amp, outputtype, ...) are kept: some sites use them to select
+# content or format, and stripping them would merge different pages.
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "_hsenc", "_hsmi", "mkt_tok", "ref_src", "ref_url",
+    "cmpid", "sr_share", "__twitter_impression", "s_cid",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_", "vero_", "oly_")
+
+# Host prefixes that serve the same content as the bare domain
+HOST_ALIASES = ("www.", "m.", "mobile.", "amp.")
+
+_AMP_CACHE = re.compile(r'^[a-z0-9-]+\.cdn\.ampproject\.org$')
+_AMP_PATH = re.compile(r'(/amp/?|\.amp(?:\.html)?|/amp\.html)$', re.IGNORECASE)
+_SLASHES = re.compile(r'/{2,}')
+_ESCAPE = re.compile(r'%([0-9A-Fa-f]{2})')
+# RFC 3986 unreserved characters: percent-encoding them never changes the resource
+_UNRESERVED = set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+
+
+def _normalize_escape(match) -> str:
+    char = chr(int(match.group(1), 16))
+    return char if char in _UNRESERVED else "%" + match.group(1).upper()
+
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def _unwrap_amp_cache(parts):
+    """
+    Turn https://www-example-com.cdn.ampproject.org/c/s/www.example.com/a into https://www.example.com/a.
+    """
+    segments = parts.path.lstrip("/").split("/")
+    # /c/<url>, /v/<url>, /i/<url>, optionally followed by s/ for https
+    if len(segments) >= 2 and segments[0] in ("c", "v", "i"):
+        rest = segments[1:]
+        if rest and rest[0] == "s":
+            rest = rest[1:]
+        if rest:
+            return urlsplit("https://" + "/".join(rest) + (f"?{parts.query}" if parts.query else ""))
+    return parts
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a URL so that trivially different links to the same page compare equal.
+
+    Applies: https scheme, lowercase host without www./m./mobile./amp. aliases
+    or default port, AMP cache URLs unwrapped, trailing /amp and .amp path
+    suffixes removed, percent-escapes of unreserved characters decoded (and
+    other escapes uppercased), tracking parameters removed, remaining
+    parameters sorted, duplicate and trailing slashes removed, fragment
+    dropped. Non-http(s) URLs are returned stripped
+    but otherwise unchanged.
+    """
+    return canonicalize_with_domain(url)[0]
+
+
+def canonicalize_with_domain(url: str) -> Tuple[str, str]:
+    """
+    canonicalize_url and the URL's domain (lowercase host without www., as
+    ranker.get_domain returns it) from a single parse.
+
+    Work the URL does not need (query parsing, unquoting, slash collapsing)
+    is skipped, since ranking calls this for every search candidate.
+    """
+    url = (url or "").strip()
+    try:
+        parts = urlsplit(url)
+        hostname = parts.hostname
+    except ValueError:
+        return url, ""
+    domain = hostname or ""
+    if domain.startswith("www."):
+        domain = domain[4:]
+    if not hostname or parts.scheme.lower() not in ("http", "https"):
+        return url, domain
+
+    host = hostname.rstrip(".")
+    if _AMP_CACHE.match(host):
+        parts = _unwrap_amp_cache(parts)
+        if not parts.hostname:
+            return url, domain
+        host = parts.hostname.rstrip(".")
+
+    for alias in HOST_ALIASES:
+        if host.startswith(alias) and host.count(".") >= 2:
+            host = host[len(alias):]
+            break
+
+    netloc = host
+    if ":" in parts.netloc:
+        try:
+            port = parts.port
+        except ValueError:
+            return url, domain
+        if port not in (None, 80, 443):
+            netloc = f"{host}:{port}"
+
+    path = parts.path or "/"
+    if not path.isascii():
+        # Raw and percent-encoded UTF-8 spellings of the same path compare equal
+        path = quote(path, safe="/%:@!$&'()*+,;=~")
+    if "%" in path:
+        # Decode only unreserved characters; %2F and %3F name different resources than / and ?
+        path = _ESCAPE.sub(_normalize_escape, path)
+    if "//" in path:
+        path = _SLASHES.sub("/", path)
+    if "amp" in path.lower():
+        path = _AMP_PATH.sub("", path) or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = ""
+    if parts.query:
+        params = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k)]
+        query = urlencode(sorted(params))
+
+    return urlunsplit(("https", netloc, path if path != "/" else "", query, "")), domain
+
+
+def unique_urls(urls: Iterable[str]) -> List[str]:
+    """
+    Drop URLs whose canonical form was already seen, keeping the first occurrence.
+    """
+    seen = set()
+    unique = []
+    for url in urls:
+        key = canonicalize_url(url)
+        if key not in seen:
+            seen.add(key)
+            unique.append(url)
+    return unique
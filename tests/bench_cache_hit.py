@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Cache-hit throughput of /api/search before and after the pre-serialized fast path
+
+Calls the FastAPI app directly over ASGI (no sockets, no HTTP client) with
+the query cache replaced by an in-memory dict that always hits, so the
+numbers are the per-request cost of the app and pipeline themselves:
+
+- model path: pipeline.run() builds a SearchResponse from the cached JSON
+  and FastAPI serializes it through response_model (the previous handler)
+- fast path: pipeline.run_json() patches the cached JSON's diagnostics and
+  the handler returns the bytes as they are, with orjson and with the
+  standard library fallback
+
+Usage: python tests/bench_cache_hit.py [--requests 5000] [--sources 6]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FIRECRAWL_API_KEY", "bench")
+os.environ.setdefault("DOCSTORE_ENABLED", "false")
+os.environ.setdefault("VECTOR_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from apps.api import main as api
+from perplexity_core.contracts import SearchRequest, SearchResponse
+from perplexity_core.util import fastjson
+
+
+class MemoryCache:
+    """
+    Query cache stand-in that answers every lookup with the same cached response
+    """
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    async def get(self, key):
+        return self.payload
+
+
+def cached_payload(sources):
+    """
+    A cached answer shaped like a real one: long answer, bullets and sources with snippets
+    """
+    response = SearchResponse(
+        answer="Artemis II is scheduled to launch no earlier than April 2026. " * 12,
+        bullets=[f"Key point {i}: the crew of four will fly around the Moon and return." for i in range(5)],
+        sources=[{
+            "title": f"Artemis II mission overview {i}",
+            "url": f"https://www.example{i}.com/artemis-ii/overview",
+            "published": "2026-01-15T00:00:00Z",
+            "snippet": "NASA's Artemis II mission will send four astronauts around the Moon. " * 4,
+            "relevance": 0.9 - i / 20,
+        } for i in range(sources)],
+        diagnostics={"searchProvider": "brave", "llm": "openrouter/model", "latencyMs": 8123, "cached": False}
+    )
+    return response.model_dump_json(exclude={"diagnostics": {"spans"}})
+
+
+@api.app.post("/bench/model", response_model=SearchResponse)
+async def search_model(req: SearchRequest):
+    async with api.admission.slot():
+        return await api.pipeline.run(req)
+
+
+async def call(path, body):
+    """
+    One POST through the ASGI app; returns the status code
+    """
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    received = False
+    status = 0
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await api.app(scope, receive, send)
+    return status
+
+
+async def throughput(path, body, requests):
+    """
+    Requests per second over sequential calls
+    """
+    for _ in range(min(200, requests)):
+        await call(path, body)
+    start = time.perf_counter()
+    for _ in range(requests):
+        status = await call(path, body)
+        assert status == 200, status
+    return requests / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--sources", type=int, default=6)
+    args = parser.parse_args()
+
+    payload = cached_payload(args.sources)
+    api.pipeline.cache = MemoryCache(payload)
+    body = json.dumps({"query": "When does Artemis II launch?"}).encode()
+    print(f"cached response: {len(payload)} bytes")
+
+    rows = [("model path (before)", await throughput("/bench/model", body, args.requests))]
+    orjson = fastjson.orjson
+    if orjson is not None:
+        rows.append(("fast path, orjson", await throughput("/api/search", body, args.requests)))
+    fastjson.orjson = None
+    rows.append(("fast path, stdlib json", await throughput("/api/search", body, args.requests)))
+    fastjson.orjson = orjson
+
+    print(f"{'mode':<24} {'req/s':>8} {'us/req':>8}")
+    for name, rate in rows:
+        print(f"{name:<24} {rate:8.0f} {1e6 / rate:8.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency of the sequential runner against the dataflow executor
+
+Runs the real Pipeline with its network calls replaced by simulated
+latencies: web search, query normalization, per-URL Firecrawl extraction
+(log-normal, so a few pages are slow) and synthesis. The query cache is an
+in-memory dict so every run is a miss. Reports p50/p95 milliseconds per
+request for each executor and normalization mode.
+
+Usage: python tests/bench_dataflow.py [--requests 20] [--search-ms 400] [--normalize-ms 600]
+       [--extract-ms 700] [--synth-ms 1500] [--results 8] [--overlap 0.75]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FIRECRAWL_API_KEY", "bench")
+os.environ.setdefault("DOCSTORE_ENABLED", "false")
+os.environ.setdefault("VECTOR_ENABLED", "false")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+
+from perplexity_core.config import settings
+from perplexity_core.contracts import SearchRequest, SearchResult
+from perplexity_core.pipeline.runner import Pipeline
+
+QUERY = "When does Artemis II launch and who is on the crew?"
+
+
+class MemoryCache:
+    """
+    Dict-backed stand-in for the Redis cache
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value, ttl=3600):
+        return True
+
+    async def set_stale(self, key, value, ttl=86400):
+        return True
+
+    async def get_url_content(self, key):
+        return None
+
+    async def set_url_content(self, key, content, ttl=604800):
+        self.data[key] = content
+        return True
+
+
+def simulated_pipeline(args, rng):
+    """
+    A Pipeline whose search, LLM and extraction calls sleep instead of going to the network
+    """
+    pipeline = Pipeline()
+    pipeline.cache = MemoryCache()
+
+    def jitter(ms):
+        return rng.lognormvariate(0, 0.5) * ms / 1000
+
+    async def search(query, req):
+        await asyncio.sleep(jitter(args.search_ms))
+        # The normalized query finds mostly the same pages, ranked a little differently
+        if query != req.query:
+            shared = int(args.results * args.overlap)
+            pages = list(range(1, shared + 1)) + list(range(100, 100 + args.results - shared))
+        else:
+            pages = list(range(args.results))
+        return [SearchResult(url=f"https://site{page}.example/artemis", title=f"Artemis II crew {page}",
+                             snippet="Artemis II launch date crew moon Orion " * 3, score=1 - rank / 20)
+                for rank, page in enumerate(pages)]
+
+    async def normalize(req):
+        await asyncio.sleep(jitter(args.normalize_ms))
+        return "Artemis II launch date crew members"
+
+    async def extract(url):
+        await asyncio.sleep(jitter(args.extract_ms))
+        return {"url": url, "title": "Artemis", "markdown": f"Article {url} " + "words " * 300, "text": ""}
+
+    async def synthesize(payload, force_local=False, emit=None):
+        await asyncio.sleep(jitter(args.synth_ms))
+        return '{"answer": "Artemis II", "bullets": [], "sources": []}'
+
+    pipeline._search = search
+    pipeline._maybe_normalize = normalize
+    pipeline.firecrawl.extract = extract
+    pipeline._synthesize = synthesize
+    return pipeline
+
+
+async def measure(args, executor, mode):
+    """
+    Latency percentiles in milliseconds over args.requests sequential requests
+    """
+    settings.PIPELINE_EXECUTOR = executor
+    settings.NORMALIZE_MODE = mode
+    rng = random.Random(7)
+    pipeline = simulated_pipeline(args, rng)
+    latencies = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        await pipeline.run(SearchRequest(query=QUERY, maxResults=args.results))
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95) - 1]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--search-ms", type=float, default=400)
+    parser.add_argument("--normalize-ms", type=float, default=600)
+    parser.add_argument("--extract-ms", type=float, default=700)
+    parser.add_argument("--synth-ms", type=float, default=1500)
+    parser.add_argument("--results", type=int, default=8)
+    parser.add_argument("--overlap", type=float, default=0.75, help="share of pages both queries find")
+    args = parser.parse_args()
+
+    settings.NORMALIZE_CLASSIFIER = False
+    settings.EXTRACT_PRESELECT = False
+    print(f"{'normalize':<12} {'executor':<12} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode in ("speculative", "blocking", "off"):
+        for executor in ("sequential", "dataflow"):
+            p50, p95 = await measure(args, executor, mode)
+            print(f"{mode:<12} {executor:<12} {p50:8.0f} {p95:8.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
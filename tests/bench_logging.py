@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of per-request logging overhead on the calling (event loop) thread
+
+Replays the log calls the pipeline makes for one request (about 40 stage
+messages plus 3 per URL) and reports microseconds per request for the old
+print() output, synchronous logging, and the queued logging from
+perplexity_core.log at INFO and DEBUG. Output goes to os.devnull, so the
+numbers are the cost of the calls themselves, not of the terminal.
+
+Usage: python tests/bench_logging.py [--requests 2000] [--urls 6]
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from perplexity_core.log import SAMPLED, request_id, new_request_id, setup_logging, shutdown_logging
+
+STAGE_MESSAGES = 40
+
+
+def request_with_print(query, urls):
+    """
+    The pre-logging pipeline: every message is an f-string printed to stdout
+    """
+    print(f"Starting pipeline for query: {query}")
+    for i in range(STAGE_MESSAGES):
+        print(f"Step {i}: working on {query} with {len(urls)} URLs")
+    for url in urls:
+        print(f"Cache miss for URL: {url}")
+        print(f"Document store hit for URL: {url}")
+        print(f"Cached content for URL: {url}")
+    print("Pipeline completed successfully")
+
+
+def request_with_logging(logger, query, urls):
+    """
+    The same messages through a logger, with lazy arguments and sampled per-URL records
+    """
+    request_id.set(new_request_id())
+    logger.info("Starting pipeline for query: %s", query)
+    for i in range(STAGE_MESSAGES):
+        logger.debug("Step %d: working on %s with %d URLs", i, query, len(urls))
+    for url in urls:
+        logger.debug("Cache miss for URL: %s", url, extra=SAMPLED)
+        logger.debug("Document store hit for URL: %s", url, extra=SAMPLED)
+        logger.debug("Cached content for URL: %s", url, extra=SAMPLED)
+    logger.info("Pipeline completed successfully", extra={"latency_ms": 1234, "cached": False})
+
+
+def timed(fn, requests):
+    """
+    Mean microseconds per request
+    """
+    start = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--urls", type=int, default=6)
+    args = parser.parse_args()
+
+    query = "When does Artemis II launch?"
+    urls = [f"https://example{i}.com/artemis/{i}" for i in range(args.urls)]
+    logger = logging.getLogger("perplexity_core.bench")
+    devnull = open(os.devnull, "w")
+
+    rows = []
+    with contextlib.redirect_stdout(devnull):
+        rows.append(("print (before)", timed(lambda: request_with_print(query, urls), args.requests)))
+
+    # Synchronous handler on the calling thread, for comparison
+    sync = logging.StreamHandler(devnull)
+    sync.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    core = logging.getLogger("perplexity_core")
+    core.handlers, core.propagate = [sync], False
+    core.setLevel("DEBUG")
+    rows.append(("logging, sync, DEBUG", timed(lambda: request_with_logging(logger, query, urls), args.requests)))
+
+    for level in ("INFO", "DEBUG"):
+        for fmt in ("text", "json"):
+            setup_logging(level=level, fmt=fmt, stream=devnull)
+            us = timed(lambda: request_with_logging(logger, query, urls), args.requests)
+            # Include the writer thread catching up, which happens off the event loop
+            start = time.perf_counter()
+            shutdown_logging()
+            drain = (time.perf_counter() - start) * 1e6 / args.requests
+            rows.append((f"queued, {level}, {fmt}", us, drain))
+
+    print(f"{'mode':<24} {'caller us/request':>18} {'writer us/request':>18}")
+    for row in rows:
+        writer = f"{row[2]:18.1f}" if len(row) > 2 else f"{'-':>18}"
+        print(f"{row[0]:<24} {row[1]:18.1f} {writer}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of rank() against the vectorized rank_batch()
+
+Usage: python tests/bench_rank.py [--sizes 6,50,200,1000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from perplexity_core.contracts import SearchResult
+from perplexity_core.rank.ranker import rank
+from perplexity_core.rank.batch import rank_batch
+
+DOMAINS = ["nasa.gov", "www.esa.int", "en.wikipedia.org", "space.com", "reddit.com",
+           "www.bbc.co.uk", "arstechnica.com", "spacenews.com"]
+
+
+def make_results(n, rng):
+    """
+    Build n synthetic multi-provider candidates with duplicates and dates
+    """
+    now = datetime.now(timezone.utc)
+    results = []
+    for i in range(n):
+        domain = rng.choice(DOMAINS)
+        published = None
+        if rng.random() < 0.6:
+            published = (now - timedelta(days=rng.randint(0, 500))).isoformat().replace("+00:00", "Z")
+        results.append(SearchResult(
+            url=f"https://{domain}/news/{rng.randint(0, n)}",
+            title=f"Artemis mission update {i}",
+            snippet="NASA Artemis II crew moon flyby Orion SLS launch schedule " * 2,
+            score=rng.random(),
+            published=published,
+        ))
+    return results
+
+
+def timed(fn, batches):
+    """
+    Mean milliseconds per call over pre-built input batches
+    """
+    start = time.perf_counter()
+    for batch in batches:
+        fn(batch)
+    return (time.perf_counter() - start) * 1000 / len(batches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="6,50,200,1000")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    include, exclude = ["nasa.gov"], ["reddit.com"]
+    for n in (int(s) for s in args.sizes.split(",")):
+        template = make_results(n, rng)
+        # rank() mutates scores, so every call gets its own copies
+        batches = [[r.model_copy() for r in template] for _ in range(args.repeat)]
+        rank_batch(template, include, exclude, 6)  # warm up lazy state
+
+        legacy = timed(lambda b: rank(b, include, exclude, 6), batches)
+        batched = timed(lambda b: rank_batch(b, include, exclude, 6), batches)
+        lexical = timed(lambda b: rank_batch(b, include, exclude, 6, query="artemis crew launch"), batches)
+        print(f"{n:>5} candidates | rank {legacy:7.3f} ms | rank_batch {batched:7.3f} ms "
+              f"({legacy / batched:4.1f}x) | rank_batch+query {lexical:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of Pipeline.run against recorded provider responses
+
+record: runs each query through the real pipeline over the network and
+writes every provider response (Brave, Tavily, SearchAPI, Firecrawl,
+OpenRouter, Ollama, plain page fetches) to a cassette, with credentials
+stripped. Needs the provider keys in .env.
+
+replay: runs the cassette's requests through Pipeline.run with no network,
+answering HTTP calls from the cassette after the recorded latency (scaled)
+or an injected one, and optionally injecting errors. Reports p50/p95/p99
+per stage (from traced spans), throughput and memory, and how many calls
+matched a recording.
+
+Both modes bypass the answer, URL and LLM caches and the document store,
+so every request does the full work.
+
+Usage: python tests/bench_replay.py record QUERIES [--cassette PATH] [--local]
+       python tests/bench_replay.py replay [--cassette PATH] [--requests 30] [--concurrency 4]
+              [--latency-scale 1.0] [--latency brave=400:0.5,firecrawl=900:0.6]
+              [--errors firecrawl=0.1:timeout,openrouter=0.05:429] [--executor sequential] [--seed 7] [--tracemalloc]
+
+QUERIES has one query or SearchRequest JSON object per line, as for `perplexity batch`.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from perplexity_core import http_client
+from perplexity_core.config import settings
+from perplexity_core.contracts import SearchRequest
+from perplexity_core.log import setup_logging
+from perplexity_core.pipeline.runner import Pipeline
+from perplexity_core.replay import (RECORDED_SETTINGS, Cassette, RecordingTransport, ReplayTransport, apply_settings,
+                                   parse_specs)
+
+DEFAULT_CASSETTE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "replay", "sample.json")
+
+class NullCache:
+    """
+    Cache that never hits, so every request runs the whole pipeline
+    """
+
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value, ttl=3600):
+        return True
+
+    async def get_stale(self, key):
+        return None
+
+    async def set_stale(self, key, value, ttl=86400):
+        return True
+
+    async def get_url_content(self, key):
+        return None
+
+    async def set_url_content(self, key, content, ttl=604800):
+        return True
+
+
+def offline_pipeline():
+    """
+    A Pipeline with caches, the document store, the passage index files and query history off
+    """
+    settings.LLM_CACHE_ENABLED = False
+    settings.DOCSTORE_ENABLED = False
+    settings.VECTOR_INDEX_PATH = ""
+    settings.RECORDS_ENABLED = False
+    pipeline = Pipeline()
+    pipeline.cache = NullCache()
+    return pipeline
+
+
+def read_queries(path, force_local):
+    requests = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("{"):
+                requests.append(SearchRequest.model_validate_json(line))
+            elif line:
+                requests.append(SearchRequest(query=line, forceLocal=force_local))
+    return requests
+
+
+async def record(args):
+    requests = read_queries(args.queries, args.local)
+    cassette = Cassette(meta={
+        "recordedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "settings": {name: getattr(settings, name) for name in RECORDED_SETTINGS},
+    })
+    transport = RecordingTransport(cassette)
+    http_client.set_transport(transport)
+    pipeline = offline_pipeline()
+    try:
+        for req in requests:
+            start = time.perf_counter()
+            try:
+                await pipeline.run(req)
+                cassette.requests.append(req.model_dump(mode="json"))
+                print(f"recorded {req.query!r} in {time.perf_counter() - start:.1f}s")
+            except Exception as e:
+                print(f"failed {req.query!r}: {e}", file=sys.stderr)
+    finally:
+        http_client.set_transport(None)
+        await transport.close()
+    os.makedirs(os.path.dirname(os.path.abspath(args.cassette)), exist_ok=True)
+    cassette.save(args.cassette)
+    print(f"{len(cassette.interactions)} responses for {len(cassette.requests)} requests written to {args.cassette}")
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+
+def rss_mb():
+    if resource is None:
+        return float("nan")
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+async def replay(args):
+    cassette = Cassette.load(args.cassette)
+    if not cassette.requests:
+        sys.exit(f"{args.cassette} has no recorded requests")
+    apply_settings(cassette)
+    if args.executor:
+        settings.PIPELINE_EXECUTOR = args.executor
+
+    transport = ReplayTransport(cassette, latency=parse_specs(args.latency), errors=parse_specs(args.errors),
+                                latency_scale=args.latency_scale, seed=args.seed)
+    http_client.set_transport(transport)
+    pipeline = offline_pipeline()
+    requests = [SearchRequest.model_validate(cassette.requests[i % len(cassette.requests)]).model_copy(
+        update={"trace": True}) for i in range(args.requests)]
+
+    stages = defaultdict(list)
+    totals = []
+    failures = 0
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def one(req):
+        nonlocal failures
+        async with slots:
+            start = time.perf_counter()
+            try:
+                response = await pipeline.run(req)
+            except Exception as e:
+                failures += 1
+                print(f"failed {req.query!r}: {e}", file=sys.stderr)
+                return
+            totals.append((time.perf_counter() - start) * 1000)
+            for span in response.diagnostics.spans or []:
+                stages[span.name].append(span.durationMs)
+
+    rss_before = rss_mb()
+    if args.tracemalloc:
+        tracemalloc.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(req) for req in requests))
+    wall = time.perf_counter() - start
+    traced_peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024 if args.tracemalloc else None
+    http_client.set_transport(None)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {settings.PIPELINE_EXECUTOR} executor: "
+          f"{wall:.2f}s, {len(totals) / wall:.2f} req/s, {failures} failed")
+    print(f"{'stage':<16} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = [("total", totals)] + sorted(stages.items(), key=lambda item: -percentile(item[1], 50))
+    for name, values in rows:
+        if values:
+            print(f"{name:<16} {len(values):>6} {percentile(values, 50):9.1f} "
+                  f"{percentile(values, 95):9.1f} {percentile(values, 99):9.1f}")
+    memory = f"peak RSS {rss_mb():.0f} MB (+{rss_mb() - rss_before:.0f} MB during replay)"
+    if traced_peak is not None:
+        memory += f", Python allocations peak {traced_peak:.1f} MB"
+    print(f"memory: {memory}")
+    print(f"{'provider':<12} {'calls':>6} {'loose':>6} {'misses':>7} {'injected':>9}")
+    for provider, counts in transport.stats().items():
+        print(f"{provider:<12} {counts['calls']:>6} {counts['loose']:>6} {counts['misses']:>7} {counts['injected']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    modes = parser.add_subparsers(dest="mode", required=True)
+
+    rec = modes.add_parser("record", help="record provider responses for a list of queries")
+    rec.add_argument("queries")
+    rec.add_argument("--cassette", default=DEFAULT_CASSETTE)
+    rec.add_argument("--local", action="store_true", help="use Ollama for plain-text queries")
+
+    rep = modes.add_parser("replay", help="benchmark the pipeline against a cassette")
+    rep.add_argument("--cassette", default=DEFAULT_CASSETTE)
+    rep.add_argument("--requests", type=int, default=30)
+    rep.add_argument("--concurrency", type=int, default=4)
+    rep.add_argument("--latency-scale", type=float, default=1.0, help="multiplier on recorded latencies (0: none)")
+    rep.add_argument("--latency", help="provider=median_ms[:sigma],... log-normal latency instead of the recorded one")
+    rep.add_argument("--errors", help="provider=rate[:status|timeout],... injected failures")
+    rep.add_argument("--executor", choices=("sequential", "dataflow"))
+    rep.add_argument("--seed", type=int, default=7)
+    rep.add_argument("--tracemalloc", action="store_true", help="also trace Python allocations (slower)")
+    args = parser.parse_args()
+
+    setup_logging()
+    asyncio.run(record(args) if args.mode == "record" else replay(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Cost of the safety guard as the rule lexicon grows
+
+Compares the compiled RuleSet (one trie-shaped regex, one pass) with the
+previous approach of one substring scan per term, for synthetic lexicons
+of pseudo-words (a quarter of them prefix patterns) applied to answers of
+about 250 words. Reports compile time and microseconds per answer.
+
+Usage: python tests/bench_safety.py [--sizes 10,100,1000,5000] [--patterns 5] [--answers 200]
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from perplexity_core.safety.rules import RuleSet
+
+COMMON = ("the", "a", "of", "and", "to", "in", "is", "for", "on", "that", "with", "as", "by", "launch",
+          "system", "energy", "crew", "mission", "heat", "pump", "network", "protocol", "model", "data")
+
+
+def word(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10)))
+
+
+def make_lexicon(rules, patterns, rng):
+    return {
+        "version": "bench",
+        "disclaimer": "Note: This is not professional advice.",
+        "rules": [
+            {"id": f"rule{i}", "patterns": [word(rng) + ("*" if rng.random() < 0.25 else "") for _ in range(patterns)]}
+            for i in range(rules)
+        ],
+    }
+
+
+def make_answers(lexicon, count, rng):
+    terms = [p.rstrip("*") for rule in lexicon["rules"] for p in rule["patterns"]]
+    answers = []
+    for _ in range(count):
+        words = [rng.choice(COMMON) if rng.random() < 0.9 else word(rng) for _ in range(250)]
+        # Some answers mention a lexicon term
+        if rng.random() < 0.3:
+            words[rng.randrange(len(words))] = rng.choice(terms).capitalize()
+        answers.append(" ".join(words) + ".")
+    return answers
+
+
+def substring_scan(terms, text):
+    lowered = text.lower()
+    return [term for term in terms if term in lowered]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10,100,1000,5000")
+    parser.add_argument("--patterns", type=int, default=5, help="patterns per rule")
+    parser.add_argument("--answers", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    print(f"{'rules':>6} {'patterns':>9} {'compile ms':>11} {'regex us':>9} {'substring us':>13} {'matched':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        lexicon = make_lexicon(size, args.patterns, rng)
+        answers = make_answers(lexicon, args.answers, rng)
+        terms = [p.rstrip("*") for rule in lexicon["rules"] for p in rule["patterns"]]
+
+        start = time.perf_counter()
+        rules = RuleSet.from_dict(lexicon)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        matched = sum(bool(rules.match(answer)) for answer in answers)
+        regex_us = (time.perf_counter() - start) / len(answers) * 1e6
+
+        start = time.perf_counter()
+        for answer in answers:
+            substring_scan(terms, answer)
+        substring_us = (time.perf_counter() - start) / len(answers) * 1e6
+
+        print(f"{size:>6} {rules.pattern_count:>9} {compile_ms:>11.1f} {regex_us:>9.1f} {substring_us:>13.1f} "
+              f"{matched:>8}")
+
+
+if __name__ == "__main__":
+    main()
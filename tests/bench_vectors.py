@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark the passage vector index at 10k, 100k and 1M passages
+
+--dim defaults to VECTOR_DIM's default (512). --mmap backs each index with a
+memory-mapped file in a temporary directory instead of an in-memory matrix.
+
+Usage: python tests/bench_vectors.py [--sizes 10000,100000,1000000] [--dim 512] [--k 10] [--batch 32] [--mmap]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from perplexity_core.rank.vectors import HashingEmbedder, VectorIndex
+
+
+def random_unit_vectors(rng, rows, dim):
+    """
+    Random L2-normalized float32 vectors
+    """
+    vectors = rng.standard_normal((rows, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def bench_embedder(dim):
+    """
+    Measure hashed-feature embedding throughput on passage-sized text
+    """
+    embedder = HashingEmbedder(dim)
+    passage = ("The Artemis II mission will send four astronauts around the Moon "
+               "aboard the Orion spacecraft launched by the Space Launch System. ") * 6
+    texts = [passage] * 2000
+    start = time.perf_counter()
+    embedder.embed(texts)
+    elapsed = time.perf_counter() - start
+    print(f"embed: {len(texts) / elapsed:,.0f} passages/s (dim={dim})")
+
+
+def bench_index(size, dim, k, batch, mmap_dir=None):
+    """
+    Measure insert throughput and top-k latency for one index size
+    """
+    rng = np.random.default_rng(42)
+    path = os.path.join(mmap_dir, f"bench-{size}") if mmap_dir else None
+    index = VectorIndex(dim, path=path)
+
+    start = time.perf_counter()
+    chunk = 10000
+    for offset in range(0, size, chunk):
+        rows = min(chunk, size - offset)
+        keys = np.arange(offset, offset + rows).astype([("key", np.int64)])
+        index.add(random_unit_vectors(rng, rows, dim), keys)
+    insert_s = time.perf_counter() - start
+
+    queries = random_unit_vectors(rng, batch, dim)
+    index.search(queries[:1], k)  # warm up
+
+    start = time.perf_counter()
+    for query in queries:
+        index.search(query, k)
+    single_ms = (time.perf_counter() - start) * 1000 / batch
+
+    start = time.perf_counter()
+    index.search(queries, k)
+    batched_ms = (time.perf_counter() - start) * 1000 / batch
+
+    print(f"{size:>9,} passages | insert {size / insert_s:>10,.0f}/s | "
+          f"top-{k} single {single_ms:8.2f} ms/query | batched({batch}) {batched_ms:8.2f} ms/query | "
+          f"matrix {size * dim * 4 / 2**20:,.0f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--mmap", action="store_true", help="Back the index with a memory-mapped file")
+    args = parser.parse_args()
+
+    bench_embedder(args.dim)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(s) for s in args.sizes.split(",")):
+            bench_index(size, args.dim, args.k, args.batch, tmp if args.mmap else None)
+
+
+if __name__ == "__main__":
+    main()
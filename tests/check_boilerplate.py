@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Check the cross-page boilerplate filter
+
+- Blocks shared by many distinct pages of a domain (nav, cookie banner) are stripped
+- Extracting the same URL many times (URL cache expiry, warmer refresh,
+  concurrent misses) never strips that page's own body
+- Tracking-parameter variants of a URL count as the same page
+
+Exits 1 on any failure.
+
+Usage: python tests/check_boilerplate.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from perplexity_core.extract.boilerplate import BoilerplateFilter
+
+NAV = "Home | News | Sport | Weather"
+COOKIES = "We use cookies to improve your experience."
+
+
+def page(n):
+    return "\n".join([NAV, COOKIES, f"Paragraph one of article {n}.", f"Paragraph two of article {n}."])
+
+
+def main():
+    failures = []
+    bp = BoilerplateFilter(window=50, min_pages=3, min_ratio=0.3, max_domains=10)
+
+    # The same popular page fetched 20 times, then once more
+    for _ in range(20):
+        bp.strip("https://news.example.com/popular", page("popular"))
+    text = bp.strip("https://news.example.com/popular", page("popular"))
+    if "Paragraph one of article popular." not in text:
+        failures.append(f"re-fetched page lost its body: {text!r}")
+
+    # Tracking-parameter and www. variants are the same page
+    for variant in ("?utm_source=x", "?fbclid=1", "?utm_medium=y"):
+        bp.strip("https://www.news.example.com/popular" + variant, page("popular"))
+    text = bp.strip("https://news.example.com/popular", page("popular"))
+    if "Paragraph two of article popular." not in text:
+        failures.append(f"URL variants stripped the body: {text!r}")
+
+    # Distinct pages share only the nav and cookie banner
+    for n in range(5):
+        text = bp.strip(f"https://news.example.com/a{n}", page(n))
+    if NAV in text or COOKIES in text:
+        failures.append(f"boilerplate kept after 5 distinct pages: {text!r}")
+    if "Paragraph one of article 4." not in text:
+        failures.append(f"article body stripped: {text!r}")
+
+    window = bp._domains["news.example.com"]
+    if len(window.pages) != 6:
+        failures.append(f"window holds {len(window.pages)} pages, expected 6 distinct")
+
+    for failure in failures:
+        print("FAIL", failure)
+    if failures:
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Import-time profile of the pipeline, CLI and API entry points
+
+Imports each entry point in a fresh interpreter with `python -X importtime`
+and reports its total import time and the slowest modules it pulled in. It
+fails (exit 1) if an entry point imports a module that should only load when
+a request needs it (redis, BeautifulSoup, numpy, the search, extract and LLM
+provider modules), or if a total exceeds --budget-ms. Also times
+`python -m apps.cli --help` end to end.
+
+Usage: python tests/check_import_time.py [--budget-ms 0] [--top 8] [--runs 3]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = ["perplexity_core.pipeline.runner", "apps.cli.__main__", "apps.api.main"]
+
+# Loaded on first use through perplexity_core.registry or lazy_module()
+DEFERRED = [
+    "redis",
+    "bs4",
+    "numpy",
+    "psycopg",
+    "perplexity_core.cache.redis_cache",
+    "perplexity_core.search.brave",
+    "perplexity_core.search.tavily",
+    "perplexity_core.search.searchapi",
+    "perplexity_core.extract.firecrawl",
+    "perplexity_core.extract.readability",
+    "perplexity_core.llm.openrouter",
+]
+
+
+def profile(module):
+    """
+    Cumulative import microseconds per module, in import order, from one fresh interpreter
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def wall_ms(command, runs):
+    """
+    Fastest wall-clock milliseconds of a command over several runs
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, env=env, capture_output=True, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-ms", type=float, default=0, help="fail if an entry point takes longer (0: no budget)")
+    parser.add_argument("--top", type=int, default=8, help="slowest project and third-party modules to list")
+    parser.add_argument("--runs", type=int, default=3, help="take the fastest of this many runs")
+    args = parser.parse_args()
+
+    failures = []
+    for entry in ENTRY_POINTS:
+        runs = [profile(entry) for _ in range(args.runs)]
+        modules = min(runs, key=lambda m: m.get(entry, 0))
+        total_ms = modules[entry] / 1000
+        print(f"{entry}: {total_ms:.0f} ms")
+        # Top-level packages only, so a package is not listed again for each submodule
+        packages = {}
+        for name, us in modules.items():
+            top = name.split(".")[0] if not name.startswith(("perplexity_core", "apps")) else name
+            if name != entry and us > packages.get(top, 0):
+                packages[top] = us
+        for name, us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {us / 1000:8.1f} ms  {name}")
+
+        loaded = [name for name in DEFERRED if name in modules]
+        if loaded:
+            failures.append(f"{entry} imports {', '.join(loaded)} at import time")
+        if args.budget_ms and total_ms > args.budget_ms:
+            failures.append(f"{entry} takes {total_ms:.0f} ms to import (budget {args.budget_ms:.0f} ms)")
+
+    cli = wall_ms([sys.executable, "-m", "apps.cli", "--help"], args.runs)
+    bare = wall_ms([sys.executable, "-c", "pass"], args.runs)
+    print(f"python -m apps.cli --help: {cli:.0f} ms wall ({bare:.0f} ms bare interpreter)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
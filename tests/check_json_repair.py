@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Check local JSON repair and the incremental parser against known LLM defects
+
+Each case is malformed or truncated synthesis output and the object that
+repair_json / tolerant_loads should recover from it. The streamed case feeds
+the same text to IncrementalJSONParser one character at a time and compares
+the completed top-level fields, and again with close() at the end, which
+must recover the same object as repair. Exits 1 on any mismatch.
+
+Usage: python tests/check_json_repair.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from perplexity_core.synth.jsonstream import IncrementalJSONParser, tolerant_loads
+
+CASES = [
+    (
+        "literal followed by a key",
+        '{"answer": "x", "ok": true}',
+        {"answer": "x", "ok": True},
+    ),
+    (
+        "literals, numbers and trailing commas",
+        '{"answer":"x","sources":[{"title":"t","url":"u","published":null,"snippet":"s"},],'
+        '"bullets":["a","b"],"confidence":0.75,"final":false,}',
+        {"answer": "x", "sources": [{"title": "t", "url": "u", "published": None, "snippet": "s"}],
+         "bullets": ["a", "b"], "confidence": 0.75, "final": False},
+    ),
+    (
+        "prose and code fence around the object",
+        'Here you go:\n```json\n{"answer": "x", "count": -12, "ok": false}\n```',
+        {"answer": "x", "count": -12, "ok": False},
+    ),
+    (
+        "raw newline inside a string",
+        '{"answer": "line one\nline two", "bullets": []}',
+        {"answer": "line one\nline two", "bullets": []},
+    ),
+    (
+        "truncated inside a string",
+        '{"answer": "x", "bullets": ["a", "b", "unfini',
+        {"answer": "x", "bullets": ["a", "b", "unfini"]},
+    ),
+    (
+        "truncated after a literal",
+        '{"answer": "x", "published": null',
+        {"answer": "x", "published": None},
+    ),
+    (
+        "truncated inside a literal",
+        '{"answer": "x", "ok": tr',
+        {"answer": "x"},
+    ),
+    (
+        "dangling key",
+        '{"answer": "x", "sources": [{"title": "t"}], "bull',
+        {"answer": "x", "sources": [{"title": "t"}]},
+    ),
+]
+
+
+def streamed(text, close=False):
+    parser = IncrementalJSONParser()
+    items = {}
+    events = []
+    for ch in text:
+        events.extend(parser.feed(ch))
+    if close:
+        events.extend(parser.close())
+    for kind, name, value in events:
+        if kind == "item":
+            items.setdefault(name, []).append(value)
+    # Every array element is reported exactly once, feed or close
+    for name, value in parser.fields.items():
+        if isinstance(value, list) and items.get(name, []) != value:
+            return f"items {items.get(name)!r} for {name}"
+    return parser.fields
+
+
+def main():
+    failures = 0
+    for name, text, expected in CASES:
+        try:
+            got = tolerant_loads(text)
+        except ValueError as e:
+            got = f"ValueError: {e}"
+        if got != expected:
+            failures += 1
+            print(f"FAIL repair   {name}: got {got!r}, expected {expected!r}")
+        else:
+            print(f"ok   repair   {name}")
+
+    # Only complete input: the parser reports fields as they finish, not repaired ones
+    for name, text, expected in CASES[:3]:
+        got = streamed(text)
+        if got != expected:
+            failures += 1
+            print(f"FAIL streamed {name}: got {got!r}, expected {expected!r}")
+        else:
+            print(f"ok   streamed {name}")
+
+    # At end of stream close() completes whatever repair recovers
+    for name, text, expected in CASES:
+        got = streamed(text, close=True)
+        if got != expected:
+            failures += 1
+            print(f"FAIL closed   {name}: got {got!r}, expected {expected!r}")
+        else:
+            print(f"ok   closed   {name}")
+
+    if failures:
+        print(f"{failures} failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
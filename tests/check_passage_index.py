@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Check that the passage index keeps compact rows and rebuilds passages on demand
+
+Documents are stored in a temporary DocumentStore and indexed into a
+temporary PassageIndex. related() must return the same passage text before
+and after reopening the index from disk. A document whose stored text has
+changed, or a document with no text source, must come back with passage
+None. An index in the old per-row JSON format must be discarded. Exits 1 on
+any failure.
+
+Usage: python tests/check_passage_index.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from perplexity_core.rank.vectors import PassageIndex, chunk_passages, np
+from perplexity_core.store.docstore import DocumentStore
+
+
+def main():
+    failures = []
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "passages")
+    store = DocumentStore(os.path.join(tmp, "docs.db"))
+    docs = [
+        {"url": f"https://example.com/{i}", "title": f"Doc {i}",
+         "text": " ".join(f"w{i}_{j}" for j in range(300)) + " artemis launch window"}
+        for i in range(3)
+    ]
+    store._put_many(docs)
+
+    index = PassageIndex(path, texts=store.text)
+    added = index.add_documents(docs)
+    if added != sum(len(chunk_passages(doc["text"])) for doc in docs):
+        failures.append(f"added {added} passages")
+    if index.add_documents(docs):
+        failures.append("re-adding indexed documents added passages")
+    if index.index.rows.dtype.itemsize > 16:
+        failures.append(f"row record is {index.index.rows.dtype.itemsize} bytes")
+
+    hits = index.related("artemis launch window", 3)
+    passages = {doc["url"]: set(chunk_passages(doc["text"])) for doc in docs}
+    for hit in hits:
+        if hit["passage"] not in passages[hit["url"]]:
+            failures.append(f"passage of {hit['url']} does not match its chunk: {hit['passage']!r}")
+
+    reopened = PassageIndex(path, texts=store.text).related("artemis launch window", 3)
+    if reopened != hits:
+        failures.append(f"reopened index returned {reopened!r}")
+
+    store._put_many([{"url": "https://example.com/0", "title": "Doc 0", "text": "rewritten page"}])
+    for hit in PassageIndex(path, texts=store.text).related("w0_5 w0_6", 1):
+        if hit["passage"] is not None:
+            failures.append(f"changed document returned a stale passage: {hit['passage']!r}")
+    for hit in PassageIndex(path).related("w1_5", 1):
+        if hit["passage"] is not None:
+            failures.append("passage returned without a text source")
+
+    old = os.path.join(tmp, "old")
+    np.save(f"{old}.npy", np.zeros((4, index.embedder.dim), dtype=np.float32))
+    with open(f"{old}.meta.jsonl", "w") as f:
+        f.write('{"url": "https://example.com/x", "title": "", "passage": "text"}\n')
+    if len(PassageIndex(old).index):
+        failures.append("old-format index was loaded")
+
+    store.close()
+    for failure in failures:
+        print("FAIL", failure)
+    if failures:
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Check that Postgres query records survive reads on the writer's connection
+
+Against the database in POSTGRES_* (or --conninfo), a writer reads recent()
+then writes a batch with write_many() and is closed; a new writer must see
+the batch. Also checks that neither read leaves the connection idle in a
+transaction. Records are written with a unique query and deleted afterwards.
+Exits 1 on failure, and 0 with a note when psycopg or the database is not
+available.
+
+Usage: python tests/check_postgres_records.py [--conninfo "host=... dbname=..."]
+"""
+
+import argparse
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from perplexity_core.contracts import InternalRecord
+from perplexity_core.store.postgres import PostgresRecordWriter, psycopg
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conninfo", default=None)
+    args = parser.parse_args()
+
+    if psycopg is None:
+        print("skipped: psycopg is not installed (pip install perplexity-engine[postgres])")
+        return
+    try:
+        writer = PostgresRecordWriter(args.conninfo)
+    except psycopg.OperationalError as e:
+        print(f"skipped: cannot connect to Postgres: {e}")
+        return
+
+    query = f"check-{uuid.uuid4().hex}"
+    failures = []
+    try:
+        writer.recent(5)
+        if writer._conn.info.transaction_status != psycopg.pq.TransactionStatus.IDLE:
+            failures.append("recent() left the connection in a transaction")
+        writer.top_queries(datetime.now(timezone.utc) - timedelta(hours=1), 5)
+        if writer._conn.info.transaction_status != psycopg.pq.TransactionStatus.IDLE:
+            failures.append("top_queries() left the connection in a transaction")
+
+        writer.write_many([
+            InternalRecord(query=query, params_json={"maxResults": 4}, sources_json=[], answer_json={"answer": "x"})
+            for _ in range(3)
+        ])
+        writer.close()
+
+        reopened = PostgresRecordWriter(args.conninfo)
+        try:
+            found = [record for record in reopened.recent(50) if record.query == query]
+            if len(found) != 3:
+                failures.append(f"{len(found)} of 3 records written after recent() survived reopening")
+        finally:
+            with reopened._conn.transaction():
+                reopened._conn.execute("DELETE FROM search_records WHERE query = %s", (query,))
+            reopened.close()
+    finally:
+        writer.close()
+
+    for failure in failures:
+        print("FAIL", failure)
+    if failures:
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
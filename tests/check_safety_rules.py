@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Check that the compiled safety RuleSet fires every rule whose pattern occurs
+
+Covers terms of different rules that overlap (one a prefix, suffix or infix
+of another), prefix patterns, whitespace inside phrases, word boundaries and
+the bundled rules.json. Exits 1 on any mismatch.
+
+Usage: python tests/check_safety_rules.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from perplexity_core.safety.rules import RuleSet
+
+OVERLAPPING = {
+    "version": "check",
+    "disclaimer": "Note.",
+    "rules": [
+        {"id": "legal", "patterns": ["legal"]},
+        {"id": "legal_advice", "patterns": ["legal advice"]},
+        {"id": "advice", "patterns": ["advice"]},
+        {"id": "advice_for", "patterns": ["advice for tenants"]},
+        {"id": "leg_prefix", "patterns": ["leg*"]},
+        {"id": "tenant", "patterns": ["tenant*"]},
+    ],
+}
+
+CASES = [
+    ("this is legal advice", ["legal", "legal_advice", "advice", "leg_prefix"]),
+    ("Legal\n  advice for tenants", ["legal", "legal_advice", "advice", "advice_for", "leg_prefix", "tenant"]),
+    ("legally speaking", ["leg_prefix"]),
+    ("illegal advices", []),
+    ("a tenant's rights", ["tenant"]),
+]
+
+BUNDLED = [
+    ("Should I get legal advice before investing?", ["legal", "financial"]),
+    ("The lawn needs mowing", []),
+    ("My doctor changed the dosage", ["medical"]),
+]
+
+
+def check(rules, cases, label):
+    failures = 0
+    for text, expected in cases:
+        got = [rule.id for rule in rules.match(text)]
+        if got != expected:
+            failures += 1
+            print(f"FAIL {label} {text!r}: got {got}, expected {expected}")
+        else:
+            print(f"ok   {label} {text!r}")
+    return failures
+
+
+def main():
+    bundled = RuleSet.load(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                        "perplexity_core", "safety", "rules.json"))
+    failures = check(RuleSet.from_dict(OVERLAPPING), CASES, "overlap")
+    failures += check(bundled, BUNDLED, "bundled")
+    if failures:
+        print(f"{failures} failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()